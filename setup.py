@@ -25,6 +25,11 @@ setup(
         "six==1.16.0",
         "urllib3==2.7.0",
     ],
+    extras_require={
+        "orjson": ["orjson>=3.6.0"],
+        "parquet": ["pyarrow>=10.0.0"],
+        "zstd": ["zstandard>=0.21.0"],
+    },
     entry_points="""
     [console_scripts]
     tap-dixa=tap_dixa:main
@@ -1,28 +1,67 @@
+import argparse
+import sys
+
 import singer
 from singer import utils
+from tap_dixa.daemon import daemon
 from tap_dixa.discover import discover
+from tap_dixa.fingerprints import compact
+from tap_dixa.plan import plan
 from tap_dixa.sync import sync
 
 REQUIRED_CONFIG_KEYS = ["start_date", "api_token"]
+MULTI_ACCOUNT_REQUIRED_CONFIG_KEYS = ["start_date", "accounts"]
 LOGGER = singer.get_logger()
 
 
+def parse_args():
+    """
+    Parses the singer command line arguments along with the tap specific ones,
+    which are merged into the config.
+    """
+    parser = argparse.ArgumentParser(add_help=False)
+    parser.add_argument("--workers", type=int, help="Number of processes transforming records")
+    parser.add_argument("--plan", action="store_true", help="Print an estimate of the sync instead of syncing")
+    parser.add_argument("--daemon", action="store_true", help="Stay resident and sync every daemon_interval seconds")
+    parser.add_argument("--compact-fingerprints", action="store_true",
+                        help="Evict expired records from the fingerprint index and compact it")
+    tap_args, singer_args = parser.parse_known_args()
+
+    sys.argv = sys.argv[:1] + singer_args
+    args = utils.parse_args([])
+    utils.check_config(args.config, MULTI_ACCOUNT_REQUIRED_CONFIG_KEYS if "accounts" in args.config
+                       else REQUIRED_CONFIG_KEYS)
+    if tap_args.workers is not None:
+        args.config["workers"] = tap_args.workers
+    args.plan = tap_args.plan
+    args.compact_fingerprints = tap_args.compact_fingerprints
+    args.daemon = tap_args.daemon
+    return args
+
+
 @utils.handle_top_exception(LOGGER)
 def main():
     # Parse command line arguments
-    args = utils.parse_args(REQUIRED_CONFIG_KEYS)
+    args = parse_args()
 
     # If discover flag was passed, run discovery mode and dump output to stdout
-    if args.discover:
+    if args.compact_fingerprints:
+        compact(args.config)
+    elif args.discover:
         catalog = discover(args.config)
         catalog.dump()
-    # Otherwise run in sync mode
+    # Otherwise run in sync mode, estimate the sync with --plan or sync on a schedule with --daemon
     else:
         if args.catalog:
             catalog = args.catalog
         else:
             catalog = discover(args.config)
-        sync(args.config, args.state, catalog)
+        if args.plan:
+            plan(args.config, args.state, catalog)
+        elif args.daemon:
+            daemon(args.config, args.state, catalog)
+        else:
+            sync(args.config, args.state, catalog)
 
 
 if __name__ == "__main__":
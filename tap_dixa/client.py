@@ -1,22 +1,191 @@
 """ Module providing DixaAPi Client"""
 import base64
+import functools
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from contextlib import nullcontext
+from types import MappingProxyType
+from urllib.parse import urlencode
+
 import backoff
 import requests
+import singer
 from requests.exceptions import ChunkedEncodingError
 
 from tap_dixa.exceptions import (DixaClient429Error, DixaClient408Error, 
-                                DixaClient5xxError, raise_for_error,
+                                DixaClient5xxError, DixaClientError, is_not_retried, raise_for_error,
                                 retry_after_wait_gen)
+from tap_dixa.decoders import decode_json
+from tap_dixa.hedging import Hedger
 from tap_dixa.helpers import DixaURL
+from tap_dixa.jsonstream import get_received_records, iter_raw_records
+from tap_dixa.limits import CircuitBreaker
+
+LOGGER = singer.get_logger()
+
+
+class ValidatorStore:
+    """
+    Keeps the ETag and Last-Modified validators of responses per URL and
+    query string along with the response body, optionally persisted to a
+    local JSON file, so that a 304 response is answered from the body.
+
+    :param path: The JSON file the validators are loaded from and saved to
+    :param max_entries: The number of entries kept, the oldest are dropped first
+    """
+
+    def __init__(self, path: str = None, max_entries: int = 10_000):
+        self.path = path
+        self.max_entries = max_entries
+        self._validators = OrderedDict()
+        self._lock = threading.Lock()
+
+        if path and os.path.exists(path):
+            with open(path) as file:
+                self._validators.update(json.load(file))
+
+    @staticmethod
+    def key(url: str, params: dict = None) -> str:
+        """
+        Builds the store key of a request from its URL and sorted query string.
+        """
+        params = sorted((k, v) for k, v in (params or {}).items() if v is not None)
+        return f"{url}?{urlencode(params)}" if params else url
+
+    def get(self, url: str, params: dict = None) -> tuple:
+        """
+        Returns the conditional headers for a request and the body stored with
+        them, empty and None if nothing is stored.
+        """
+        with self._lock:
+            validators = self._validators.get(self.key(url, params), {})
+        if validators.get("body") is None:
+            return {}, None
+        headers = {}
+        if validators.get("etag"):
+            headers["If-None-Match"] = validators["etag"]
+        if validators.get("last_modified"):
+            headers["If-Modified-Since"] = validators["last_modified"]
+        return headers, validators["body"].encode("utf-8")
+
+    def update(self, url: str, params: dict, response_headers, body: bytes):
+        """
+        Stores the validators and the body of a successful response, if it has any validator.
+        """
+        response_headers = response_headers or {}
+        validators = {"etag": response_headers.get("ETag"), "last_modified": response_headers.get("Last-Modified")}
+        if not any(validators.values()):
+            return
+        validators["body"] = body.decode("utf-8")
+
+        key = self.key(url, params)
+        with self._lock:
+            self._validators.pop(key, None)
+            self._validators[key] = validators
+            while len(self._validators) > self.max_entries:
+                self._validators.popitem(last=False)
+
+    def save(self):
+        """
+        Writes the validators to the JSON file.
+        """
+        if not self.path:
+            return
+        with self._lock, open(f"{self.path}.tmp", "w") as file:
+            json.dump(self._validators, file)
+        os.replace(f"{self.path}.tmp", self.path)
+
+
+class ResumableWindow:
+    """
+    Keeps the records received by the download of an export window so that a
+    download broken off in the middle of the body can be resumed from the
+    replication key of the last record received.
+
+    The resumed request starts at that replication key, and the records at
+    that exact value which were received already are dropped from it.
+
+    :param start_param: The querystring param holding the start of the window
+    :param replication_key: The field the export is filtered on
+    :param key_properties: The fields identifying a record
+    """
+
+    def __init__(self, start_param: str, replication_key: str, key_properties: list):
+        self.start_param = start_param
+        self.replication_key = replication_key
+        self.key_properties = key_properties
+        self.records = []
+        self._position = None
+        self._boundary = set()
+
+    def _get_key(self, raw_record) -> tuple:
+        return tuple(raw_record.record.get(key) for key in self.key_properties)
+
+    def add(self, raw_records):
+        """
+        Keeps received records, except those at the resume position received before.
+        """
+        for raw_record in raw_records:
+            if self._position is not None and raw_record.record.get(self.replication_key) == self._position \
+                    and self._get_key(raw_record) in self._boundary:
+                continue
+            self.records.append(raw_record)
+
+    def get_resume_params(self, params: dict):
+        """
+        Returns the params requesting the remainder of the window, or None if
+        the records received so far are not in replication key order, in which
+        case the kept records are dropped and the window has to be downloaded again.
+        """
+        values = [raw_record.record.get(self.replication_key) for raw_record in self.records]
+        if not values or None in values or any(a > b for a, b in zip(values, values[1:])):
+            self.records, self._position, self._boundary = [], None, set()
+            return None
+
+        self._position = values[-1]
+        self._boundary = {self._get_key(raw_record) for raw_record in self.records
+                          if raw_record.record.get(self.replication_key) == self._position}
+        return {**params, self.start_param: self._position}
+
 
 class Client:
-    """DixaClient Class for performing extraction from DixaApi"""
+    """
+    DixaClient Class for performing extraction from DixaApi
 
-    def __init__(self, api_token: str):
-        self._api_token = api_token
-        self._base_url = None
-        self._session = requests.Session()
-        self._headers = {}
+    :param api_token: The Dixa API token
+    :param validator_store: Stores validators to send conditional requests
+    :param adapter: A transport adapter shared with other clients, to share their connection pools
+    :param limiter: A context manager held for the duration of every request, to cap concurrent requests
+    :param shared_limiter: A context manager held along with `limiter`, shared with other clients to cap
+        their concurrent requests together
+    :param failure_threshold: The number of consecutive failures after which requests to a host fail fast
+    :param cooldown: The number of seconds before a host failing fast is tried again
+    :param hedger: Hedges GET requests which are slow to answer, see Hedger
+    :param decoder: Decodes JSON response bodies, see `get_decoder`. By default they are decoded by requests
+    """
+
+    def __init__(self, api_token: str, validator_store: ValidatorStore = None,
+                 adapter: requests.adapters.HTTPAdapter = None, limiter=None, failure_threshold: int = 5,
+                 cooldown: float = 300, hedger: Hedger = None, decoder=None, shared_limiter=None):
+        self._limiter = limiter or nullcontext()
+        self._shared_limiter = shared_limiter or nullcontext()
+        self.decoder = decoder
+        self.validator_store = validator_store
+        self.hedger = hedger
+        self.circuit_breakers = {url.value: CircuitBreaker(url.value, failure_threshold, cooldown)
+                                 for url in DixaURL}
+        # The headers of every host are built once and never changed, so requests to different hosts
+        # can be sent from several threads at once
+        self._host_headers = MappingProxyType({
+            DixaURL.EXPORTS.value: MappingProxyType({"Authorization": f"Basic {self._to_base64(api_token)}"}),
+            DixaURL.INTEGRATIONS.value: MappingProxyType({"Authorization": f"{api_token}"}),
+        })
+        self._shared_adapter = adapter is not None
+        self._adapter = adapter or requests.adapters.HTTPAdapter()
+        self._local = threading.local()
 
     @staticmethod
     def _to_base64(string: str) -> str:
@@ -31,29 +200,95 @@ class Client:
         base64_bytes = base64.b64encode(message_bytes)
         return base64_bytes.decode("utf-8")
 
-    def _set_auth_header(self):
+    def _get_headers(self, base_url: str) -> dict:
+        """
+        Returns the headers, holding the corresponding Authorization header, of a base url variant.
+        """
+        return dict(self._host_headers.get(base_url, {}))
+
+    def decode(self, body):
         """
-        Sets the corresponding Authorization header based on the base url variant.
+        Decodes a JSON response body with the decoder of the client.
+
+        :param body: The response body as bytes
+        :return: The decoded Python object
         """
-        if self._base_url == DixaURL.EXPORTS.value:
-            self._headers["Authorization"] = f"Basic {self._to_base64(self._api_token)}"
-        elif self._base_url == DixaURL.INTEGRATIONS.value:
-            self._headers["Authorization"] = f"{self._api_token}"
+        return self.decoder(body) if self.decoder is not None else decode_json(body)
 
-    def _build_url(self, endpoint: str) -> str:
+    @staticmethod
+    def _build_url(base_url: str, endpoint: str) -> str:
         """
         Builds the URL for the API request.
 
+        :param base_url: The base url of the API variant
         :param endpoint: The API URI (resource)
         :return: The full API URL for the request
         """
-        return f"{self._base_url}{endpoint}"
+        return f"{base_url}{endpoint}"
+
+    def _get_session(self) -> requests.Session:
+        """
+        Returns the session of the current thread. Sessions are not shared
+        between threads, their connections are pooled by the client adapter.
+        """
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = requests.Session()
+            session.mount("https://", self._adapter)
+            session.mount("http://", self._adapter)
+            self._local.session = session
+        return session
+
+    def _get_circuit_breaker(self, url: str):
+        """
+        Returns the circuit breaker of the host of a URL, None for other hosts.
+        """
+        for base_url, circuit_breaker in self.circuit_breakers.items():
+            if url.startswith(base_url):
+                return circuit_breaker
+        return None
+
+    def get_retry_in(self, base_url: str) -> float:
+        """
+        Returns the number of seconds until requests to a host are let through again.
+        """
+        circuit_breaker = self._get_circuit_breaker(base_url)
+        return circuit_breaker.retry_in() if circuit_breaker is not None else 0
+
+    def close(self):
+        """
+        Closes the connections of the client, unless they are shared, and logs its hedge counters.
+        """
+        if self.hedger is not None:
+            self.hedger.close()
+        if not self._shared_adapter:
+            self._adapter.close()
+
+    def _send(self, method, url, **kwargs) -> requests.Response:
+        """
+        Sends a single request, holding a slot of the limiter and of the
+        shared limiter, and reports its outcome to limiters adapting to it.
+        """
+        record = getattr(self._limiter, "record", None)
+        # The slot of the client is taken first, so waiting for it does not hold up other clients
+        with self._limiter, self._shared_limiter:
+            started = time.monotonic()
+            try:
+                response = self._get_session().request(method, url, **kwargs)
+            except Exception:
+                if record is not None:
+                    record(started, time.monotonic())
+                raise
+            if record is not None:
+                record(started, time.monotonic(), response.status_code)
+            return response
 
-    def _get(self, url, headers=None, params=None, data=None):
+    def _get(self, url, headers=None, params=None, data=None, raw=False, retry_timeouts=True, conditional=True):
         """
         Wraps the _make_request function with a 'GET' method
         """
-        return self._make_request(url, method="GET", headers=headers, params=params, data=data)
+        return self._make_request(url, method="GET", headers=headers, params=params, data=data, raw=raw,
+                                  retry_timeouts=retry_timeouts, conditional=conditional)
 
     def _post(self, url, headers=None, params=None, data=None):
         """
@@ -65,9 +300,11 @@ class Client:
     @backoff.on_exception(retry_after_wait_gen,
                           (DixaClient429Error, DixaClient5xxError,
                            DixaClient408Error, ChunkedEncodingError),
+                           giveup=is_not_retried,
                            jitter=None,
                            max_tries=3)
-    def _make_request(self, url, method, headers=None, params=None, data=None) -> dict:
+    def _make_request(self, url, method, headers=None, params=None, data=None, raw=False, stream=False,
+                      conditional=True, retry_timeouts=True) -> dict:
         """
         Makes the API request.
 
@@ -76,23 +313,136 @@ class Client:
         :param headers: The headers for the API request
         :param params: The querystring params passed to the API
         :param data: The data passed to the body of the request
-        :return: A dictionary representing the response from the API
+        :param raw: If true, the undecoded response body is returned
+        :param stream: If true, the response is returned before its body is read
+        :param conditional: If false, no validators are sent. A 304 response
+            to a conditional request is answered from the body stored with the validators
+        :param retry_timeouts: If false, a 408 response is raised without being retried
+        :return: A dictionary representing the response from the API, the
+            response bytes if `raw` is set, or the response if `stream` is set
+        :raises DixaCircuitOpenError: If the host failed too many times in a row, see CircuitBreaker
         """
-        with self._session as session:
-            response = session.request(method, url, headers=headers, params=params, data=data)
+        conditional = conditional and self.validator_store is not None and method == "GET"
+        stored_body = None
+        if conditional:
+            validator_headers, stored_body = self.validator_store.get(url, params)
+            headers = {**(headers or {}), **validator_headers}
+
+        circuit_breaker = self._get_circuit_breaker(url)
+        if circuit_breaker is not None:
+            circuit_breaker.before_request()
+
+        # The slot is released before retrying so backing off does not hold up other clients
+        try:
+            send = functools.partial(self._send, method, url, headers=headers, params=params, data=data,
+                                     stream=stream)
+            # GET requests are idempotent, so a slow one can be sent twice
+            response = self.hedger.request(url, send) if self.hedger is not None and method == "GET" else send()
+            if circuit_breaker is not None:
+                circuit_breaker.record(response.status_code < 500 and response.status_code != 408)
+
+            if response.status_code == 304 and stored_body is not None:
+                return stored_body if raw else self.decode(stored_body)
 
             if response.status_code != 200:
                 raise_for_error(response)
                 return None
+        except Exception as err:
+            if isinstance(err, DixaClient408Error):
+                err.retry = retry_timeouts
+            if circuit_breaker is None:
+                raise
+            if not isinstance(err, DixaClientError):
+                circuit_breaker.record(False)
+            # The failure opening the circuit is not retried either
+            if circuit_breaker.state == CircuitBreaker.OPEN:
+                raise circuit_breaker.get_error() from err
+            raise
+
+        if stream:
+            return response
+
+        if conditional:
+            self.validator_store.update(url, params, response.headers, response.content)
+
+        if raw:
+            return response.content
+        return self.decoder(response.content) if self.decoder is not None else response.json()
+
+    def _download(self, url, headers, params, raw, resume: ResumableWindow, max_resumes=3):
+        """
+        Downloads a response body which is resumed from the last record received
+        when the connection breaks, instead of being downloaded again.
+
+        Export windows are cut from the bookmark, so a later sync hardly ever
+        requests the same window again, and they are requested without validators.
 
-            return response.json()
+        :return: Same as `_make_request`
+        """
+        request_params = params
+        for attempt in range(max_resumes + 1):
+            response = self._make_request(url, "GET", headers=headers, params=request_params, stream=True,
+                                          conditional=False)
+
+            chunks = []
+            try:
+                for chunk in response.iter_content(chunk_size=64 * 1024):
+                    chunks.append(chunk)
+                break
+            except ChunkedEncodingError:
+                if attempt == max_resumes:
+                    raise
+                resume.add(get_received_records(b"".join(chunks).decode("utf-8", "ignore")))
+                request_params = resume.get_resume_params(params) or params
+                LOGGER.warning("Download of %s broke off after %s records, resuming with %s", url,
+                               len(resume.records), request_params)
+
+        body = b"".join(chunks)
+        if not resume.records:
+            return body if raw else self.decode(body)
 
-    def get(self, base_url, endpoint, params=None):
+        resume.add(iter_raw_records(body.decode("utf-8")))
+        if raw:
+            return ("[" + ",".join(raw_record.raw for raw_record in resume.records) + "]").encode("utf-8")
+        return [raw_record.record for raw_record in resume.records]
+
+    def has_records(self, base_url, endpoint, params=None) -> bool:
+        """
+        Requests a JSON array and tells whether it holds any record, from the
+        first bytes of the response body. The connection is closed without
+        downloading the rest of the body.
+
+        :return: True if the array is not empty
+        """
+        url = self._build_url(base_url, endpoint)
+        response = self._make_request(url, "GET", headers=self._get_headers(base_url), params=params, stream=True,
+                                      conditional=False)
+        try:
+            head = b""
+            for chunk in response.iter_content(chunk_size=1024):
+                head = (head + chunk).lstrip()
+                # The first token after the opening bracket
+                if len(head) > 1 and head[1:].lstrip():
+                    return head[1:].lstrip()[:1] != b"]"
+            return False
+        finally:
+            response.close()
+
+    def get(self, base_url, endpoint, params=None, raw=False, resume: ResumableWindow = None,
+            retry_timeouts=True, conditional=True):
         """
         Takes the base_url and endpoint and builds and makes a 'GET' request
-        to the API.
+        to the API. The client can be called from several threads at once.
+
+        With `resume`, the body is streamed and a download broken off in the
+        middle is resumed from the last record received, see ResumableWindow.
+        With `retry_timeouts` false, a 408 response raises DixaClient408Error
+        right away, for callers that would rather ask for less.
+        With `conditional` false, no validators are sent.
         """
-        self._base_url = base_url
-        self._set_auth_header()
-        url = self._build_url(endpoint)
-        return self._get(url, headers=self._headers, params=params)
+        url = self._build_url(base_url, endpoint)
+        headers = self._get_headers(base_url)
+        if resume is not None:
+            return self._download(url, headers, params, raw, resume)
+        return self._get(url, headers=headers, params=params, raw=raw, retry_timeouts=retry_timeouts,
+                         conditional=conditional)
@@ -0,0 +1,197 @@
+""" Long running mode syncing on a schedule"""
+import contextlib
+import copy
+import datetime
+import os
+import signal
+import stat
+import sys
+import threading
+import time
+
+import singer
+from singer import Transformer
+from tap_dixa.client import Client, ValidatorStore
+from tap_dixa.exceptions import InvalidConfig
+from tap_dixa.helpers import Deadline
+from tap_dixa.output import get_writer
+from tap_dixa.sync import get_client_options, get_limiter, sync_streams
+
+LOGGER = singer.get_logger()
+
+
+class Daemon:
+    """
+    Syncs every `daemon_interval` seconds in a single process, so that the
+    interpreter, the catalog, the client with its connection pool and the
+    state stay in memory from one run to the next.
+
+    Runs start on schedule, or right away when the previous run took longer
+    than the interval. A failed run is logged and the next run starts from
+    the state the failed run started from, as its last messages may not
+    have reached the reader of the output.
+
+    The state kept in memory was never handed back by the target, so it is
+    not trusted to tell what the target has: the `fingerprint_index` config
+    is ignored, and the snapshot hashes of the full table streams are
+    dropped from the state after every run, so that unchanged snapshots are
+    emitted again.
+
+    The output of every run is written:
+    - to a file of its own in `daemon_output_dir`, named after the start of
+      the run and renamed from `.tmp` once the run is over, keeping the
+      `daemon_keep_files` most recent files,
+    - or to the named pipe `daemon_pipe`, created if missing and kept open
+      from one run to the next, so that its reader gets a single stream of
+      messages like the stdout of the tap, and opened again if its reader
+      went away,
+    - or else to stdout.
+
+    :param config: A dictionary containing tap config data
+    :param state: The state to start from
+    :param catalog: The catalog of the streams to sync
+    """
+
+    def __init__(self, config: dict, state: dict, catalog):
+        if config.get("accounts"):
+            raise InvalidConfig("daemon mode syncs a single account, run a daemon per account")
+        self.config = config
+        self.state = state
+        self.catalog = catalog
+        self.interval = float(config.get("daemon_interval", 300))
+        self.output_dir = config.get("daemon_output_dir")
+        self.pipe = config.get("daemon_pipe")
+        self.keep_files = int(config.get("daemon_keep_files", 288))
+        self.runs = 0
+        self._stopped = threading.Event()
+        self._pipe_output = None
+
+        self.validator_store = ValidatorStore(config["http_cache_path"]) if config.get("http_cache_path") else None
+        self.client = Client(config.get("api_token"), validator_store=self.validator_store,
+                             limiter=get_limiter(config), **get_client_options(config))
+        if config.get("fingerprint_index"):
+            LOGGER.warning("fingerprint_index is ignored in daemon mode, as the target does not hand state back")
+        self.transformer = Transformer()
+
+    def stop(self, *args):
+        """
+        Stops the daemon once the current run is over.
+        """
+        LOGGER.info("Stopping the daemon after the current run")
+        self._stopped.set()
+
+    @contextlib.contextmanager
+    def get_output(self, started: datetime.datetime):
+        """
+        Opens the output of a run.
+
+        :param started: The start of the run
+        :return: Context manager of the file the run is written to
+        """
+        if self.output_dir:
+            os.makedirs(self.output_dir, exist_ok=True)
+            path = os.path.join(self.output_dir, f"tap-dixa-{started.strftime('%Y%m%dT%H%M%S%fZ')}.jsonl")
+            try:
+                with open(f"{path}.tmp", "w", encoding="utf-8") as output:
+                    yield output
+            finally:
+                os.replace(f"{path}.tmp", path)
+                self.remove_old_files()
+        elif self.pipe:
+            if self._pipe_output is None:
+                if not os.path.exists(self.pipe):
+                    os.mkfifo(self.pipe)
+                elif not stat.S_ISFIFO(os.stat(self.pipe).st_mode):
+                    raise InvalidConfig(f"daemon_pipe '{self.pipe}' is not a named pipe")
+                # Blocks until a reader opens the pipe
+                self._pipe_output = open(self.pipe, "w", encoding="utf-8")  # pylint: disable=consider-using-with
+            try:
+                yield self._pipe_output
+                self._pipe_output.flush()
+            except BrokenPipeError:
+                LOGGER.warning("The reader of %s went away, the pipe is opened again on the next run", self.pipe)
+                self.close_pipe()
+                raise
+        else:
+            yield sys.stdout
+
+    def remove_old_files(self):
+        """
+        Removes the output files of the oldest runs beyond `daemon_keep_files`.
+        """
+        files = sorted(name for name in os.listdir(self.output_dir)
+                       if name.startswith("tap-dixa-") and name.endswith(".jsonl"))
+        for name in files[:max(len(files) - self.keep_files, 0)]:
+            os.remove(os.path.join(self.output_dir, name))
+
+    def run_once(self):
+        """
+        Syncs the selected streams once, from the state kept in memory.
+        """
+        started = datetime.datetime.now(datetime.timezone.utc)
+        self.runs += 1
+        LOGGER.info("Starting run %s of the daemon", self.runs)
+        # Bookmarks are written to the state in place
+        state = copy.deepcopy(self.state)
+
+        with self.get_output(started) as output, contextlib.redirect_stdout(output):
+            writer = get_writer(self.config)
+            try:
+                state = sync_streams(self.client, writer, self.config, state, self.catalog,
+                                     Deadline(self.config.get("max_runtime")), transformer=self.transformer)
+            finally:
+                writer.close()
+
+        for bookmark in state.get("bookmarks", {}).values():
+            bookmark.pop("snapshot_hash", None)
+        self.state = state
+        if self.validator_store is not None:
+            self.validator_store.save()
+        LOGGER.info("Run %s of the daemon took %.1f seconds", self.runs,
+                    (datetime.datetime.now(datetime.timezone.utc) - started).total_seconds())
+
+    def run(self, max_runs: int = None):
+        """
+        Runs on schedule until stopped.
+
+        :param max_runs: The number of runs after which the daemon stops, unlimited by default
+        """
+        try:
+            while not self._stopped.is_set() and (max_runs is None or self.runs < max_runs):
+                started = time.monotonic()
+                try:
+                    self.run_once()
+                except Exception:  # pylint: disable=broad-except
+                    LOGGER.exception("Run %s of the daemon failed", self.runs)
+
+                if max_runs is not None and self.runs >= max_runs:
+                    break
+                self._stopped.wait(max(self.interval - (time.monotonic() - started), 0))
+        finally:
+            self.close()
+
+    def close_pipe(self):
+        """
+        Closes the named pipe, which its reader sees as the end of the output.
+        """
+        if self._pipe_output is not None:
+            try:
+                self._pipe_output.close()
+            except BrokenPipeError:
+                pass
+            self._pipe_output = None
+
+    def close(self):
+        self.client.close()
+        self.close_pipe()
+
+
+def daemon(config: dict, state: dict, catalog):
+    """
+    Runs a Daemon until the process receives SIGTERM or SIGINT.
+    """
+    instance = Daemon(config, state, catalog)
+    signal.signal(signal.SIGTERM, instance.stop)
+    signal.signal(signal.SIGINT, instance.stop)
+    LOGGER.info("Syncing every %s seconds", instance.interval)
+    instance.run()
@@ -0,0 +1,119 @@
+""" JSON decoders of API responses"""
+import json
+
+import singer
+from tap_dixa.exceptions import InvalidConfig
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+try:
+    import simdjson
+except ImportError:
+    simdjson = None
+
+LOGGER = singer.get_logger()
+
+# Tried in this order when the decoder is `auto`
+DECODER_NAMES = ("orjson", "msgspec", "simdjson", "json")
+
+# Maps digits to "0" and every other byte to ".", to find runs of digits with a substring search
+_DIGITS = bytes(ord("0") if ord("0") <= i <= ord("9") else ord(".") for i in range(256))
+_LONG_RUN = b"0" * 19
+
+
+def _has_long_integer(data) -> bool:
+    """
+    Returns True if a JSON document holds an integer of 19 digits or more,
+    which may not fit in 64 bits. Runs of digits inside strings are skipped
+    unless they follow a character a value may follow.
+    """
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    digits = data.translate(_DIGITS)
+    position = digits.find(_LONG_RUN)
+    while position != -1:
+        prefix = data[max(0, position - 64):position].rstrip()
+        if prefix.endswith(b"-"):
+            prefix = prefix[:-1].rstrip()
+        if prefix[-1:] in (b"", b":", b",", b"["):
+            return True
+        end = position + len(_LONG_RUN)
+        while end < len(digits) and digits[end] == ord("0"):
+            end += 1
+        position = digits.find(_LONG_RUN, end)
+    return False
+
+
+def decode_json(data):
+    """
+    Decodes a JSON document with the json module of the standard library.
+
+    :param data: The document as bytes or str
+    :return: The decoded Python object
+    """
+    return json.loads(data)
+
+
+def _with_fallback(decode, errors):
+    """
+    Wraps a decoder so that documents it rejects are decoded by the json
+    module, which also accepts NaN and encodings other than UTF-8, and raises
+    the same errors on invalid documents.
+
+    Fast decoders may turn integers beyond 64 bits into floats instead of
+    rejecting them, so documents with an integer of 19 digits or more are
+    decoded by the json module as well.
+    """
+    def decode_or_fallback(data):
+        if _has_long_integer(data):
+            return json.loads(data)
+        try:
+            return decode(data)
+        except errors:
+            return json.loads(data)
+    return decode_or_fallback
+
+
+def _get_decoders() -> dict:
+    decoders = {"json": decode_json}
+    if orjson is not None:
+        decoders["orjson"] = _with_fallback(orjson.loads, orjson.JSONDecodeError)
+    if msgspec is not None:
+        decoders["msgspec"] = _with_fallback(msgspec.json.Decoder().decode, msgspec.DecodeError)
+    if simdjson is not None:
+        decoders["simdjson"] = _with_fallback(simdjson.loads, ValueError)
+    return decoders
+
+
+def get_decoder(name: str = "auto"):
+    """
+    Returns a function decoding a JSON document into the same Python objects
+    as the json module, using the fastest library installed with `auto`.
+
+    :param name: One of auto, orjson, msgspec, simdjson or json
+    :return: A function of bytes or str returning the decoded object, or None
+        with `auto` when no faster library than the json module is installed,
+        to leave decoding to requests
+    """
+    decoders = _get_decoders()
+    name = name or "auto"
+    if name == "auto":
+        name = next(decoder_name for decoder_name in DECODER_NAMES if decoder_name in decoders)
+        if name == "json":
+            LOGGER.debug("Decoding JSON responses with requests")
+            return None
+    elif name not in DECODER_NAMES:
+        raise InvalidConfig(f"invalid json_decoder '{name}', expected one of auto, {', '.join(DECODER_NAMES)}")
+    elif name not in decoders:
+        raise InvalidConfig(f"json_decoder '{name}' requires the {name} package")
+
+    LOGGER.debug("Decoding JSON responses with %s", name)
+    return decoders[name]
@@ -9,13 +9,17 @@ from tap_dixa.helpers import (
     _get_replication_key_from_meta,
     _get_replication_method_from_meta,
     get_abs_path,
+    get_epoch_ms_fields,
     DixaURL
 )
 from datetime import datetime
 
-def get_schemas():
+def get_schemas(iso_timestamps: bool = False):
     """
     Builds the singer schema and metadata dictionaries.
+
+    :param iso_timestamps: If true, adds an ISO 8601 `<field>_iso` copy of
+        every epoch millisecond field to the schemas
     """
 
     schemas = {}
@@ -27,6 +31,10 @@ def get_schemas():
         with open(schema_path) as file:
             schema = json.load(file)
 
+        if iso_timestamps:
+            for field in get_epoch_ms_fields(schema):
+                schema["properties"][f"{field}_iso"] = {"type": ["null", "string"], "format": "date-time"}
+
         if stream_object.replication_method == "INCREMENTAL":
             replication_keys = stream_object.valid_replication_keys
         else:
@@ -59,16 +67,20 @@ def discover(config: dict):
     Builds the singer catalog for all the streams in the schemas directory.
     """
 
-    schemas, schemas_metadata = get_schemas()
+    schemas, schemas_metadata = get_schemas(iso_timestamps=bool(config and config.get("iso_timestamps")))
     streams = []
 
     if config:
         #Token Validation check before making any api request
         #params : mock parameter values are given for api token validation
-        Client(config["api_token"]).get(base_url=DixaURL.INTEGRATIONS.value,
-                                        endpoint=ActivityLogs.endpoint,
-                                        params={"created_after": datetime.today(),
-                                        "created_before": datetime.now()})
+        #In multi-account mode the token of every account is checked
+        api_tokens = [account["api_token"] for account in config["accounts"]] \
+            if config.get("accounts") else [config["api_token"]]
+        for api_token in api_tokens:
+            Client(api_token).get(base_url=DixaURL.INTEGRATIONS.value,
+                                  endpoint=ActivityLogs.endpoint,
+                                  params={"created_after": datetime.today(),
+                                  "created_before": datetime.now()})
 
     for schema_name, schema in schemas.items():
         schema_meta = schemas_metadata[schema_name]
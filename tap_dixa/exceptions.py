@@ -10,6 +10,10 @@ class InvalidInterval(Exception):
     pass
 
 
+class InvalidConfig(Exception):
+    pass
+
+
 class DixaClientError(Exception):
     def __init__(self, message=None, response=None):
         super().__init__(message)
@@ -36,6 +40,17 @@ class DixaClient422Error(DixaClientError):
 class DixaClient5xxError(DixaClientError):
     pass
 
+
+class DixaCircuitOpenError(Exception):
+    """
+    Raised instead of sending a request to a host that keeps failing.
+    """
+
+    def __init__(self, message=None, retry_in=0):
+        super().__init__(message)
+        self.message = message
+        self.retry_in = retry_in
+
 ERROR_CODE_EXCEPTION_MAPPING = {
     400: {"raise_exception": DixaClient400Error, "message": "Invalid query parameters"},
     401: {"raise_exception": DixaClient401Error, "message": "Invalid or missing credentials"},
@@ -71,6 +86,14 @@ def raise_for_error(resp: requests.Response):
             raise DixaClientError(error) from None
 
 
+def is_not_retried(error) -> bool:
+    """
+    Tells the backoff decorator to give up on errors of requests sent
+    without retries.
+    """
+    return getattr(error, "retry", True) is False
+
+
 def retry_after_wait_gen():
     """
     Returns a generator that is passed to backoff decorator to indicate how long
@@ -0,0 +1,152 @@
+""" Index of the content hash of emitted records"""
+import hashlib
+import sqlite3
+
+import simplejson as json
+import singer
+from tap_dixa.exceptions import InvalidConfig
+from tap_dixa.helpers import datetime_to_unix_ms
+
+LOGGER = singer.get_logger()
+
+# Number of ids looked up per query, below the SQLite limit of bound parameters
+_LOOKUP_BATCH = 500
+
+
+class FingerprintIndex:
+    """
+    Keeps the content hash of every emitted record in a SQLite database, by
+    stream and primary key, so that a record re-synced unchanged is not
+    emitted again.
+
+    A record is only skipped if it was emitted before the bookmark the sync
+    started from, meaning the state that followed it was committed by the
+    target and handed back to the tap. Records emitted by a sync whose state
+    never came back are emitted again.
+
+    Records whose replication key is older than `ttl_days` are evicted at
+    the end of every sync, see `evict`, and `compact` also gives the space
+    they held back to the file system.
+
+    :param path: The path of the SQLite database, created if missing
+    :param ttl_days: The number of days records are kept for, by replication key
+    """
+
+    def __init__(self, path: str, ttl_days: float = 30):
+        self.path = path
+        self.ttl_days = ttl_days
+        self.skipped = 0
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS fingerprints (stream TEXT NOT NULL, id TEXT NOT NULL, hash BLOB NOT NULL, "
+            "replication_value INTEGER NOT NULL, emitted_before INTEGER NOT NULL, PRIMARY KEY (stream, id)) "
+            "WITHOUT ROWID")
+        self._connection.execute(
+            "CREATE INDEX IF NOT EXISTS fingerprints_age ON fingerprints (stream, replication_value)")
+        self._connection.commit()
+
+    @staticmethod
+    def get_hash(record: dict) -> bytes:
+        """
+        Returns the hash of the content of a transformed record, regardless of the order of its fields.
+        """
+        return hashlib.blake2b(json.dumps(record, sort_keys=True, use_decimal=True).encode("utf-8"),
+                               digest_size=16).digest()
+
+    def _lookup(self, stream: str, ids: list) -> dict:
+        found = {}
+        for i in range(0, len(ids), _LOOKUP_BATCH):
+            batch = ids[i:i + _LOOKUP_BATCH]
+            rows = self._connection.execute(
+                f"SELECT id, hash, emitted_before FROM fingerprints WHERE stream = ? AND id IN "
+                f"({', '.join('?' * len(batch))})", [stream, *batch])
+            found.update((row[0], (row[1], row[2])) for row in rows)
+        return found
+
+    def get_unchanged(self, stream: str, entries: list, bookmark: int) -> set:
+        """
+        Returns the records to skip among records about to be emitted, and
+        keeps the hash of the others.
+
+        :param stream: The tap_stream_id of the records
+        :param entries: list of (primary key, replication key as epoch milliseconds, transformed record) tuples
+        :param bookmark: The bookmark the sync started from, as epoch milliseconds
+        :return: set of the positions in `entries` of the records to skip
+        """
+        ids = [json.dumps(key) for key, _, _ in entries]
+        known = self._lookup(stream, list(set(ids)))
+
+        unchanged, emitted = set(), []
+        for position, (record_id, (_, value, record)) in enumerate(zip(ids, entries)):
+            record_hash = self.get_hash(record)
+            known_hash, emitted_before = known.get(record_id, (None, None))
+            if known_hash == record_hash and emitted_before < bookmark:
+                unchanged.add(position)
+                continue
+            # The state written after this record holds a bookmark of at least this value
+            emitted.append((stream, record_id, record_hash, value, max(value, bookmark)))
+            known[record_id] = (record_hash, max(value, bookmark))
+
+        self._connection.executemany(
+            "INSERT OR REPLACE INTO fingerprints (stream, id, hash, replication_value, emitted_before) "
+            "VALUES (?, ?, ?, ?, ?)", emitted)
+        self._connection.commit()
+        self.skipped += len(unchanged)
+        return unchanged
+
+    def evict(self) -> int:
+        """
+        Removes the records whose replication key is older than `ttl_days`.
+
+        :return: The number of records removed
+        """
+        oldest = datetime_to_unix_ms(singer.utils.now()) - int(self.ttl_days * 24 * 60 * 60 * 1000)
+        removed = self._connection.execute("DELETE FROM fingerprints WHERE replication_value < ?",
+                                           (oldest,)).rowcount
+        self._connection.commit()
+        if removed:
+            LOGGER.info("Evicted %s records older than %s days from the fingerprint index", removed, self.ttl_days)
+        return removed
+
+    def compact(self) -> int:
+        """
+        Evicts expired records and rebuilds the database file to release the space they held.
+
+        :return: The number of records removed
+        """
+        removed = self.evict()
+        self._connection.execute("VACUUM")
+        LOGGER.info("Compacted the fingerprint index %s", self.path)
+        return removed
+
+    def close(self):
+        self.evict()
+        if self.skipped:
+            LOGGER.info("Skipped %s unchanged records", self.skipped)
+        self._connection.close()
+
+
+def get_fingerprint_index(config: dict, account: str = None):
+    """
+    Opens the FingerprintIndex of the `fingerprint_index` config, one per
+    account in multi-account mode.
+
+    :return: A FingerprintIndex, or None if not configured
+    """
+    if not config.get("fingerprint_index"):
+        return None
+    path = f"{config['fingerprint_index']}.{account}" if account else config["fingerprint_index"]
+    return FingerprintIndex(path, float(config.get("fingerprint_ttl_days", 30)))
+
+
+def compact(config: dict):
+    """
+    Compacts the fingerprint index of the config, or of every account in multi-account mode.
+    """
+    if not config.get("fingerprint_index"):
+        raise InvalidConfig("fingerprint_index is not configured")
+    accounts = [account["name"] for account in config.get("accounts") or []] or [None]
+    for account in accounts:
+        index = get_fingerprint_index(config, account)
+        index.compact()
+        index.close()
@@ -0,0 +1,169 @@
+""" Hedged requests cutting the tail latency of slow API responses"""
+import threading
+import time
+from collections import defaultdict, deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+
+import singer
+from singer import metrics
+
+LOGGER = singer.get_logger()
+
+
+class Hedger:
+    """
+    Sends a duplicate of an idempotent request which has not been answered
+    within the `percentile` of the recent latencies of its URL, and returns
+    whichever answer comes first.
+
+    Nothing is hedged until `min_samples` latencies of a URL are known, and
+    no more than `max_ratio` of the requests sent are hedges. Only a 2xx or
+    304 response wins, a 429 or 5xx answer waits for the other request.
+
+    A request which cannot be hedged is sent on the calling thread. One which
+    may be hedged is sent right away on a thread of its own, so the caller
+    can return the hedge without waiting for it, and only the hedges go
+    through the pool of `max_hedges` threads.
+
+    :param percentile: The percentile of recent latencies a request is hedged after
+    :param max_ratio: The share of extra requests hedging may add
+    :param min_samples: The number of latencies of a URL needed before hedging it
+    :param max_samples: The number of recent latencies kept per URL
+    :param max_hedges: The number of hedges in flight at once
+    """
+
+    def __init__(self, percentile: float = 95, max_ratio: float = 0.05, min_samples: int = 20,
+                 max_samples: int = 200, max_hedges: int = 4):
+        if not 0 < percentile < 100:
+            raise ValueError("percentile must be between 0 and 100")
+        self.percentile = percentile
+        self.max_ratio = max_ratio
+        self.min_samples = min_samples
+        self.requests = 0
+        self.fired = 0
+        self.won = 0
+        self._latencies = defaultdict(lambda: deque(maxlen=max_samples))
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_hedges, thread_name_prefix="hedge")
+
+    def get_delay(self, key: str):
+        """
+        Returns the number of seconds after which a request is hedged, or None
+        while too few latencies are known.
+        """
+        with self._lock:
+            latencies = sorted(self._latencies[key])
+        if len(latencies) < self.min_samples:
+            return None
+        return latencies[min(len(latencies) - 1, int(len(latencies) * self.percentile / 100))]
+
+    def _can_fire(self) -> bool:
+        return self.fired + 1 <= self.max_ratio * self.requests
+
+    def _fire(self) -> bool:
+        """
+        Counts a hedge if it stays within the extra load allowed.
+        """
+        with self._lock:
+            if not self._can_fire():
+                return False
+            self.fired += 1
+            return True
+
+    @staticmethod
+    def _start(send) -> Future:
+        """
+        Sends a request on a thread of its own.
+        """
+        future = Future()
+
+        def run():
+            future.set_running_or_notify_cancel()
+            try:
+                future.set_result(send())
+            except BaseException as err:  # pylint: disable=broad-except
+                future.set_exception(err)
+
+        threading.Thread(target=run, name="hedged-request", daemon=True).start()
+        return future
+
+    @staticmethod
+    def _wins(response) -> bool:
+        return 200 <= response.status_code < 300 or response.status_code == 304
+
+    @staticmethod
+    def _discard(future):
+        """
+        Closes the response of a request which lost, once it is answered.
+        """
+        if not future.cancelled() and future.exception() is None and hasattr(future.result(), "close"):
+            future.result().close()
+
+    def request(self, key: str, send):
+        """
+        Sends a request, hedged if it is slow to answer.
+
+        :param key: The URL the latencies are kept for
+        :param send: A callable sending the request and returning its response
+        :return: The first response
+        """
+        with self._lock:
+            self.requests += 1
+            can_fire = self._can_fire()
+        delay = self.get_delay(key)
+        started = time.monotonic()
+
+        if delay is None or not can_fire:
+            response = send()
+        else:
+            futures = [self._start(send)]
+            done, _ = wait(futures, timeout=delay)
+            if not done and self._fire():
+                LOGGER.info("Hedging request to %s unanswered after %.2f seconds", key, delay)
+                futures.append(self._executor.submit(send))
+            response = self._get_first(futures)
+
+        with self._lock:
+            self._latencies[key].append(time.monotonic() - started)
+        return response
+
+    def _get_first(self, futures: list):
+        """
+        Returns the first winning response of the futures. If none wins, the
+        first response is returned, or the error of the first one raised if
+        they all fail.
+        """
+        pending, errors, answered = set(futures), [], []
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in sorted(done, key=futures.index):
+                if future.exception() is not None:
+                    errors.append(future.exception())
+                    continue
+                if not self._wins(future.result()):
+                    answered.append(future)
+                    continue
+                if future is not futures[0]:
+                    with self._lock:
+                        self.won += 1
+                return self._keep(futures, future)
+        if answered:
+            return self._keep(futures, answered[0])
+        raise errors[0]
+
+    def _keep(self, futures: list, kept: Future):
+        """
+        Returns the response of a future and discards the others.
+        """
+        for other in futures:
+            if other is not kept:
+                other.add_done_callback(self._discard)
+        return kept.result()
+
+    def close(self):
+        """
+        Logs the hedge counters and stops the threads once the requests lost are answered.
+        """
+        for outcome, value in (("fired", self.fired), ("won", self.won)):
+            metrics.log(LOGGER, metrics.Point("counter", "hedged_request_count", value, {"outcome": outcome}))
+        self._executor.shutdown(wait=False)
@@ -1,6 +1,7 @@
 """ helper methods required for tap-dixa"""
 import datetime
 import os
+import time
 import pytz
 
 from enum import Enum
@@ -9,14 +10,25 @@ from urllib.parse import parse_qsl, urlparse
 
 from singer import  utils
 
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+EPOCH = datetime.datetime(1970, 1, 1, tzinfo=pytz.UTC)
+
+# Integer fields with these suffixes hold epoch milliseconds
+EPOCH_MS_SUFFIXES = ("_at", "_time")
+
+
 def unix_ms_to_date(timestamp_ms: int) -> str:
     """
-    Converts unix timestamp in milliseconds to ISO 8601 date string.
+    Converts unix timestamp in milliseconds to ISO 8601 date string in UTC.
 
     :param ms: unix timestamp in milliseconds
     :return: ISO 8601 date string
     """
-    return datetime.datetime.fromtimestamp(timestamp_ms / 1000).replace(microsecond=0).isoformat()
+    return unix_ms_to_date_utc(timestamp_ms).replace(tzinfo=None).isoformat()
 
 
 def unix_ms_to_date_utc(timestamp_ms: int) -> datetime.datetime:
@@ -26,16 +38,105 @@ def unix_ms_to_date_utc(timestamp_ms: int) -> datetime.datetime:
     :param timestamp_ms: unix timestamp in milliseconds
     :return: datetime obj
     """
-    return datetime.datetime.fromtimestamp(timestamp_ms / 1000).replace(microsecond=0).replace(tzinfo=pytz.UTC)
+    return (EPOCH + datetime.timedelta(milliseconds=timestamp_ms)).replace(microsecond=0)
+
+def unix_ms_to_date_utc_ms(timestamp_ms: int) -> datetime.datetime:
+    """
+    Converts unix timestamp in milliseconds to timezone aware datetime object,
+    keeping the milliseconds.
+
+    :param timestamp_ms: unix timestamp in milliseconds
+    :return: datetime obj
+    """
+    return EPOCH + datetime.timedelta(milliseconds=timestamp_ms)
 
 def datetime_to_unix_ms(datetime_obj: datetime.datetime) -> int:
     """
-    Converts datetime object to unix timestamp in milliseconds
+    Converts datetime object to unix timestamp in milliseconds. Naive datetime
+    objects are treated as UTC.
 
     :param datetime_obj: A datetime object to convert to unix timestamp
     :return: integer representing unix timestamp in milliseconds
     """
-    return int(datetime_obj.timestamp() * 1000)
+    if datetime_obj.tzinfo is None:
+        datetime_obj = datetime_obj.replace(tzinfo=pytz.UTC)
+    return int((datetime_obj - EPOCH) / datetime.timedelta(milliseconds=1))
+
+
+def unix_ms_to_datetimes(timestamps_ms) -> list:
+    """
+    Converts a sequence of unix timestamps in milliseconds to timezone aware
+    UTC datetime objects in one pass. None values are kept as None.
+
+    :param timestamps_ms: Sequence of unix timestamps in milliseconds
+    :return: list of datetime objects
+    """
+    timestamps_ms = list(timestamps_ms)
+    if numpy is None:
+        return [None if value is None else EPOCH + datetime.timedelta(milliseconds=value)
+                for value in timestamps_ms]
+
+    values, nulls = _to_datetime64(timestamps_ms)
+    return [None if is_null else value.replace(tzinfo=pytz.UTC)
+            for value, is_null in zip(values.astype(object), nulls)]
+
+
+def unix_ms_to_isoformat(timestamps_ms) -> list:
+    """
+    Converts a sequence of unix timestamps in milliseconds to ISO 8601 UTC
+    strings with millisecond precision, e.g. `2021-08-17T06:29:10.735Z`, in
+    one pass. None values are kept as None.
+
+    :param timestamps_ms: Sequence of unix timestamps in milliseconds
+    :return: list of ISO 8601 strings
+    """
+    timestamps_ms = list(timestamps_ms)
+    if numpy is None:
+        return [None if value is None else
+                (EPOCH + datetime.timedelta(milliseconds=value)).strftime("%Y-%m-%dT%H:%M:%S.%f")[:-3] + "Z"
+                for value in timestamps_ms]
+
+    values, nulls = _to_datetime64(timestamps_ms)
+    strings = numpy.datetime_as_string(values, unit="ms", timezone="UTC")
+    return [None if is_null else value for value, is_null in zip(strings.tolist(), nulls)]
+
+
+def add_iso_timestamps(records: list, fields: list):
+    """
+    Adds ISO 8601 copies of epoch millisecond fields to a batch of records,
+    converting one field of the whole batch at a time.
+
+    :param records: list of transformed records
+    :param fields: The epoch millisecond fields to copy
+    """
+    for field in fields:
+        values = unix_ms_to_isoformat(record.get(field) for record in records)
+        for record, value in zip(records, values):
+            record[f"{field}_iso"] = value
+
+
+def _to_datetime64(timestamps_ms: list):
+    """
+    Builds a numpy datetime64[ms] array and its null mask from epoch milliseconds.
+    """
+    nulls = [value is None for value in timestamps_ms]
+    values = numpy.array([0 if value is None else value for value in timestamps_ms], dtype="int64")
+    return values.astype("datetime64[ms]"), nulls
+
+
+def get_epoch_ms_fields(schema: dict) -> list:
+    """
+    Returns the integer fields of a schema holding epoch milliseconds.
+
+    :param schema: The JSON schema of a stream
+    :return: list of field names
+    """
+    fields = []
+    for name, property_schema in schema.get("properties", {}).items():
+        types = property_schema.get("type", [])
+        if "integer" in types and name.endswith(EPOCH_MS_SUFFIXES):
+            fields.append(name)
+    return fields
 
 
 def create_csid_params(csids: Iterator) -> dict:
@@ -130,3 +231,24 @@ class DixaURL(Enum):
 
     EXPORTS = "https://exports.dixa.io"
     INTEGRATIONS = "https://dev.dixa.io"
+
+
+class Deadline:
+    """
+    The point in time a run has to be finished by. Once work is refused for
+    running past it, the deadline stays reached.
+
+    :param max_runtime: The number of seconds from now, None for no deadline
+    """
+
+    def __init__(self, max_runtime: float = None):
+        self.end = time.monotonic() + float(max_runtime) if max_runtime else None
+        self.reached = False
+
+    def allows(self, expected_seconds: float = 0) -> bool:
+        """
+        Returns True if work expected to take `expected_seconds` finishes before the deadline.
+        """
+        if self.end is not None and time.monotonic() + expected_seconds >= self.end:
+            self.reached = True
+        return not self.reached
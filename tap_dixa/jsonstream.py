@@ -0,0 +1,156 @@
+""" Splits a JSON array of objects into raw records"""
+import json
+import re
+
+_DECODER = json.JSONDecoder()
+_WHITESPACE = re.compile(r"[ \t\n\r]*")
+
+# Python types the singer Transformer leaves unchanged, per JSON schema type
+_PASSTHROUGH_TYPES = {
+    "null": type(None),
+    "string": str,
+    "integer": int,
+    "boolean": bool,
+}
+
+
+class RawRecord:
+    """
+    A record along with the exact text it was sent as by the API.
+
+    :param raw: The JSON text of the record
+    :param record: The decoded record
+    """
+
+    __slots__ = ("raw", "record")
+
+    def __init__(self, raw: str, record: dict):
+        self.raw = raw
+        self.record = record
+
+
+def _get_property_check(property_schema: dict):
+    if set(property_schema) - {"type", "items"}:
+        return None
+
+    types = property_schema.get("type", [])
+    types = [types] if isinstance(types, str) else types
+    # With several non null types the Transformer converts values to the first one that fits
+    if len([json_type for json_type in types if json_type != "null"]) != 1:
+        return None
+
+    python_types, items = set(), None
+    for json_type in types:
+        if json_type == "array":
+            items = _get_property_check(property_schema.get("items", {}))
+            if items is None or items[2] is not None:
+                return None
+            python_types.add(list)
+        elif json_type in _PASSTHROUGH_TYPES:
+            python_types.add(_PASSTHROUGH_TYPES[json_type])
+        else:
+            return None
+
+    # The Transformer turns empty strings into null when null is tried first
+    empty_to_null = "string" in types and "null" in types[:types.index("string")]
+    return frozenset(python_types), empty_to_null, items
+
+
+def get_passthrough_checks(schema: dict):
+    """
+    Returns what every property of a schema accepts without the singer
+    Transformer changing the value, or None if some property would be
+    changed whatever its value (formats, numbers converted to float, nested
+    objects).
+
+    :param schema: The stream schema
+    :return: dictionary of property name to check, or None
+    """
+    checks = {}
+    for name, property_schema in schema.get("properties", {}).items():
+        check = _get_property_check(property_schema)
+        if check is None:
+            return None
+        checks[name] = check
+    return checks
+
+
+def _passes(value, check) -> bool:
+    python_types, empty_to_null, items = check
+    value_type = type(value)
+    if value_type not in python_types:
+        return False
+    if value_type is str:
+        return not (empty_to_null and value == "")
+    if value_type is list:
+        return all(_passes(item, items) for item in value)
+    return True
+
+
+def passes_through(record: dict, checks: dict) -> bool:
+    """
+    Returns True if the singer Transformer would return the record unchanged.
+
+    :param record: The decoded record
+    :param checks: The checks returned by `get_passthrough_checks`
+    """
+    for key, value in record.items():
+        check = checks.get(key)
+        if check is None or not _passes(value, check):
+            return False
+    return True
+
+
+def _skip_whitespace(text: str, index: int) -> int:
+    index = _WHITESPACE.match(text, index).end()
+    if index >= len(text):
+        raise ValueError("Unterminated JSON array")
+    return index
+
+
+def iter_raw_records(text: str):
+    """
+    Splits a JSON array of objects into raw records. Every record is decoded
+    by the C scanner of the json module, which also returns where the record
+    ends, so its text can be kept without encoding it again.
+
+    :param text: The JSON document
+    :return: Generator of RawRecord
+    """
+    index = _skip_whitespace(text, 0)
+    if text[index] != "[":
+        raise ValueError(f"Expected a JSON array at position {index}")
+
+    index = _skip_whitespace(text, index + 1)
+    if text[index] == "]":
+        return
+
+    while True:
+        record, end = _DECODER.raw_decode(text, index)
+        if not isinstance(record, dict):
+            raise ValueError(f"Expected an object at position {index}")
+        yield RawRecord(text[index:end], record)
+
+        index = _skip_whitespace(text, end)
+        if text[index] == "]":
+            return
+        if text[index] != ",":
+            raise ValueError(f"Expected ',' or ']' at position {index}")
+        index = _skip_whitespace(text, index + 1)
+
+
+def get_received_records(text: str) -> list:
+    """
+    Returns the complete records at the start of a JSON array that was cut
+    short, such as the part of a response received before the connection broke.
+
+    :param text: The beginning of the JSON document
+    :return: list of RawRecord
+    """
+    records = []
+    try:
+        for raw_record in iter_raw_records(text):
+            records.append(raw_record)
+    except ValueError:
+        pass
+    return records
@@ -0,0 +1,191 @@
+""" Concurrency limits shared by the clients of a sync"""
+import threading
+import time
+from collections import deque
+
+import singer
+from singer import metrics
+from tap_dixa.exceptions import DixaCircuitOpenError
+
+LOGGER = singer.get_logger()
+
+
+class FairSemaphore:
+    """
+    A semaphore handing out its slots in the order they were asked for, so
+    that a thread releasing a slot cannot take it back ahead of threads that
+    are already waiting.
+
+    :param limit: The number of slots
+    """
+
+    def __init__(self, limit: int):
+        if limit < 1:
+            raise ValueError("limit must be at least 1")
+        self.limit = limit
+        self._in_use = 0
+        self._waiters = deque()
+        self._condition = threading.Condition()
+
+    def acquire(self):
+        """
+        Waits for a free slot, after every thread that asked before.
+        """
+        with self._condition:
+            ticket = object()
+            self._waiters.append(ticket)
+            while self._waiters[0] is not ticket or self._in_use >= self.limit:
+                self._condition.wait()
+            self._waiters.popleft()
+            self._in_use += 1
+            # The next waiter may be able to take a slot as well
+            self._condition.notify_all()
+
+    def release(self):
+        """
+        Frees a slot.
+        """
+        with self._condition:
+            self._in_use -= 1
+            self._condition.notify_all()
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *args):
+        self.release()
+
+
+class CircuitBreaker:
+    """
+    Stops requests to a host after `failure_threshold` consecutive failures.
+
+    Once open, requests fail fast with DixaCircuitOpenError. After `cooldown`
+    seconds a single probe request is let through (half open): the circuit
+    closes if it succeeds and opens again if it fails.
+
+    :param name: The host, used in messages
+    :param failure_threshold: The number of consecutive failures opening the circuit
+    :param cooldown: The number of seconds the circuit stays open before a probe
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, name: str, failure_threshold: int = 5, cooldown: float = 300):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.state = self.CLOSED
+        self.failures = 0
+        self._opened_at = None
+        self._lock = threading.Lock()
+
+    def retry_in(self) -> float:
+        """
+        Returns the number of seconds until the next request is let through.
+        """
+        with self._lock:
+            if self.state != self.OPEN:
+                return 0
+            return max(0, self._opened_at + self.cooldown - time.monotonic())
+
+    def get_error(self) -> DixaCircuitOpenError:
+        """
+        Returns the error requests fail fast with.
+        """
+        return DixaCircuitOpenError(f"Circuit of {self.name} is open after {self.failures} consecutive failures",
+                                    retry_in=self.retry_in())
+
+    def before_request(self):
+        """
+        Lets a request through or raises DixaCircuitOpenError.
+        """
+        with self._lock:
+            if self.state == self.CLOSED:
+                return
+            if self.state == self.OPEN and time.monotonic() >= self._opened_at + self.cooldown:
+                self.state = self.HALF_OPEN
+                return
+        raise self.get_error()
+
+    def record(self, success: bool):
+        """
+        Records the outcome of a request let through.
+        """
+        with self._lock:
+            if success:
+                self.state, self.failures = self.CLOSED, 0
+                return
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    LOGGER.warning("Opening the circuit of %s for %s seconds after %s consecutive failures",
+                                   self.name, self.cooldown, self.failures)
+                self.state, self._opened_at = self.OPEN, time.monotonic()
+
+
+class AdaptiveLimiter(FairSemaphore):
+    """
+    A FairSemaphore whose limit adapts to the API, additive increase and
+    multiplicative decrease: the limit grows by one slot per limit requests
+    answered while latency stays within `latency_tolerance` times the lowest
+    recent latency, and is cut by `decrease_factor` when the API answers 429
+    or 503. Only requests sent after the last cut can cut it again.
+
+    The limit is logged as the `concurrency_limit` gauge metric when it
+    changes, tagged with the account in multi-account mode.
+
+    :param max_limit: The highest limit
+    :param min_limit: The lowest limit
+    :param initial_limit: The limit to start from, half the highest limit by default
+    :param decrease_factor: The factor the limit is multiplied by on 429 or 503
+    :param latency_tolerance: How many times the lowest recent latency a latency may be to count as flat
+    :param account: The name of the account whose requests are limited, in multi-account mode
+    """
+
+    THROTTLED_STATUS_CODES = (429, 503)
+
+    def __init__(self, max_limit: int, min_limit: int = 1, initial_limit: int = None, decrease_factor: float = 0.5,
+                 latency_tolerance: float = 2.0, account: str = None):
+        super().__init__(initial_limit or max(min_limit, max_limit // 2))
+        self.account = account
+        self.max_limit = max_limit
+        self.min_limit = min_limit
+        self.decrease_factor = decrease_factor
+        self.latency_tolerance = latency_tolerance
+        self._estimate = float(self.limit)
+        self._latencies = deque(maxlen=100)
+        self._last_decrease = float("-inf")
+
+    def record(self, started: float, finished: float, status_code: int = None):
+        """
+        Adapts the limit to the outcome of a request.
+
+        :param started: The monotonic time the request was sent at
+        :param finished: The monotonic time the request was answered at
+        :param status_code: The status code of the response, None if there was none
+        """
+        with self._condition:
+            if status_code in self.THROTTLED_STATUS_CODES:
+                if started < self._last_decrease:
+                    return
+                self._last_decrease = finished
+                self._estimate = max(self.min_limit, self._estimate * self.decrease_factor)
+            elif status_code is not None:
+                latency = finished - started
+                self._latencies.append(latency)
+                if latency > min(self._latencies) * self.latency_tolerance:
+                    return
+                self._estimate = min(self.max_limit, self._estimate + 1 / self.limit)
+            else:
+                return
+
+            limit = int(self._estimate)
+            if limit != self.limit:
+                self.limit = limit
+                tags = {"account": self.account} if self.account else {}
+                metrics.log(LOGGER, metrics.Point("gauge", "concurrency_limit", limit, tags))
+                self._condition.notify_all()
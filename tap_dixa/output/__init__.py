@@ -0,0 +1,36 @@
+""" Module providing the output writers of tap-dixa"""
+from tap_dixa.exceptions import InvalidConfig
+from .accounts import ACCOUNT_FIELD, AccountWriter, SharedOutput
+from .base import RecordWriter
+from .batch import BatchMessage, BatchWriter
+from .parquet import ParquetWriter
+from .spool import SpoolWriter
+
+
+def get_writer(config: dict) -> RecordWriter:
+    """
+    Builds the writer for the configured `output_mode`. Defaults to stdout,
+    written from a SpoolWriter with the `spool` config.
+
+    :param config: A dictionary containing tap config data
+    :return: A writer instance
+    """
+    output_mode = config.get("output_mode", "stdout")
+
+    if output_mode == "stdout":
+        if config.get("spool"):
+            return SpoolWriter(config.get("spool_dir"),
+                               max_memory_bytes=int(config.get("spool_memory_bytes", 64 * 1024 * 1024)))
+        return RecordWriter()
+
+    if output_mode == "batch":
+        return BatchWriter(config.get("batch_dir", "batches"),
+                           compression=config.get("batch_compression", "gzip"),
+                           max_records=int(config.get("batch_max_records", 100_000)),
+                           max_bytes=int(config.get("batch_max_bytes", 100 * 1024 * 1024)))
+
+    if output_mode == "parquet":
+        return ParquetWriter(config.get("parquet_dir", "parquet"),
+                             compression=config.get("parquet_compression", "snappy"))
+
+    raise InvalidConfig(f"invalid output_mode '{output_mode}'")
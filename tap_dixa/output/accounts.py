@@ -0,0 +1,81 @@
+import copy
+import threading
+
+from .base import RecordWriter
+
+# Field added to every record in multi-account mode, part of the key properties
+ACCOUNT_FIELD = "dixa_account"
+
+
+class SharedOutput:
+    """
+    The writer and state shared by the accounts of a multi-account sync.
+
+    Every account keeps its own state, stored under `accounts.<name>` of the
+    state written out.
+
+    :param writer: The writer all accounts output to
+    :param state: A dictionary representing singer state
+    """
+
+    def __init__(self, writer: RecordWriter, state: dict):
+        self.writer = writer
+        self.state = copy.deepcopy(state) if state else {}
+        self.state.setdefault("accounts", {})
+        self.lock = threading.Lock()
+        self.schemas = set()
+
+    def get_account_state(self, account_name: str) -> dict:
+        """
+        Returns a copy of the state of an account.
+        """
+        with self.lock:
+            return copy.deepcopy(self.state["accounts"].get(account_name, {}))
+
+
+class AccountWriter(RecordWriter):
+    """
+    Writes the messages of a single account to the shared writer, from the
+    thread syncing that account.
+
+    Records are tagged with the account name so that records of different
+    accounts never share a primary key, and STATE messages hold the state of
+    every account.
+
+    :param shared: The output shared by all accounts
+    :param account_name: The name of the account
+    """
+
+    # Serialized records cannot be tagged with the account name
+    serialized_output = False
+
+    def __init__(self, shared: SharedOutput, account_name: str):
+        self.shared = shared
+        self.account_name = account_name
+
+    def write_schema(self, stream_name: str, schema: dict, key_properties: list, bookmark_properties=None):
+        with self.shared.lock:
+            if stream_name in self.shared.schemas:
+                return
+            self.shared.schemas.add(stream_name)
+            schema = {**schema, "properties": {ACCOUNT_FIELD: {"type": "string"}, **schema.get("properties", {})}}
+            self.shared.writer.write_schema(stream_name, schema, [ACCOUNT_FIELD, *key_properties],
+                                            bookmark_properties)
+
+    def write_record(self, stream_name: str, record: dict):
+        with self.shared.lock:
+            self.shared.writer.write_record(stream_name, {ACCOUNT_FIELD: self.account_name, **record})
+
+    def write_state(self, state: dict):
+        with self.shared.lock:
+            self.shared.state["accounts"][self.account_name] = copy.deepcopy(state)
+            self.shared.writer.write_state(copy.deepcopy(self.shared.state))
+
+    def flush(self):
+        with self.shared.lock:
+            self.shared.writer.flush()
+
+    def close(self):
+        """
+        The shared writer is closed once every account is synced.
+        """
@@ -0,0 +1,51 @@
+import sys
+
+import singer
+
+
+class RecordWriter:
+    """
+    Writes singer messages to stdout.
+
+    Streams send every message through a writer so that the output mode
+    can decide when a bookmark is safe to emit.
+    """
+
+    # Whether RECORD messages serialized ahead of time can be written as is
+    serialized_output = True
+
+    def write_schema(self, stream_name: str, schema: dict, key_properties: list, bookmark_properties=None):
+        """
+        Writes a SCHEMA message.
+        """
+        singer.write_schema(stream_name, schema, key_properties, bookmark_properties)
+
+    def write_record(self, stream_name: str, record: dict):
+        """
+        Writes a RECORD message.
+        """
+        singer.write_record(stream_name, record)
+
+    def write_serialized(self, stream_name: str, line: str):
+        """
+        Writes a RECORD message already serialized by `singer.format_message`.
+        """
+        sys.stdout.write(line + "\n")
+        sys.stdout.flush()
+
+    def write_state(self, state: dict):
+        """
+        Writes a STATE message once every record written before it is delivered.
+        """
+        singer.write_state(state)
+
+    def flush(self):
+        """
+        Delivers everything written so far.
+        """
+
+    def close(self):
+        """
+        Flushes and releases the resources held by the writer.
+        """
+        self.flush()
@@ -0,0 +1,162 @@
+import copy
+import datetime
+import gzip
+import os
+
+import simplejson as json
+import singer
+
+from tap_dixa.exceptions import InvalidConfig
+from .base import RecordWriter
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+LOGGER = singer.get_logger()
+
+
+class BatchMessage(singer.Message):
+    """
+    BATCH message referencing one or more files of records.
+
+    :param stream: The name of the stream the records belong to
+    :param manifest: List of file URIs containing the records
+    :param compression: The compression used for the files
+    :param encoding_format: The format of the files
+    """
+
+    def __init__(self, stream: str, manifest: list, compression: str, encoding_format: str = "jsonl"):
+        self.stream = stream
+        self.manifest = manifest
+        self.compression = compression
+        self.encoding_format = encoding_format
+
+    def asdict(self):
+        return {
+            "type": "BATCH",
+            "stream": self.stream,
+            "encoding": {"format": self.encoding_format, "compression": self.compression},
+            "manifest": self.manifest,
+        }
+
+
+class BatchFile:
+    """
+    A compressed JSONL file receiving the records of a single stream.
+
+    Records are written to a temporary file which is renamed once sealed so
+    that targets never pick up a partially written batch.
+    """
+
+    suffixes = {"gzip": ".jsonl.gz", "zstd": ".jsonl.zst"}
+
+    def __init__(self, directory: str, stream_name: str, sequence: int, compression: str):
+        timestamp = datetime.datetime.utcnow().strftime("%Y%m%dT%H%M%S")
+        file_name = f"{stream_name}-{timestamp}-{sequence:05d}{self.suffixes[compression]}"
+        self.path = os.path.abspath(os.path.join(directory, file_name))
+        self.records = 0
+        self.bytes = 0
+
+        if compression == "zstd":
+            self._raw = open(f"{self.path}.part", "wb")
+            self._file = zstandard.ZstdCompressor().stream_writer(self._raw)
+        else:
+            self._raw = None
+            self._file = gzip.open(f"{self.path}.part", "wb")
+
+    def write(self, record: dict):
+        """
+        Appends a record as a single JSON line.
+        """
+        line = (json.dumps(record, use_decimal=True) + "\n").encode("utf-8")
+        self._file.write(line)
+        self.records += 1
+        self.bytes += len(line)
+
+    def seal(self) -> str:
+        """
+        Closes the file and moves it to its final name.
+
+        :return: The URI of the sealed file
+        """
+        self._file.close()
+        if self._raw is not None and not self._raw.closed:
+            self._raw.close()
+        os.replace(f"{self.path}.part", self.path)
+        return f"file://{self.path}"
+
+
+class BatchWriter(RecordWriter):
+    """
+    Writes records into rotating compressed JSONL files and emits a BATCH
+    message for every sealed file.
+
+    STATE messages are held back until the records written before them are
+    part of a sealed file.
+
+    :param directory: The local directory the batch files are written to
+    :param compression: One of `gzip` or `zstd`
+    :param max_records: The number of records after which a file is sealed
+    :param max_bytes: The uncompressed size after which a file is sealed
+    """
+
+    serialized_output = False
+
+    def __init__(self, directory: str, compression: str = "gzip", max_records: int = 100_000,
+                 max_bytes: int = 100 * 1024 * 1024):
+        if compression not in BatchFile.suffixes:
+            raise InvalidConfig(f"invalid batch_compression '{compression}', expected one of "
+                                f"{sorted(BatchFile.suffixes)}")
+        if compression == "zstd" and zstandard is None:
+            raise InvalidConfig("batch_compression 'zstd' requires the zstandard package")
+
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.compression = compression
+        self.max_records = max_records
+        self.max_bytes = max_bytes
+        self._files = {}
+        self._sequence = 0
+        self._pending_state = None
+
+    def write_record(self, stream_name: str, record: dict):
+        batch_file = self._files.get(stream_name)
+        if batch_file is None:
+            self._sequence += 1
+            batch_file = BatchFile(self.directory, stream_name, self._sequence, self.compression)
+            self._files[stream_name] = batch_file
+
+        batch_file.write(record)
+
+        if batch_file.records >= self.max_records or batch_file.bytes >= self.max_bytes:
+            self._seal(stream_name)
+
+    def write_state(self, state: dict):
+        if self._files:
+            self._pending_state = copy.deepcopy(state)
+        else:
+            singer.write_state(state)
+
+    def _seal(self, stream_name: str):
+        """
+        Seals the open file of a stream, emits its BATCH message and any
+        STATE message that is now safe.
+        """
+        batch_file = self._files.pop(stream_name)
+        manifest = [batch_file.seal()]
+        LOGGER.info("Sealed batch file %s with %s records", batch_file.path, batch_file.records)
+        singer.write_message(BatchMessage(stream_name, manifest, self.compression))
+
+        if self._pending_state is not None and not self._files:
+            singer.write_state(self._pending_state)
+            self._pending_state = None
+
+    def flush(self):
+        for stream_name in list(self._files):
+            self._seal(stream_name)
+
+        if self._pending_state is not None:
+            singer.write_state(self._pending_state)
+            self._pending_state = None
@@ -0,0 +1,179 @@
+import datetime
+import os
+
+import simplejson as json
+import singer
+
+from tap_dixa.exceptions import InvalidConfig
+from tap_dixa.helpers import EPOCH_MS_SUFFIXES
+from tap_dixa.records import RecordBuffer, get_json_type
+from .base import RecordWriter
+from .batch import BatchMessage
+
+try:
+    import pyarrow
+    import pyarrow.compute
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+LOGGER = singer.get_logger()
+
+
+def get_arrow_schema(schema: dict):
+    """
+    Builds the Arrow schema for a stream from its JSON schema.
+
+    Integer fields holding epoch milliseconds become UTC timestamps, objects
+    and arrays are kept as JSON encoded strings.
+
+    :param schema: The JSON schema of the stream
+    :return: Tuple of the Arrow schema, the epoch ms field names and the JSON encoded field names
+    """
+    fields, epoch_fields, json_fields = [], set(), set()
+
+    for name, property_schema in schema.get("properties", {}).items():
+        json_type = get_json_type(property_schema)
+
+        if json_type == "integer" and name.endswith(EPOCH_MS_SUFFIXES):
+            arrow_type = pyarrow.timestamp("ms", tz="UTC")
+            epoch_fields.add(name)
+        elif json_type == "integer":
+            arrow_type = pyarrow.int64()
+        elif json_type == "number":
+            arrow_type = pyarrow.float64()
+        elif json_type == "boolean":
+            arrow_type = pyarrow.bool_()
+        elif json_type == "string":
+            arrow_type = pyarrow.string()
+        else:
+            arrow_type = pyarrow.string()
+            json_fields.add(name)
+
+        fields.append(pyarrow.field(name, arrow_type))
+
+    return pyarrow.schema(fields), epoch_fields, json_fields
+
+
+class ParquetWriter(RecordWriter):
+    """
+    Writes the records of every window as Parquet files partitioned by the
+    day of the replication key, and emits a BATCH message referencing them.
+
+    Records are held in a RecordBuffer until the stream writes its bookmark at
+    the end of a window, and are then converted column by column into an Arrow
+    record batch.
+
+    :param directory: The local directory the Parquet dataset is written to
+    :param compression: The Parquet compression codec
+    """
+
+    serialized_output = False
+
+    def __init__(self, directory: str, compression: str = "snappy"):
+        if pyarrow is None:
+            raise InvalidConfig("output_mode 'parquet' requires the pyarrow package")
+
+        self.directory = directory
+        self.compression = compression
+        self._schemas = {}
+        self._json_schemas = {}
+        self._replication_keys = {}
+        self._buffers = {}
+        self._sequence = 0
+
+    def write_schema(self, stream_name: str, schema: dict, key_properties: list, bookmark_properties=None):
+        self._schemas[stream_name] = get_arrow_schema(schema)
+        self._json_schemas[stream_name] = schema
+        if isinstance(bookmark_properties, list):
+            bookmark_properties = bookmark_properties[0] if bookmark_properties else None
+        self._replication_keys[stream_name] = bookmark_properties
+        super().write_schema(stream_name, schema, key_properties, bookmark_properties)
+
+    def write_record(self, stream_name: str, record: dict):
+        buffer = self._buffers.get(stream_name)
+        if buffer is None:
+            buffer = self._buffers[stream_name] = RecordBuffer(self._json_schemas[stream_name])
+        buffer.append(record)
+
+    def write_state(self, state: dict):
+        self.flush()
+        singer.write_state(state)
+
+    def to_record_batch(self, stream_name: str, buffer: RecordBuffer):
+        """
+        Converts buffered records into an Arrow record batch.
+
+        :param stream_name: The name of the stream the records belong to
+        :param buffer: The RecordBuffer holding the records of the window
+        :return: pyarrow.RecordBatch
+        """
+        arrow_schema, epoch_fields, json_fields = self._schemas[stream_name]
+        columns = []
+
+        for field in arrow_schema:
+            values = buffer.column(field.name)
+
+            if field.name in epoch_fields:
+                column = pyarrow.array(values, pyarrow.int64()).cast(field.type)
+            elif field.name in json_fields:
+                column = pyarrow.array([None if value is None else json.dumps(value, use_decimal=True)
+                                        for value in values], field.type)
+            else:
+                column = pyarrow.array(values, field.type)
+
+            columns.append(column)
+
+        return pyarrow.RecordBatch.from_arrays(columns, schema=arrow_schema)
+
+    def _get_days(self, stream_name: str, table):
+        """
+        Returns the day of the replication key of every row as `YYYY-MM-DD`.
+        """
+        replication_key = self._replication_keys.get(stream_name)
+        if replication_key is None or replication_key not in table.column_names:
+            return pyarrow.nulls(table.num_rows, pyarrow.string())
+
+        column = table.column(replication_key)
+        if pyarrow.types.is_timestamp(column.type):
+            return pyarrow.compute.strftime(column, format="%Y-%m-%d")
+
+        return pyarrow.compute.utf8_slice_codeunits(column.cast(pyarrow.string()), 0, 10)
+
+    def _write_partitions(self, stream_name: str, table) -> list:
+        """
+        Writes one Parquet file per replication key day.
+
+        :return: List of the URIs of the written files
+        """
+        timestamp = datetime.datetime.utcnow().strftime("%Y%m%dT%H%M%S")
+        days = self._get_days(stream_name, table)
+        manifest = []
+
+        for day in pyarrow.compute.unique(days).to_pylist():
+            if day is None:
+                mask = pyarrow.compute.is_null(days)
+            else:
+                mask = pyarrow.compute.fill_null(pyarrow.compute.equal(days, day), False)
+
+            partition_dir = os.path.join(self.directory, stream_name, f"date={day or 'unknown'}")
+            os.makedirs(partition_dir, exist_ok=True)
+
+            self._sequence += 1
+            path = os.path.abspath(os.path.join(partition_dir, f"part-{timestamp}-{self._sequence:05d}.parquet"))
+            pyarrow.parquet.write_table(table.filter(mask), f"{path}.part", compression=self.compression)
+            os.replace(f"{path}.part", path)
+            manifest.append(f"file://{path}")
+
+        return manifest
+
+    def flush(self):
+        for stream_name in list(self._buffers):
+            buffer = self._buffers.pop(stream_name)
+            if not buffer:
+                continue
+
+            table = pyarrow.Table.from_batches([self.to_record_batch(stream_name, buffer)])
+            manifest = self._write_partitions(stream_name, table)
+            LOGGER.info("Wrote %s records of %s to %s parquet files", table.num_rows, stream_name, len(manifest))
+            singer.write_message(BatchMessage(stream_name, manifest, self.compression, encoding_format="parquet"))
@@ -0,0 +1,161 @@
+import sys
+import tempfile
+import threading
+from collections import deque
+
+import singer
+
+from .base import RecordWriter
+
+LOGGER = singer.get_logger()
+
+
+class SpoolWriter(RecordWriter):
+    """
+    Writes singer messages to stdout from a background thread, so that a
+    slow target does not hold up the requests of the sync.
+
+    Messages are serialized as they are written and queued in memory up to
+    `max_memory_bytes`. Beyond that they are appended to a log file on disk,
+    until the thread has caught up with it. Messages are delivered in the
+    order they were written, so a STATE message is only delivered after
+    every record written before it.
+
+    :param directory: The directory of the log file, the system temporary directory by default
+    :param max_memory_bytes: The size of the messages queued in memory before spooling to disk
+    :param output: The file messages are delivered to, stdout by default
+    """
+
+    def __init__(self, directory: str = None, max_memory_bytes: int = 64 * 1024 * 1024, output=None):
+        self.max_memory_bytes = max_memory_bytes
+        self.output = output
+        self.spooled_bytes = 0
+        self._memory = deque()
+        self._memory_bytes = 0
+        # Lines between the read and write positions are waiting on disk
+        self._log = tempfile.TemporaryFile(dir=directory, prefix="tap-dixa-spool-")
+        self._read_position = 0
+        self._write_position = 0
+        self._pending = 0
+        self._error = None
+        self._closed = False
+        self._condition = threading.Condition()
+        self._thread = threading.Thread(target=self._drain, name="spool", daemon=True)
+        self._thread.start()
+
+    def _raise_error(self):
+        if self._error is not None:
+            raise self._error
+
+    def _put(self, line: str):
+        """
+        Queues a serialized message, in memory or on disk.
+        """
+        data = line + "\n"
+        with self._condition:
+            self._raise_error()
+            on_disk = self._write_position > self._read_position
+            if not on_disk and self._memory_bytes + len(data) <= self.max_memory_bytes:
+                self._memory.append(data)
+                self._memory_bytes += len(data)
+            else:
+                if not on_disk:
+                    LOGGER.info("Output is behind by %s bytes, spooling to disk", self._memory_bytes)
+                encoded = data.encode("utf-8")
+                self._log.seek(self._write_position)
+                self._log.write(encoded)
+                self._write_position += len(encoded)
+                self.spooled_bytes += len(encoded)
+            self._pending += 1
+            self._condition.notify_all()
+
+    def _take(self) -> list:
+        """
+        Takes the oldest queued messages, from memory first as every message
+        on disk was written after them. Waits for messages to be queued.
+
+        :return: list of lines, empty once the writer is closed and drained
+        """
+        with self._condition:
+            while not self._memory and self._read_position == self._write_position and not self._closed:
+                self._condition.wait()
+
+            if self._memory:
+                lines = list(self._memory)
+                self._memory.clear()
+                self._memory_bytes = 0
+                return lines
+
+            lines = []
+            self._log.seek(self._read_position)
+            while self._read_position < self._write_position and len(lines) < 10_000:
+                line = self._log.readline()
+                self._read_position += len(line)
+                lines.append(line.decode("utf-8"))
+            if lines and self._read_position == self._write_position:
+                # Caught up, the next messages are queued in memory again
+                self._read_position = self._write_position = 0
+                self._log.seek(0)
+                self._log.truncate()
+            return lines
+
+    def _drain(self):
+        """
+        Delivers the queued messages until the writer is closed.
+        """
+        while True:
+            lines = self._take()
+            if not lines:
+                return
+            try:
+                output = self.output or sys.stdout
+                output.write("".join(lines))
+                output.flush()
+            except Exception as err:  # pylint: disable=broad-except
+                with self._condition:
+                    self._error = err
+                    self._condition.notify_all()
+                return
+            with self._condition:
+                self._pending -= len(lines)
+                self._condition.notify_all()
+
+    def write_schema(self, stream_name: str, schema: dict, key_properties: list, bookmark_properties=None):
+        self._put(singer.format_message(singer.SchemaMessage(
+            stream=stream_name, schema=schema, key_properties=key_properties, bookmark_properties=bookmark_properties)))
+
+    def write_record(self, stream_name: str, record: dict):
+        self._put(singer.format_message(singer.RecordMessage(stream=stream_name, record=record)))
+
+    def write_serialized(self, stream_name: str, line: str):
+        self._put(line)
+
+    def write_state(self, state: dict):
+        """
+        Queues a STATE message, delivered after every record written before it.
+        """
+        self._put(singer.format_message(singer.StateMessage(value=state)))
+
+    def flush(self):
+        """
+        Waits until every message written so far is delivered.
+        """
+        with self._condition:
+            while self._pending and self._error is None:
+                self._condition.wait()
+            self._raise_error()
+
+    def close(self):
+        """
+        Delivers the remaining messages and removes the log file.
+        """
+        try:
+            self.flush()
+        finally:
+            with self._condition:
+                self._closed = True
+                self._condition.notify_all()
+            self._thread.join()
+            self._log.close()
+            if self.spooled_bytes:
+                LOGGER.info("Spooled %s bytes of output to disk", self.spooled_bytes)
@@ -0,0 +1,58 @@
+""" Tuning of the number of records requested per page"""
+
+
+class PageSizeTuner:
+    """
+    Tunes the number of records requested per page from the latency and
+    payload size of the pages received, aiming for pages answered in about
+    `target_seconds` and no larger than `max_bytes`, within `min_size` and
+    `max_size`. A page grows at most twice the size of the previous one, and
+    a page which timed out halves the size.
+
+    :param size: The size of the first page
+    :param min_size: The smallest page size
+    :param max_size: The largest page size
+    :param target_seconds: The number of seconds a page should take to be answered
+    :param max_bytes: The largest payload a page should have
+    """
+
+    def __init__(self, size: int, min_size: int = 100, max_size: int = 10_000, target_seconds: float = 10,
+                 max_bytes: int = 50 * 1024 * 1024):
+        if not 1 <= min_size <= max_size:
+            raise ValueError("page sizes must be at least 1 with the minimum below the maximum")
+        self.min_size = min_size
+        self.max_size = max_size
+        self.target_seconds = target_seconds
+        self.max_bytes = max_bytes
+        self.size = self._bound(size)
+
+    def _bound(self, size: float) -> int:
+        return int(min(self.max_size, max(self.min_size, size)))
+
+    @property
+    def can_shrink(self) -> bool:
+        return self.size > self.min_size
+
+    def record_page(self, records: int, seconds: float, payload_bytes: int) -> int:
+        """
+        Tunes the size from a page received.
+
+        :param records: The number of records of the page
+        :param seconds: The number of seconds the page took to be answered
+        :param payload_bytes: The size of the page payload
+        :return: The size of the next page
+        """
+        if records:
+            size = self.target_seconds / max(seconds / records, 1e-6)
+            size = min(size, self.max_bytes / max(payload_bytes / records, 1), self.size * 2)
+            self.size = self._bound(size)
+        return self.size
+
+    def record_timeout(self) -> int:
+        """
+        Halves the size after a page timed out.
+
+        :return: The size of the next page
+        """
+        self.size = self._bound(self.size / 2)
+        return self.size
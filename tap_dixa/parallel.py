@@ -0,0 +1,92 @@
+""" Process pool transforming and serializing records outside the main process"""
+import multiprocessing
+
+import singer
+from singer import Transformer
+
+from tap_dixa.helpers import add_iso_timestamps, chunks
+
+# Per-process state of a pool worker, set by _init_worker
+_WORKER = {}
+
+
+def _init_worker(stream_name: str, stream_schema: dict, stream_metadata: dict, replication_key: str,
+                 iso_fields: list):
+    _WORKER.update({
+        "stream_name": stream_name,
+        "stream_schema": stream_schema,
+        "stream_metadata": stream_metadata,
+        "replication_key": replication_key,
+        "iso_fields": iso_fields,
+        "transformer": Transformer(),
+    })
+
+
+def _transform_chunk(records: list) -> list:
+    """
+    Transforms a chunk of records and serializes them as RECORD messages.
+
+    :param records: list of raw records
+    :return: list of (replication key value, serialized RECORD message) tuples
+    """
+    transformer = _WORKER["transformer"]
+    transformed = [transformer.transform(record, _WORKER["stream_schema"], _WORKER["stream_metadata"])
+                   for record in records]
+
+    add_iso_timestamps(transformed, _WORKER["iso_fields"])
+
+    replication_key = _WORKER["replication_key"]
+    return [(record[replication_key],
+             singer.format_message(singer.RecordMessage(stream=_WORKER["stream_name"], record=record)))
+            for record in transformed]
+
+
+class TransformPool:
+    """
+    Ships chunks of raw records to worker processes which transform them and
+    serialize them to RECORD messages, so the main process only has to write
+    the output and track the bookmark.
+
+    Workers are not forked from the tap, which runs threads whose locks a
+    forked child would inherit in whatever state they were, but started
+    from a fork server, or spawned where there is none.
+
+    :param workers: The number of worker processes
+    :param stream_name: The name of the stream
+    :param stream_schema: A dictionary containing the stream schema
+    :param stream_metadata: A dictionnary containing stream metadata
+    :param replication_key: The replication key returned along each message
+    :param iso_fields: The epoch millisecond fields that get an ISO copy
+    :param chunk_size: The number of records sent to a worker at once
+    """
+
+    def __init__(self, workers: int, stream_name: str, stream_schema: dict, stream_metadata: dict,
+                 replication_key: str, iso_fields: list = None, chunk_size: int = 500):
+        self.chunk_size = chunk_size
+        start_method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+        self._pool = multiprocessing.get_context(start_method).Pool(
+            workers, initializer=_init_worker,
+            initargs=(stream_name, stream_schema, stream_metadata, replication_key, iso_fields or []))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def map(self, records: list):
+        """
+        Transforms and serializes records on the worker processes.
+
+        :param records: list of raw records
+        :return: Generator of (replication key value, serialized RECORD message) tuples, in input order
+        """
+        for results in self._pool.imap(_transform_chunk, chunks(records, self.chunk_size)):
+            yield from results
+
+    def close(self):
+        """
+        Stops the worker processes.
+        """
+        self._pool.terminate()
+        self._pool.join()
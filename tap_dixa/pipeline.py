@@ -0,0 +1,206 @@
+""" Staged processing of windows with a pool of threads per stage"""
+import queue
+import threading
+import time
+
+import singer
+from singer import metrics
+
+LOGGER = singer.get_logger()
+
+_STOP = object()
+
+
+class Stage:
+    """
+    A step of a pipeline, run by `workers` threads reading from a queue of
+    at most `queue_size` items.
+
+    :param name: The name of the stage, used in metrics
+    :param make_worker: Returns the callable processing an item, called once
+        per thread so that each thread can hold objects of its own
+    :param workers: The number of threads
+    :param queue_size: The number of items waiting for the stage
+    """
+
+    def __init__(self, name: str, make_worker, workers: int = 1, queue_size: int = 4):
+        if workers < 1:
+            raise ValueError(f"stage {name} needs at least one worker")
+        self.name = name
+        self.make_worker = make_worker
+        self.workers = workers
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.busy_seconds = 0.0
+        self.items = 0
+        self.depth_samples = 0
+        self.depth_total = 0
+        self.max_depth = 0
+        self._lock = threading.Lock()
+
+    def sample_depth(self):
+        depth = self.queue.qsize()
+        with self._lock:
+            self.depth_samples += 1
+            self.depth_total += depth
+            self.max_depth = max(self.max_depth, depth)
+
+    def add_busy(self, seconds: float):
+        with self._lock:
+            self.busy_seconds += seconds
+            self.items += 1
+
+    def get_stats(self, elapsed: float) -> dict:
+        """
+        Returns the utilization of the stage threads and the depth of its queue.
+        """
+        return {"workers": self.workers, "items": self.items,
+                "utilization": round(self.busy_seconds / (self.workers * elapsed), 3) if elapsed else 0.0,
+                "mean_queue_depth": round(self.depth_total / self.depth_samples, 2) if self.depth_samples else 0.0,
+                "max_queue_depth": self.max_depth}
+
+
+class Pipeline:
+    """
+    Runs items through stages joined by bounded queues and yields the
+    results in the order of the items. The consumer of the results is the
+    last stage, named `sink_name`, and runs in the calling thread.
+
+    The utilization of every stage and the depth of its queue are logged as
+    the `pipeline_utilization` and `pipeline_queue_depth` metrics at the end
+    of a run.
+
+    :param stages: The stages, in order
+    :param sink_name: The name of the stage consuming the results
+    :param queue_size: The number of results waiting for the consumer
+    :param tags: The tags of the metrics
+    """
+
+    def __init__(self, stages: list, sink_name: str = "write", queue_size: int = 4, tags: dict = None):
+        self.stages = stages
+        self.sink = Stage(sink_name, None, queue_size=queue_size)
+        self.tags = tags or {}
+        self.stats = {}
+        self._stopped = threading.Event()
+
+    def stop(self):
+        """
+        Stops the pipeline. The items in progress are dropped and the run ends
+        once the consumer asks for the next result.
+        """
+        self._stopped.set()
+
+    def _put(self, stage_queue: queue.Queue, item):
+        """
+        Puts an item in a queue unless the pipeline is stopped while waiting for room.
+        """
+        while not self._stopped.is_set():
+            try:
+                stage_queue.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    def _get(self, stage: Stage):
+        stage.sample_depth()
+        while not self._stopped.is_set():
+            try:
+                return stage.queue.get(timeout=0.1)
+            except queue.Empty:
+                continue
+        return _STOP
+
+    def _feed(self, items):
+        first = self.stages[0]
+        try:
+            for sequence, item in enumerate(items):
+                if self._stopped.is_set():
+                    return
+                self._put(first.queue, (sequence, item, None))
+        except Exception as err:  # pylint: disable=broad-except
+            self._put(first.queue, (-1, None, err))
+        for _ in range(first.workers):
+            self._put(first.queue, _STOP)
+
+    def _run_stage(self, index: int, state: dict):
+        """
+        Processes the items of a stage and hands them over to the next stage in order.
+        """
+        stage = self.stages[index]
+        next_stage = self.stages[index + 1] if index + 1 < len(self.stages) else self.sink
+        worker = stage.make_worker()
+
+        while True:
+            entry = self._get(stage)
+            if entry is _STOP:
+                break
+            sequence, item, error = entry
+            if error is None:
+                started = time.monotonic()
+                try:
+                    item = worker(item)
+                except Exception as err:  # pylint: disable=broad-except
+                    item, error = None, err
+                stage.add_busy(time.monotonic() - started)
+
+            if error is not None:
+                # Errors skip the ordering so the consumer raises them right away
+                self._put(next_stage.queue, (sequence, None, error))
+                continue
+
+            with state["lock"]:
+                state["done"][sequence] = item
+                while state["next"] in state["done"]:
+                    self._put(next_stage.queue, (state["next"], state["done"].pop(state["next"]), None))
+                    state["next"] += 1
+
+        with state["lock"]:
+            state["running"] -= 1
+            if state["running"] == 0:
+                for _ in range(next_stage.workers):
+                    self._put(next_stage.queue, _STOP)
+
+    def run(self, items):
+        """
+        Runs the items through the stages.
+
+        :param items: An iterable of items
+        :return: Generator of the results of the last stage, in the order of the items
+        """
+        started = time.monotonic()
+        threads = [threading.Thread(target=self._feed, args=(items,), name="pipeline-feed", daemon=True)]
+        for index, stage in enumerate(self.stages):
+            state = {"lock": threading.Lock(), "done": {}, "next": 0, "running": stage.workers}
+            threads.extend(threading.Thread(target=self._run_stage, args=(index, state),
+                                            name=f"pipeline-{stage.name}-{i}", daemon=True)
+                           for i in range(stage.workers))
+        for thread in threads:
+            thread.start()
+
+        try:
+            while True:
+                entry = self._get(self.sink)
+                if entry is _STOP:
+                    break
+                _, item, error = entry
+                if error is not None:
+                    raise error
+                consumer_started = time.monotonic()
+                yield item
+                self.sink.add_busy(time.monotonic() - consumer_started)
+        finally:
+            self._stopped.set()
+            for thread in threads:
+                thread.join()
+            self.log_stats(time.monotonic() - started)
+
+    def log_stats(self, elapsed: float):
+        """
+        Logs the utilization and queue depth of every stage.
+        """
+        for stage in self.stages + [self.sink]:
+            self.stats[stage.name] = stage.get_stats(elapsed)
+            tags = {**self.tags, "stage": stage.name}
+            metrics.log(LOGGER, metrics.Point("gauge", "pipeline_utilization", self.stats[stage.name]["utilization"],
+                                              tags))
+            metrics.log(LOGGER, metrics.Point("gauge", "pipeline_queue_depth",
+                                              self.stats[stage.name]["mean_queue_depth"], tags))
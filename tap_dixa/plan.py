@@ -0,0 +1,136 @@
+""" Dry run estimating the volume and duration of a sync"""
+import json
+import math
+import sys
+import time
+
+import singer
+from tap_dixa.client import Client
+from tap_dixa.decoders import get_decoder
+from tap_dixa.streams import STREAMS
+from tap_dixa.streams.abstracts import IncrementalStream
+
+LOGGER = singer.get_logger()
+
+
+def get_sample_indexes(window_count: int, samples: int) -> list:
+    """
+    Returns the indexes of `samples` windows spread evenly over the windows,
+    from the first to the last.
+    """
+    if window_count <= samples:
+        return list(range(window_count))
+    return sorted({round(i * (window_count - 1) / (samples - 1)) for i in range(samples)}) if samples > 1 else [0]
+
+
+def isoformat(value) -> str:
+    """
+    Formats a window boundary.
+    """
+    return singer.utils.strftime(value)
+
+
+def plan_stream(stream_obj: IncrementalStream, state: dict, config: dict, samples: int) -> dict:
+    """
+    Estimates the records, bytes, requests and duration of syncing an
+    incremental stream by requesting a sample of its remaining windows and
+    extrapolating them to every window.
+
+    :param stream_obj: The stream
+    :param state: A dictionary representing singer state
+    :param config: A dictionary containing tap config data
+    :param samples: The number of windows requested
+    :return: The plan of the stream
+    """
+    windows = stream_obj.get_remaining_windows(state, config)
+    page_size = int(config.get("page_size", 10_000))
+    sampled, by_records, full_page = [], False, False
+
+    for index in get_sample_indexes(len(windows), samples):
+        window_start, window_end = windows[index]
+        started = time.monotonic()
+        records, content_bytes, requests = stream_obj.request_sample(window_start, window_end, config)
+        sampled.append({"window": [isoformat(window_start), isoformat(window_end)], "records": records,
+                        "bytes": content_bytes, "seconds": round(time.monotonic() - started, 3)})
+        by_records = by_records or requests is None
+        full_page = full_page or (requests is None and records >= page_size)
+
+    plan = {"window_count": len(windows), "interval_hours": stream_obj.get_interval(), "sampled_windows": sampled}
+    if windows:
+        plan["first_window"] = [isoformat(value) for value in windows[0]]
+        plan["last_window"] = [isoformat(value) for value in windows[-1]]
+    if not sampled:
+        plan.update({"estimated_records": 0, "estimated_bytes": 0, "estimated_api_calls": 0,
+                     "estimated_seconds": 0})
+        return plan
+
+    def extrapolate(key):
+        return sum(sample[key] for sample in sampled) / len(sampled) * len(windows)
+
+    records = extrapolate("records")
+    if by_records:
+        api_calls = max(1, math.ceil(records / page_size))
+        seconds_per_call = sum(sample["seconds"] for sample in sampled) / len(sampled)
+        seconds = api_calls * seconds_per_call
+    else:
+        api_calls, seconds = len(windows), extrapolate("seconds")
+
+    plan.update({"estimated_records": round(records), "estimated_bytes": round(extrapolate("bytes")),
+                 "estimated_api_calls": api_calls, "estimated_seconds": round(seconds, 1)})
+    if full_page:
+        # A full first page only gives a lower bound of the records of its window
+        plan["lower_bound"] = True
+    return plan
+
+
+def plan_streams(client: Client, config: dict, state: dict, catalog, samples: int = 3) -> dict:
+    """
+    Estimates the sync of every selected stream. Full table streams are
+    listed without an estimate as they are synced in full on every run.
+
+    :return: The plan of every stream and their totals
+    """
+    streams, totals = {}, {"estimated_records": 0, "estimated_bytes": 0, "estimated_api_calls": 0,
+                           "estimated_seconds": 0}
+    for stream in catalog.get_selected_streams(state):
+        stream_obj = STREAMS[stream.tap_stream_id](client)
+        if not isinstance(stream_obj, IncrementalStream):
+            streams[stream.tap_stream_id] = {"replication_method": stream_obj.replication_method}
+            continue
+
+        LOGGER.info("Sampling %s windows of stream: %s", samples, stream.tap_stream_id)
+        stream_plan = plan_stream(stream_obj, state, config, samples)
+        streams[stream.tap_stream_id] = {"replication_method": stream_obj.replication_method, **stream_plan}
+        for key in totals:
+            totals[key] += stream_plan[key]
+
+    totals["estimated_seconds"] = round(totals["estimated_seconds"], 1)
+    return {"generated_at": isoformat(singer.utils.now()), "streams": streams, "totals": totals}
+
+
+def plan(config: dict, state: dict, catalog, output=None):
+    """
+    Prints the estimated plan of a sync as JSON, without syncing any record.
+
+    In multi-account mode, every account is planned with its own token and state.
+    """
+    output = output or sys.stdout
+    samples = int(config.get("plan_samples", 3))
+    decoder = get_decoder(config.get("json_decoder", "auto"))
+    if config.get("accounts"):
+        result = {"accounts": {}}
+        for account in config["accounts"]:
+            client = Client(account["api_token"], decoder=decoder)
+            result["accounts"][account["name"]] = plan_streams(
+                client, {**config, **account}, (state.get("accounts") or {}).get(account["name"], {}), catalog,
+                samples)
+            client.close()
+    else:
+        client = Client(config.get("api_token"), decoder=decoder)
+        result = plan_streams(client, config, state, catalog, samples)
+        client.close()
+
+    json.dump(result, output, indent=2)
+    output.write("\n")
+    output.flush()
+    return result
@@ -0,0 +1,147 @@
+""" Volume aware planning of the time windows requested from the Dixa API"""
+import datetime
+import math
+from collections import Counter
+
+from tap_dixa.helpers import EPOCH, unix_ms_to_date_utc_ms
+
+DAY_MS = 24 * 60 * 60 * 1000
+HOUR_MS = 60 * 60 * 1000
+MIN_WINDOW_MS = 60 * 1000
+
+
+class VolumeHistogram:
+    """
+    Per-day record counts of a stream, kept in state as the first day and a
+    list of counts, e.g. `{"origin": "2021-08-01", "counts": [12, 0, 40]}`.
+
+    :param origin: The day number (days since the epoch) of the first count
+    :param counts: The record count of each day starting at origin, None if unknown
+    """
+
+    def __init__(self, origin: int = None, counts: list = None):
+        self.origin = origin
+        self.counts = counts or []
+        # Records, milliseconds covered and end of the last window of every day observed since loaded
+        self._observed = {}
+
+    @classmethod
+    def from_state(cls, value: dict):
+        """
+        Builds the histogram from its state representation.
+        """
+        if not value:
+            return cls()
+        origin = datetime.date.fromisoformat(value["origin"]) - EPOCH.date()
+        return cls(origin.days, list(value["counts"]))
+
+    def to_state(self) -> dict:
+        """
+        Returns the state representation of the histogram.
+        """
+        if self.origin is None:
+            return {}
+        origin = EPOCH.date() + datetime.timedelta(days=self.origin)
+        return {"origin": origin.isoformat(), "counts": self.counts}
+
+    def __bool__(self):
+        return any(count is not None for count in self.counts)
+
+    def get(self, day: int):
+        """
+        Returns the record count of a day, None if the day was never synced.
+        """
+        if self.origin is None or not 0 <= day - self.origin < len(self.counts):
+            return None
+        return self.counts[day - self.origin]
+
+    def _set(self, day: int, count: int):
+        if self.origin is None:
+            self.origin = day
+        if day < self.origin:
+            self.counts = [None] * (self.origin - day) + self.counts
+            self.origin = day
+        index = day - self.origin
+        if index >= len(self.counts):
+            self.counts.extend([None] * (index - len(self.counts) + 1))
+        self.counts[index] = count
+
+    def record_window(self, window_start: int, window_end: int, timestamps: list):
+        """
+        Records the records of a completed window.
+
+        The count of a day is replaced whenever the day is observed again, so
+        that re-syncs, under `lookback_days` for instance, do not count
+        records twice. The windows of a sync covering parts of the same day
+        add up, and a day only partly covered is extrapolated to a whole day
+        from the part covered, at least an hour.
+
+        :param window_start: The window start as epoch milliseconds
+        :param window_end: The window end as epoch milliseconds
+        :param timestamps: The replication key value of every record of the window
+        """
+        observed = Counter(timestamp // DAY_MS for timestamp in timestamps if timestamp is not None)
+        first_day, last_day = window_start // DAY_MS, window_end // DAY_MS
+
+        for day in range(first_day, last_day + 1):
+            covered = min(window_end, (day + 1) * DAY_MS - 1) - max(window_start, day * DAY_MS) + 1
+            records, covered_before, last_end = self._observed.get(day, (0, 0, None))
+            # A window overlapping the ones observed before observes the day again
+            if last_end is not None and window_start > last_end:
+                records, covered = records + observed.get(day, 0), covered + covered_before
+            else:
+                records = observed.get(day, 0)
+            self._observed[day] = (records, covered, window_end)
+            self._set(day, records if covered >= DAY_MS else round(records * DAY_MS / max(covered, HOUR_MS)))
+
+
+def plan_windows(start_date: int, end_date: int, histogram: VolumeHistogram, target_records: int,
+                 default_hours: int, max_hours: int):
+    """
+    Cuts the time between two dates into windows of roughly `target_records`
+    expected records each, assuming records are spread evenly within a day.
+
+    Days without history are expected to hold `target_records` per
+    `default_hours`, which gives the uniform windows of the configured interval.
+
+    :param start_date: The start of the first window as epoch milliseconds
+    :param end_date: The end of the last window as epoch milliseconds
+    :param histogram: The VolumeHistogram of the stream
+    :param target_records: The expected number of records per window
+    :param default_hours: The window length for periods without history
+    :param max_hours: The maximum window length
+    :return: Generator of (window_start, window_end) datetime tuples
+    """
+    # Planned from the counts known before the sync, not from the windows it records on the way
+    histogram = VolumeHistogram(histogram.origin, list(histogram.counts))
+    default_rate = target_records / (default_hours * 60 * 60 * 1000)
+    max_ms = max_hours * 60 * 60 * 1000
+    window_start = position = start_date
+    expected = 0.0
+
+    while position < end_date:
+        day = position // DAY_MS
+        day_end = min((day + 1) * DAY_MS, end_date)
+        count = histogram.get(day)
+        rate = default_rate if count is None else count / DAY_MS
+        max_end = window_start + max_ms
+
+        cut = position + math.ceil((target_records - expected) / rate) if rate > 0 else math.inf
+        cut = max(cut, window_start + MIN_WINDOW_MS)
+
+        if cut <= day_end and cut <= max_end:
+            window_end = cut
+        elif max_end <= day_end:
+            window_end = max_end
+        else:
+            expected += rate * (day_end - position)
+            position = day_end
+            continue
+
+        window_end = min(window_end, end_date)
+        yield unix_ms_to_date_utc_ms(window_start), unix_ms_to_date_utc_ms(window_end)
+        window_start = position = window_end + 1
+        expected = 0.0
+
+    if window_start <= end_date:
+        yield unix_ms_to_date_utc_ms(window_start), unix_ms_to_date_utc_ms(end_date)
@@ -0,0 +1,146 @@
+""" Compact in-memory representation of buffered records"""
+from array import array
+
+# State of a field in a buffered record
+PRESENT, NULL, MISSING = 0, 1, 2
+
+
+def get_json_type(property_schema: dict):
+    """
+    Returns the single non-null JSON schema type of a property, or None when
+    the property allows several types.
+
+    :param property_schema: The JSON schema of a property
+    :return: The JSON schema type string or None
+    """
+    types = property_schema.get("type", [])
+    if isinstance(types, str):
+        types = [types]
+    types = [json_type for json_type in types if json_type != "null"]
+    return types[0] if len(types) == 1 else None
+
+
+class RecordBuffer:
+    """
+    Column oriented buffer for records that share a JSON schema.
+
+    Integer fields are stored in typed arrays and short strings are interned
+    per buffer, so repeated values such as `direction` or `initial_channel`
+    are held once. Every field keeps a state byte per record to tell a null
+    value apart from a missing key, which lets records be rebuilt unchanged.
+    Keys that are not part of the schema are kept aside per record.
+
+    :param schema: The JSON schema of the stream
+    :param intern_max_length: Strings up to this length are interned
+    """
+
+    def __init__(self, schema: dict, intern_max_length: int = 64):
+        self.fields = list(schema.get("properties", {}))
+        self.intern_max_length = intern_max_length
+        self._field_set = set(self.fields)
+        self._columns = {}
+        self._states = {}
+        self._interned = {}
+        self._extras = {}
+        self._length = 0
+
+        for name, property_schema in schema.get("properties", {}).items():
+            json_type = get_json_type(property_schema)
+            self._columns[name] = array("q") if json_type == "integer" else []
+            self._states[name] = bytearray()
+
+    def __len__(self):
+        return self._length
+
+    def _intern(self, value: str) -> str:
+        if len(value) > self.intern_max_length:
+            return value
+        return self._interned.setdefault(value, value)
+
+    def _append_value(self, name: str, value):
+        column = self._columns[name]
+
+        if isinstance(column, array):
+            try:
+                column.append(value)
+                return
+            except (TypeError, OverflowError):
+                # The API returned something other than a 64 bit integer,
+                # fall back to a plain list for this field.
+                column = self._columns[name] = list(column)
+
+        if isinstance(value, str):
+            value = self._intern(value)
+        column.append(value)
+
+    def append(self, record: dict):
+        """
+        Adds a record to the buffer.
+
+        :param record: The record dictionary
+        """
+        for name in self.fields:
+            states = self._states[name]
+            if name not in record:
+                states.append(MISSING)
+                self._append_value(name, 0 if isinstance(self._columns[name], array) else None)
+            elif record[name] is None:
+                states.append(NULL)
+                self._append_value(name, 0 if isinstance(self._columns[name], array) else None)
+            else:
+                states.append(PRESENT)
+                self._append_value(name, record[name])
+
+        if len(record) > len(self.fields) or not self._field_set.issuperset(record):
+            self._extras[self._length] = {key: value for key, value in record.items()
+                                          if key not in self._field_set}
+
+        self._length += 1
+
+    def extend(self, records):
+        """
+        Adds every record of an iterable to the buffer.
+        """
+        for record in records:
+            self.append(record)
+
+    def __getitem__(self, index: int) -> dict:
+        if index < 0:
+            index += self._length
+        if not 0 <= index < self._length:
+            raise IndexError("record index out of range")
+
+        record = {}
+        for name in self.fields:
+            state = self._states[name][index]
+            if state == PRESENT:
+                record[name] = self._columns[name][index]
+            elif state == NULL:
+                record[name] = None
+
+        if index in self._extras:
+            record.update(self._extras[index])
+
+        return record
+
+    def __iter__(self):
+        return self.records()
+
+    def records(self):
+        """
+        Rebuilds the buffered records as dictionaries.
+
+        :return: Generator of record dictionaries
+        """
+        for index in range(self._length):
+            yield self[index]
+
+    def column(self, name: str) -> list:
+        """
+        Returns the values of a field for every record, None when null or missing.
+
+        :param name: The field name
+        :return: list of values
+        """
+        return [None if state != PRESENT else value
+                for state, value in zip(self._states[name], self._columns[name])]
@@ -1,9 +1,17 @@
 from .activitylogs import ActivityLogs
+from .agents import Agents
 from .conversations import Conversations
 from .messages import Messages
+from .queues import Queues
+from .tags import Tags
+from .teams import Teams
 
 STREAMS = {
     "activity_logs": ActivityLogs,
+    "agents": Agents,
     "conversations": Conversations,
     "messages": Messages,
-}
\ No newline at end of file
+    "queues": Queues,
+    "tags": Tags,
+    "teams": Teams,
+}
@@ -1,19 +1,39 @@
 import datetime
+import functools
+import hashlib
+import time
 from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
 
+import simplejson as json
 import singer
-from tap_dixa.client import Client
-from tap_dixa.exceptions import InvalidInterval
-from tap_dixa.helpers import Interval,datetime_to_unix_ms
+from singer import metadata
+from tap_dixa.client import Client, ResumableWindow
+from tap_dixa.exceptions import InvalidConfig, InvalidInterval
+from tap_dixa.fingerprints import FingerprintIndex
+from tap_dixa.helpers import (Deadline, DixaURL, Interval, add_iso_timestamps, datetime_to_unix_ms, get_epoch_ms_fields,
+                              get_next_page_key, unix_ms_to_date_utc, unix_ms_to_date_utc_ms, unix_ms_to_isoformat)
+from tap_dixa.jsonstream import get_passthrough_checks, iter_raw_records, passes_through
+from tap_dixa.output import RecordWriter
+from tap_dixa.parallel import TransformPool
+from tap_dixa.pipeline import Pipeline, Stage
+from tap_dixa.planner import VolumeHistogram, plan_windows
+from tap_dixa.records import RecordBuffer
 
 LOGGER = singer.get_logger()
 
+# The longest window checked for records while probing for the start of the history
+PROBE_MAX_DAYS = 90
+
 
 class BaseStream(ABC):
     """
     A base class representing singer streams.
 
     :param client: The API client used extract records from the external source
+    :param writer: The writer used to output singer messages
+    :param deadline: The deadline the sync has to stop fetching by
+    :param fingerprint_index: Skips records re-synced unchanged, see FingerprintIndex
     """
 
     tap_stream_id = None
@@ -25,8 +45,12 @@ class BaseStream(ABC):
     endpoint = None
     base_url = None
 
-    def __init__(self, client: Client):
+    def __init__(self, client: Client, writer: RecordWriter = None, deadline: Deadline = None,
+                 fingerprint_index: FingerprintIndex = None):
         self.client = client
+        self.writer = writer or RecordWriter()
+        self.deadline = deadline or Deadline()
+        self.fingerprint_index = fingerprint_index
 
     @abstractmethod
     def get_records(self, start_date: datetime.datetime = None, config: dict = {}) -> list:
@@ -40,6 +64,27 @@ class BaseStream(ABC):
         """
         raise NotImplementedError("Child classes of BaseStream require implementation")
 
+    def within_deadline(self, items):
+        """
+        Yields items, such as windows or pages, until the time left before the
+        deadline is shorter than the time it took to process the previous one.
+
+        :param items: An iterable of items
+        :return: Generator of the items
+        """
+        iterator, last_duration = iter(items), 0
+        while self.deadline.allows(last_duration):
+            # Timed from before the next item as producing it may request a page
+            started = time.monotonic()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+            yield item
+            last_duration = time.monotonic() - started
+
+        LOGGER.info("Stopping %s to finish within max_runtime", self.tap_stream_id)
+
     def set_parameters(self, params: dict) -> None:
         """
         Sets or updates the `params` attribute of a class.
@@ -54,6 +99,11 @@ class IncrementalStream(BaseStream):
     A child class of a base stream used to represent streams that use the
     INCREMENTAL replication method.
 
+    Records are requested in consecutive time windows between the bookmark and
+    now, using the `start_param` and `end_param` query string parameters. When
+    `target_window_records` is configured, a per-day record count histogram is
+    kept in state and used to plan windows of similar expected volume.
+
     :param client: The API client used extract records from the external source
     """
 
@@ -61,7 +111,12 @@ class IncrementalStream(BaseStream):
     batched = False
     interval = None
     old_replication_key = None
-    
+    start_param = None
+    end_param = None
+    volume_histogram = None
+    target_window_records = None
+    fingerprint_bookmark = None
+
     def get_bookmark(self,state :dict,config: dict) ->int:
         """
         A wrapper for singer.get_bookmark to deal with backward compatibility for bookmark values.
@@ -72,10 +127,19 @@ class IncrementalStream(BaseStream):
         bookmark = singer.get_bookmark(state, self.tap_stream_id, self.replication_key, False)
         if not bookmark:
             # get previous bookmark value if the current dosent exists or default to start date
-            _ = singer.get_bookmark(state, self.tap_stream_id,self.old_replication_key, config["start_date"])   
+            _ = singer.get_bookmark(state, self.tap_stream_id,self.old_replication_key, config["start_date"])
             return datetime_to_unix_ms(singer.utils.strptime_to_utc(_))
         return bookmark
 
+    def has_bookmark(self, state: dict) -> bool:
+        """
+        Returns True if the state holds a bookmark for the stream.
+
+        :param state: A dictionary representing singer state
+        """
+        return any(singer.get_bookmark(state, self.tap_stream_id, key) is not None
+                   for key in (self.replication_key, self.old_replication_key) if key)
+
     def set_interval(self, value):
         """
         Sets the interval attribute.
@@ -106,10 +170,544 @@ class IncrementalStream(BaseStream):
 
         return Interval.MONTH.value
 
+    def get_windows(self, start_date: int):
+        """
+        Splits the time between the start date and now into windows of the
+        configured interval.
+
+        :param start_date: The start of the first window as epoch milliseconds
+        :return: Generator of (window_start, window_end) datetime tuples
+        """
+        if self.target_window_records and self.volume_histogram:
+            yield from plan_windows(start_date, datetime_to_unix_ms(singer.utils.now()), self.volume_histogram,
+                                    self.target_window_records, self.get_interval(), Interval.MONTH.value)
+            return
+
+        add_interval = datetime.timedelta(hours=self.get_interval())
+        window_start = unix_ms_to_date_utc(start_date)
+        end_dt, loop = singer.utils.now(), True
+
+        while loop:
+            if (window_start + add_interval) < end_dt:
+                window_end = window_start + add_interval
+            else:
+                window_end, loop = end_dt, False
+
+            yield window_start, window_end
+
+            window_start = window_end + datetime.timedelta(milliseconds=1)
+
+    def request_window(self, window_start: datetime.datetime, window_end: datetime.datetime, raw: bool = False):
+        """
+        Requests a single window from the API. A download broken off in the
+        middle is resumed from the last record received.
+
+        :param window_start: The start of the window
+        :param window_end: The end of the window
+        :param raw: If true, the undecoded response body is returned
+        :return: list of records
+        """
+        params = {self.start_param: datetime_to_unix_ms(window_start),
+                  self.end_param: datetime_to_unix_ms(window_end)}
+        resume = ResumableWindow(self.start_param, self.replication_key, self.key_properties)
+        if raw:
+            return self.client.get(self.base_url, self.endpoint, params=params, raw=True, resume=resume)
+        return self.client.get(self.base_url, self.endpoint, params=params, resume=resume)
+
+    def get_window_records(self, window_start: datetime.datetime, window_end: datetime.datetime) -> list:
+        """
+        Requests the records of a single window.
+
+        :param window_start: The start of the window
+        :param window_end: The end of the window
+        :return: list of records
+        """
+        return self.request_window(window_start, window_end)
+
+    def probe_start_date(self, start_date: int) -> int:
+        """
+        Finds where the history of the stream begins by checking exponentially
+        growing windows from the start date, up to `PROBE_MAX_DAYS` long, until
+        one holds records, then bisecting that window down to a single
+        interval.
+
+        Windows are only checked for records, see `Client.has_records`, so
+        no record is downloaded before the sync.
+
+        :param start_date: The configured start date as epoch milliseconds
+        :return: The epoch milliseconds the sync can start from, before which there is no record
+        """
+        interval_length = self.get_interval() * 60 * 60 * 1000
+        max_length = max(interval_length, PROBE_MAX_DAYS * 24 * 60 * 60 * 1000)
+        now = datetime_to_unix_ms(singer.utils.now())
+        position, window_length, requests, found = start_date, interval_length, 0, False
+
+        while position <= now:
+            probe_end = min(position + window_length, now)
+            requests += 1
+            if self.window_has_records(position, probe_end):
+                found = True
+                break
+            position = probe_end + 1
+            window_length = min(window_length * 2, max_length)
+
+        # The first record is between position and probe_end
+        while found and probe_end - position > interval_length:
+            middle = position + (probe_end - position) // 2
+            requests += 1
+            if self.window_has_records(position, middle):
+                probe_end = middle
+            else:
+                position = middle + 1
+
+        position = min(position, now)
+        LOGGER.info("Skipped empty history of %s from %s to %s in %s requests", self.tap_stream_id,
+                    *unix_ms_to_isoformat([start_date, position]), requests)
+        return position
+
+    def window_has_records(self, window_start: int, window_end: int) -> bool:
+        """
+        Tells whether a window holds any record, without downloading them.
+
+        :param window_start: The start of the window as epoch milliseconds
+        :param window_end: The end of the window as epoch milliseconds
+        """
+        return self.client.has_records(self.base_url, self.endpoint,
+                                       params={self.start_param: window_start, self.end_param: window_end})
+
+    @staticmethod
+    def get_iso_timestamp_fields(stream_schema: dict, stream_metadata: dict) -> list:
+        """
+        Returns the epoch millisecond fields that have a selected `<field>_iso` copy in the schema.
+
+        :param stream_schema: A dictionary containing the stream schema
+        :param stream_metadata: A dictionnary containing stream metadata
+        :return: list of field names
+        """
+        properties = stream_schema.get("properties", {})
+        return [field for field in get_epoch_ms_fields(stream_schema)
+                if f"{field}_iso" in properties
+                and metadata.get(stream_metadata, ("properties", f"{field}_iso"), "selected") is not False]
+
+    def transform_window(self, records: list, stream_schema: dict, stream_metadata: dict,
+                         transformer: singer.Transformer, iso_fields: list) -> list:
+        """
+        Transforms the records of a window in the current process.
+
+        :param records: list of raw records
+        :param stream_schema: A dictionary containing the stream schema
+        :param stream_metadata: A dictionnary containing stream metadata
+        :param transformer: A singer Transformer object
+        :param iso_fields: The epoch millisecond fields that get an ISO copy
+        :return: list of (replication key value, transformed record) tuples
+        """
+        records = [transformer.transform(record, stream_schema, stream_metadata) for record in records]
+        if iso_fields:
+            add_iso_timestamps(records, iso_fields)
+        return [(record[self.replication_key], record) for record in records]
+
+    def get_passthrough_checks(self, stream_schema: dict, stream_metadata: dict, iso_fields: list):
+        """
+        Returns the checks a record has to pass for the singer Transformer to
+        leave it unchanged, when the stream can be passed through as raw
+        records: every field is selected, no field is added and the writer
+        outputs serialized messages.
+
+        :param stream_schema: A dictionary containing the stream schema
+        :param stream_metadata: A dictionnary containing stream metadata
+        :param iso_fields: The epoch millisecond fields that get an ISO copy
+        :return: dictionary of checks per field, or None to transform records
+        """
+        if iso_fields or not self.writes_serialized():
+            return None
+        for field in stream_schema.get("properties", {}):
+            if metadata.get(stream_metadata, ("properties", field), "selected") is False \
+                    or metadata.get(stream_metadata, ("properties", field), "inclusion") == "unsupported":
+                return None
+
+        passthrough_checks = get_passthrough_checks(stream_schema)
+        if passthrough_checks:
+            LOGGER.info("Passing raw records of %s through without transformation", self.tap_stream_id)
+        return passthrough_checks
+
+    def passthrough_window(self, content: bytes, passthrough_checks: dict, stream_schema: dict,
+                           stream_metadata: dict, transformer: singer.Transformer):
+        """
+        Splices the text of every record of a window into a RECORD message as
+        sent by the API. Records holding a value the Transformer would change
+        are transformed and serialized as usual.
+
+        Every record is still decoded, the values are needed to check the
+        record and to read its replication key, so what is saved is the
+        Transformer and the serialization, not the decoding.
+
+        :param content: The response body of the window
+        :param passthrough_checks: The checks returned by `get_passthrough_checks`
+        :param stream_schema: A dictionary containing the stream schema
+        :param stream_metadata: A dictionnary containing stream metadata
+        :param transformer: A singer Transformer object
+        :return: Generator of (replication key value, serialized RECORD message) tuples
+        """
+        prefix = singer.format_message(singer.RecordMessage(stream=self.tap_stream_id, record=None))
+        prefix = prefix[:prefix.rindex("null")]
+
+        for raw_record in iter_raw_records(content.decode("utf-8")):
+            record = raw_record.record
+            if passes_through(record, passthrough_checks):
+                # Line breaks can only be whitespace between tokens of a JSON document
+                line = prefix + raw_record.raw.replace("\n", " ").replace("\r", " ") + "}"
+                yield record[self.replication_key], line
+            else:
+                record = transformer.transform(record, stream_schema, stream_metadata)
+                yield record[self.replication_key], singer.format_message(
+                    singer.RecordMessage(stream=self.tap_stream_id, record=record))
+
+    def writes_serialized(self) -> bool:
+        """
+        Returns True if records can be written as serialized messages: the
+        writer outputs them as is and no fingerprint index needs to hash them.
+        """
+        return self.writer.serialized_output and self.fingerprint_bookmark is None
+
+    def get_lookback_start(self, bookmark: int, config: dict) -> int:
+        """
+        Returns where a sync starts with the `lookback_days` config, to
+        re-sync the days before the bookmark and catch late updates.
+
+        :param bookmark: The bookmark as epoch milliseconds
+        :param config: A dictionary containing tap config data
+        :return: epoch milliseconds, not before the start date
+        """
+        start_date = datetime_to_unix_ms(singer.utils.strptime_to_utc(config["start_date"]))
+        lookback_start = max(bookmark - int(float(config["lookback_days"]) * 24 * 60 * 60 * 1000), start_date)
+        LOGGER.info("Looking back at %s from %s", self.tap_stream_id, unix_ms_to_isoformat([lookback_start])[0])
+        return min(lookback_start, bookmark)
+
+    def get_remaining_windows(self, state: dict, config: dict) -> list:
+        """
+        Returns the windows a sync would request from the current state, in
+        the configured `sync_order`.
+
+        :param state: A dictionary representing singer state
+        :param config: A dictionary containing tap config data
+        :return: list of (window_start, window_end) datetime tuples
+        """
+        if config.get("interval"):
+            self.set_interval(config.get("interval"))
+        if config.get("sync_order", "oldest_first") != "newest_first":
+            return list(self.get_windows(self.get_bookmark(state, config)))
+
+        high_watermark, low_watermark = self.get_watermarks(state, config)
+        start_date = datetime_to_unix_ms(singer.utils.strptime_to_utc(config["start_date"]))
+        return list(self.get_windows(high_watermark)) + list(self.get_backfill_windows(low_watermark, start_date))
+
+    def request_sample(self, window_start: datetime.datetime, window_end: datetime.datetime, config: dict):
+        """
+        Requests a window to estimate the volume of a sync.
+
+        :param window_start: The start of the window
+        :param window_end: The end of the window
+        :param config: A dictionary containing tap config data
+        :return: Tuple of the number of records, the number of bytes and the
+            number of requests the window takes, None if unknown
+        """
+        content = self.request_window(window_start, window_end, raw=True)
+        return len(self.client.decode(content)), len(content), 1
+
+    def get_transform_pool(self, config: dict, stream_schema: dict, stream_metadata: dict, iso_fields: list):
+        """
+        Starts a pool of worker processes transforming and serializing records
+        when more than one worker is configured.
+
+        The pool produces serialized RECORD messages, so it is only used with
+        writers that output them as is.
+
+        :param config: A dictionary containing tap config data
+        :param stream_schema: A dictionary containing the stream schema
+        :param stream_metadata: A dictionnary containing stream metadata
+        :param iso_fields: The epoch millisecond fields that get an ISO copy
+        :return: A TransformPool, or None to transform in the current process
+        """
+        workers = int(config.get("workers") or 1)
+        if workers <= 1:
+            return None
+        if not self.writes_serialized():
+            LOGGER.warning("workers is ignored as the writer or the fingerprint index of %s needs records as "
+                           "dictionaries", self.tap_stream_id)
+            return None
+
+        LOGGER.info("Transforming %s with %s worker processes", self.tap_stream_id, workers)
+        return TransformPool(workers, self.tap_stream_id, stream_schema, stream_metadata, self.replication_key,
+                             iso_fields)
+
+    # pylint: disable=signature-differs
+    def get_records(self, start_date: int):
+        for window_start, window_end in self.get_windows(start_date):
+            yield from self.get_window_records(window_start, window_end)
+
+    def get_backfill_windows(self, end_date: int, start_date: int):
+        """
+        Splits the time between the start date and the end date into windows
+        of the configured interval, newest first.
+
+        :param end_date: The end of the first window as epoch milliseconds
+        :param start_date: The start of the last window as epoch milliseconds
+        :return: Generator of (window_start, window_end) datetime tuples
+        """
+        add_interval = datetime.timedelta(hours=self.get_interval())
+        first_start = unix_ms_to_date_utc_ms(start_date)
+        window_end = unix_ms_to_date_utc_ms(end_date)
+
+        while window_end > first_start:
+            window_start = max(window_end - add_interval, first_start)
+            yield window_start, window_end
+            window_end = window_start - datetime.timedelta(milliseconds=1)
+
+    def get_watermarks(self, state: dict, config: dict):
+        """
+        Returns the high and low watermarks of a newest first sync. Everything
+        between the two has been synced.
+
+        A stream synced oldest first has synced everything from the start date
+        up to its bookmark, and a stream without state starts both watermarks at now.
+
+        :param state: A dictionary representing singer state
+        :param config: A dictionary containing tap config data
+        :return: Tuple of the high and low watermarks as epoch milliseconds
+        """
+        high_watermark = singer.get_bookmark(state, self.tap_stream_id, "high_watermark")
+        if high_watermark is not None:
+            return high_watermark, singer.get_bookmark(state, self.tap_stream_id, "low_watermark", high_watermark)
+        if self.has_bookmark(state):
+            return self.get_bookmark(state, config), datetime_to_unix_ms(
+                singer.utils.strptime_to_utc(config["start_date"]))
+        now = datetime_to_unix_ms(singer.utils.now())
+        return now, now
+
+    def sync_window(self, state: dict, window_start: datetime.datetime, window_end: datetime.datetime,
+                    min_value, counter, stream_schema: dict, stream_metadata: dict, transformer: singer.Transformer,
+                    iso_fields: list, passthrough_checks: dict = None, pool=None):
+        """
+        Requests a window and writes its records whose replication key is at
+        least `min_value`.
+
+        :param state: A dictionary representing singer state
+        :param window_start: The start of the window
+        :param window_end: The end of the window
+        :param min_value: The smallest replication key written, None to write every record
+        :param counter: The record counter of the stream
+        :return: Tuple of the state and the greatest replication key written, or None
+        """
+        response = self.request_window(window_start, window_end, raw=bool(passthrough_checks))
+
+        if passthrough_checks:
+            records = self.passthrough_window(response, passthrough_checks, stream_schema,
+                                              stream_metadata, transformer)
+            write = self.writer.write_serialized
+        elif pool is not None:
+            records, write = pool.map(response), self.writer.write_serialized
+        else:
+            records = self.transform_window(response, stream_schema, stream_metadata, transformer, iso_fields)
+            write = self.writer.write_record
+
+        return self.write_window(state, window_start, window_end, records, write, min_value, counter)
+
+    def write_window(self, state: dict, window_start: datetime.datetime, window_end: datetime.datetime,
+                     records, write, min_value, counter):
+        """
+        Writes the records of a window whose replication key is at least
+        `min_value` and records the volume of the window.
+
+        :param state: A dictionary representing singer state
+        :param window_start: The start of the window
+        :param window_end: The end of the window
+        :param records: Iterable of (replication key value, record) tuples
+        :param write: Writes a record, as a dictionary or a serialized message
+        :param min_value: The smallest replication key written, None to write every record
+        :param counter: The record counter of the stream
+        :return: Tuple of the state and the greatest replication key written, or None
+        """
+        unchanged_records = ()
+        if self.fingerprint_bookmark is not None:
+            records = list(records)
+            unchanged_records = self.get_unchanged_records(records, min_value)
+
+        timestamps, max_value = [], None
+        for position, (record_datetime, record) in enumerate(records):
+            timestamps.append(record_datetime)
+            if position in unchanged_records:
+                max_value = record_datetime if max_value is None else max(record_datetime, max_value)
+            elif min_value is None or record_datetime >= min_value:
+                write(self.tap_stream_id, record)
+                counter.increment()
+                max_value = record_datetime if max_value is None else max(record_datetime, max_value)
+
+        if self.volume_histogram is not None:
+            self.volume_histogram.record_window(datetime_to_unix_ms(window_start), datetime_to_unix_ms(window_end),
+                                                timestamps)
+            state = singer.write_bookmark(state, self.tap_stream_id, "volume", self.volume_histogram.to_state())
+
+        return state, max_value
+
+    def get_unchanged_records(self, records: list, min_value) -> set:
+        """
+        Returns the records of a window the fingerprint index reports as
+        emitted before and unchanged since, among those to be written.
+
+        :param records: list of (replication key value, transformed record) tuples
+        :param min_value: The smallest replication key written, None to write every record
+        :return: set of the positions of the records to skip
+        """
+        positions = [position for position, (record_datetime, _) in enumerate(records)
+                     if min_value is None or record_datetime >= min_value]
+        entries = [([records[position][1].get(key) for key in self.key_properties], records[position][0],
+                    records[position][1]) for position in positions]
+        unchanged = self.fingerprint_index.get_unchanged(self.tap_stream_id, entries, self.fingerprint_bookmark)
+        return {positions[index] for index in unchanged}
+
+    def get_pipeline(self, config: dict, stream_schema: dict, stream_metadata: dict, iso_fields: list):
+        """
+        Builds a pipeline requesting, decoding and transforming windows on
+        threads of their own, with the number of threads of every stage set
+        by the `pipeline_fetch_workers`, `pipeline_decode_workers` and
+        `pipeline_transform_workers` config. Records are written by the
+        thread consuming the pipeline, in the order of the windows.
+
+        When the writer outputs serialized messages the transform stage also
+        serializes the records.
+
+        The fetch stage runs ahead of the windows written, so it checks the
+        deadline before every request. Once the time left is shorter than
+        the previous request took, windows go through the pipeline without
+        records, as None, and `sync_pipelined` stops the pipeline at the
+        first of them.
+
+        :param config: A dictionary containing tap config data
+        :param stream_schema: A dictionary containing the stream schema
+        :param stream_metadata: A dictionnary containing stream metadata
+        :param iso_fields: The epoch millisecond fields that get an ISO copy
+        :return: Tuple of the Pipeline and the function writing a record
+        """
+        queue_size = int(config.get("pipeline_queue_size") or 4)
+        serialized = self.writes_serialized()
+
+        last_fetch_seconds = [0.0]
+
+        def fetch(window):
+            if not self.deadline.allows(last_fetch_seconds[0]):
+                return window, None
+            started = time.monotonic()
+            content = self.request_window(*window, raw=True)
+            last_fetch_seconds[0] = time.monotonic() - started
+            return window, content
+
+        def decode(item):
+            window, content = item
+            return window, None if content is None else self.client.decode(content)
+
+        def make_transform():
+            # The singer Transformer keeps track of what it removed, one per thread
+            transformer = singer.Transformer()
+
+            def transform(item):
+                window, records = item
+                if records is None:
+                    return window, None
+                records = self.transform_window(records, stream_schema, stream_metadata, transformer, iso_fields)
+                if serialized:
+                    records = [(value, singer.format_message(singer.RecordMessage(stream=self.tap_stream_id,
+                                                                                  record=record)))
+                               for value, record in records]
+                return window, records
+            return transform
+
+        stages = [Stage("fetch", lambda: fetch, int(config.get("pipeline_fetch_workers") or 1), queue_size),
+                  Stage("decode", lambda: decode, int(config.get("pipeline_decode_workers") or 1), queue_size),
+                  Stage("transform", make_transform, int(config.get("pipeline_transform_workers") or 1),
+                        queue_size)]
+        LOGGER.info("Syncing %s through a pipeline of %s", self.tap_stream_id,
+                    ", ".join(f"{stage.workers} {stage.name}" for stage in stages))
+        write = self.writer.write_serialized if serialized else self.writer.write_record
+        return Pipeline(stages, queue_size=queue_size, tags={"endpoint": self.tap_stream_id}), write
+
+    def sync_pipelined(self, state: dict, windows, min_value, counter, pipeline: Pipeline, write):
+        """
+        Runs windows through a pipeline and writes their records whose
+        replication key is at least `min_value`, until the first window the
+        deadline left unfetched.
+
+        :param state: A dictionary representing singer state
+        :param windows: Iterable of (window_start, window_end) datetime tuples
+        :param min_value: The smallest replication key written
+        :param counter: The record counter of the stream
+        :param pipeline: The Pipeline returned by `get_pipeline`
+        :param write: The function writing a record
+        :return: Generator of tuples of the state and the greatest replication key written after every window
+        """
+        for (window_start, window_end), records in pipeline.run(windows):
+            if records is None:
+                LOGGER.info("Stopping %s to finish within max_runtime", self.tap_stream_id)
+                pipeline.stop()
+                return
+            yield self.write_window(state, window_start, window_end, records, write, min_value, counter)
+
+    def sync_newest_first(self, state: dict, config: dict, sync_window) -> dict:
+        """
+        Syncs the time since the high watermark first, then fills the history
+        before the low watermark one window at a time, newest first.
+
+        The `sync_role` config restricts a run to the `live` part or the
+        `backfill` part, so that both can run as separate processes.
+
+        :param state: A dictionary representing singer state
+        :param config: A dictionary containing tap config data
+        :param sync_window: Syncs a single window, see `sync_window`
+        :return: State data in the form of a dictionary
+        """
+        role = config.get("sync_role", "both")
+        if role not in ("both", "live", "backfill"):
+            raise InvalidConfig(f"invalid sync_role '{role}', expected one of both, live, backfill")
+
+        high_watermark, low_watermark = self.get_watermarks(state, config)
+        state = singer.write_bookmark(state, self.tap_stream_id, "low_watermark", low_watermark)
+
+        if role in ("both", "live"):
+            for window_start, window_end in self.within_deadline(self.get_windows(high_watermark)):
+                state, max_value = sync_window(state, window_start, window_end, high_watermark)
+                if max_value is not None:
+                    high_watermark = max(high_watermark, max_value)
+                state = singer.write_bookmark(state, self.tap_stream_id, "high_watermark", high_watermark)
+                state = singer.write_bookmark(state, self.tap_stream_id, self.replication_key, high_watermark)
+                self.writer.write_state(state)
+                LOGGER.info("High watermark of %s is at %s", self.tap_stream_id,
+                            unix_ms_to_isoformat([high_watermark])[0])
+
+        if role in ("both", "backfill"):
+            start_date = datetime_to_unix_ms(singer.utils.strptime_to_utc(config["start_date"]))
+            state = singer.write_bookmark(state, self.tap_stream_id, "high_watermark", high_watermark)
+            backfill_windows = self.get_backfill_windows(low_watermark, start_date)
+            for window_start, window_end in self.within_deadline(backfill_windows):
+                state, _ = sync_window(state, window_start, window_end, None)
+                low_watermark = datetime_to_unix_ms(window_start)
+                state = singer.write_bookmark(state, self.tap_stream_id, "low_watermark", low_watermark)
+                self.writer.write_state(state)
+                LOGGER.info("Low watermark of %s is at %s", self.tap_stream_id,
+                            unix_ms_to_isoformat([low_watermark])[0])
+
+        return state
+
     def sync(self, state: dict, stream_schema: dict, stream_metadata: dict, config: dict, transformer: singer.Transformer) -> dict:
         """
         The sync logic for an incremental stream.
 
+        The bookmark is written after every window so that an interrupted sync
+        resumes from the last completed window. With the `sync_order` config
+        set to `newest_first`, see `sync_newest_first`.
+
+        With the `lookback_days` config, the sync starts that many days before
+        the bookmark, and with a fingerprint index the records re-synced
+        unchanged are skipped.
+
         :param state: A dictionary representing singer state
         :param stream_schema: A dictionary containing the stream schema
         :param stream_metadata: A dictionnary containing stream metadata
@@ -119,23 +717,69 @@ class IncrementalStream(BaseStream):
         """
         if config.get("interval"):
             self.set_interval(config.get("interval"))
-        start_date_epoch = self.get_bookmark(state,config)
-        # bookmark_datetime = singer.utils.strptime_to_utc(start_date)
-        max_datetime = bookmark_datetime = start_date_epoch
+        if config.get("target_window_records"):
+            self.target_window_records = int(config["target_window_records"])
+            self.volume_histogram = VolumeHistogram.from_state(
+                singer.get_bookmark(state, self.tap_stream_id, "volume", {}))
+        sync_order = config.get("sync_order", "oldest_first")
+        if sync_order not in ("oldest_first", "newest_first"):
+            raise InvalidConfig(f"invalid sync_order '{sync_order}', expected oldest_first or newest_first")
+
+        if self.fingerprint_index is not None:
+            if sync_order == "oldest_first":
+                self.fingerprint_bookmark = self.get_bookmark(state, config)
+            else:
+                LOGGER.warning("fingerprint_index is ignored as %s is synced newest first", self.tap_stream_id)
+
+        iso_fields = self.get_iso_timestamp_fields(stream_schema, stream_metadata)
+        pipeline = pipeline_write = None
+        if config.get("pipeline"):
+            if sync_order == "oldest_first":
+                pipeline, pipeline_write = self.get_pipeline(config, stream_schema, stream_metadata, iso_fields)
+            else:
+                LOGGER.warning("pipeline is ignored as %s is synced newest first", self.tap_stream_id)
+        passthrough_checks = None if pipeline else self.get_passthrough_checks(stream_schema, stream_metadata,
+                                                                               iso_fields)
+        pool = None if passthrough_checks or pipeline else self.get_transform_pool(config, stream_schema,
+                                                                                   stream_metadata, iso_fields)
+
+        try:
+            with singer.metrics.record_counter(self.tap_stream_id) as counter:
+                sync_window = functools.partial(self.sync_window, counter=counter, stream_schema=stream_schema,
+                                                stream_metadata=stream_metadata, transformer=transformer,
+                                                iso_fields=iso_fields, passthrough_checks=passthrough_checks,
+                                                pool=pool)
+                if sync_order == "newest_first":
+                    return self.sync_newest_first(state, config, sync_window)
+
+                start_date_epoch = self.get_bookmark(state,config)
+                if config.get("probe_start_date") and not self.has_bookmark(state):
+                    start_date_epoch = self.probe_start_date(start_date_epoch)
+                max_datetime = bookmark_datetime = start_date_epoch
+                if config.get("lookback_days") and self.has_bookmark(state):
+                    bookmark_datetime = self.get_lookback_start(bookmark_datetime, config)
+
+                if pipeline is not None:
+                    # The pipeline checks the deadline itself, see `get_pipeline`
+                    synced = self.sync_pipelined(state, self.get_windows(bookmark_datetime), bookmark_datetime,
+                                                 counter, pipeline, pipeline_write)
+                else:
+                    windows = self.within_deadline(self.get_windows(bookmark_datetime))
+                    synced = (sync_window(state, window_start, window_end, bookmark_datetime)
+                              for window_start, window_end in windows)
+
+                for state, max_value in synced:
+                    if max_value is not None:
+                        max_datetime = max(max_value, max_datetime)
+
+                    state = singer.write_bookmark(state, self.tap_stream_id, self.replication_key, max_datetime)
+                    self.writer.write_state(state)
+                    LOGGER.info("Bookmark of %s is at %s", self.tap_stream_id,
+                                unix_ms_to_isoformat([max_datetime])[0])
+        finally:
+            if pool is not None:
+                pool.close()
 
-        with singer.metrics.record_counter(self.tap_stream_id) as counter:
-            for record in self.get_records(bookmark_datetime):
-                transformed_record = transformer.transform(record, stream_schema, stream_metadata)
-                record_datetime = transformed_record[self.replication_key]
-                if record_datetime >= bookmark_datetime:
-                    singer.write_record(self.tap_stream_id, transformed_record)
-                    counter.increment()
-                    max_datetime = max(record_datetime, max_datetime)
-
-            bookmark_date = max_datetime
-
-        state = singer.write_bookmark(state, self.tap_stream_id, self.replication_key, bookmark_date)
-        singer.write_state(state)
         return state
 
 
@@ -144,10 +788,56 @@ class FullTableStream(BaseStream):
     A child class of a base stream used to represent streams that use the
     FULL_TABLE replication method.
 
+    Pages are requested one ahead on a background thread while the current
+    page is processed. A hash of the snapshot is kept in state and an
+    unchanged snapshot is not emitted again. With a validator store, a page
+    the API reports as unchanged is read from the body stored with its
+    validators, see ValidatorStore.
+
     :param client: The API client used extract records from the external source
     """
 
     replication_method = "FULL_TABLE"
+    base_url = DixaURL.INTEGRATIONS.value
+    paginated = False
+
+    def get_page(self, params: dict):
+        """
+        Requests a single page of the stream.
+
+        :param params: The querystring params passed to the API
+        :return: Tuple of the records of the page and the key of the next page
+        """
+        response = self.client.get(self.base_url, self.endpoint, params=params)
+
+        meta = response.get("meta") or {}
+        return response.get("data", []), get_next_page_key(meta.get("next")).get("pageKey")
+
+    def get_records(self, config: dict = {}):
+        params = {"pageLimit": config.get("page_size", 10_000)} if self.paginated else {}
+
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            future = executor.submit(self.get_page, dict(params))
+
+            while future is not None:
+                records, page_key = future.result()
+                future = executor.submit(self.get_page, {**params, "pageKey": page_key}) if page_key else None
+
+                yield from records
+
+    @staticmethod
+    def get_snapshot_hash(record_hashes: list) -> str:
+        """
+        Combines the hashes of every record into a hash of the snapshot that
+        does not depend on the order the API returned the records in.
+
+        :param record_hashes: The hex digest of every record
+        :return: The hex digest of the snapshot
+        """
+        snapshot = hashlib.sha256()
+        for record_hash in sorted(record_hashes):
+            snapshot.update(record_hash.encode("utf-8"))
+        return snapshot.hexdigest()
 
     def sync(self, state: dict, stream_schema: dict, stream_metadata: dict, config: dict, transformer: singer.Transformer) -> dict:
         """
@@ -160,11 +850,25 @@ class FullTableStream(BaseStream):
         :param transformer: A singer Transformer object
         :return: State data in the form of a dictionary
         """
+        buffer = RecordBuffer(stream_schema)
+        record_hashes = []
+
+        for record in self.get_records(config):
+            transformed_record = transformer.transform(record, stream_schema, stream_metadata)
+            buffer.append(transformed_record)
+            record_hashes.append(hashlib.sha256(
+                json.dumps(transformed_record, sort_keys=True, use_decimal=True).encode("utf-8")).hexdigest())
+
+        snapshot_hash = self.get_snapshot_hash(record_hashes)
+        if snapshot_hash == singer.get_bookmark(state, self.tap_stream_id, "snapshot_hash"):
+            LOGGER.info("Snapshot of %s is unchanged, skipping %s records", self.tap_stream_id, len(buffer))
+            return state
+
         with singer.metrics.record_counter(self.tap_stream_id) as counter:
-            for record in self.get_records(config):
-                transformed_record = transformer.transform(record, stream_schema, stream_metadata)
-                singer.write_record(self.tap_stream_id, transformed_record)
+            for record in buffer:
+                self.writer.write_record(self.tap_stream_id, record)
                 counter.increment()
 
-        singer.write_state(state)
+        state = singer.write_bookmark(state, self.tap_stream_id, "snapshot_hash", snapshot_hash)
+        self.writer.write_state(state)
         return state
@@ -1,10 +1,16 @@
 import datetime
+import time
 
-from tap_dixa.helpers import date_to_rfc3339, get_next_page_key, DixaURL
+from tap_dixa.exceptions import DixaClient408Error
+from tap_dixa.helpers import date_to_rfc3339, datetime_to_unix_ms, get_next_page_key, unix_ms_to_date_utc_ms, DixaURL
+from tap_dixa.pagesize import PageSizeTuner
+from tap_dixa.pipeline import Pipeline, Stage
 from .abstracts import IncrementalStream
 import singer
 from singer import metrics, Transformer
 
+LOGGER = singer.get_logger()
+
 
 class ActivityLogs(IncrementalStream):
     """
@@ -17,11 +23,26 @@ class ActivityLogs(IncrementalStream):
     valid_replication_keys = ["activityTimestamp"]
     base_url = DixaURL.INTEGRATIONS.value
     endpoint = "/v1/conversations/activitylog"
+    page_size_tuner = None
 
     def sync(self, state: dict, stream_schema: dict, stream_metadata: dict, config: dict, transformer: Transformer) -> dict:
         """
         The sync logic for an incremental stream.
 
+        The query of the next page is kept in state after every page, and a
+        sync stopped before the last page, by the deadline or by a failure,
+        resumes from it.
+
+        With the `auto_page_size` config, the page size is tuned during the
+        sync, see PageSizeTuner, and kept in state for the next sync to start from.
+
+        With the `pipeline` config, pages are transformed on threads of their
+        own while the next pages are requested, see `get_pipeline`.
+
+        With the `lookback_days` config, a sync which is not resuming starts
+        that many days before the bookmark, and with a fingerprint index the
+        records re-synced unchanged are skipped.
+
         :param state: A dictionary representing singer state
         :param stream_schema: A dictionary containing the stream schema
         :param stream_metadata: A dictionnary containing stream metadata
@@ -31,56 +52,193 @@ class ActivityLogs(IncrementalStream):
         """
         if config.get("interval"):
             self.set_interval(config.get("interval"))
+        if config.get("auto_page_size"):
+            self.page_size_tuner = PageSizeTuner(
+                singer.get_bookmark(state, self.tap_stream_id, "page_size") or config.get("page_size", 10_000),
+                min_size=int(config.get("page_size_min", 100)), max_size=int(config.get("page_size_max", 10_000)),
+                target_seconds=float(config.get("page_target_seconds", 10)))
         start_date = singer.get_bookmark(
             state, self.tap_stream_id, self.replication_key, config["start_date"])
         bookmark_datetime = singer.utils.strptime_to_utc(start_date)
-        max_datetime = bookmark_datetime
-
+        resume = singer.get_bookmark(state, self.tap_stream_id, "resume")
+        max_datetime = singer.utils.strptime_to_utc(resume["max_datetime"]) if resume else bookmark_datetime
+        if self.fingerprint_index is not None:
+            self.fingerprint_bookmark = datetime_to_unix_ms(bookmark_datetime)
+        if config.get("lookback_days") and self.has_bookmark(state) and not resume:
+            bookmark_datetime = unix_ms_to_date_utc_ms(
+                self.get_lookback_start(datetime_to_unix_ms(bookmark_datetime), config))
+
+        # Every page along with the query of the next one, taken before the next page is requested
+        pages = ((dict(self.params), page) for page in
+                 self.get_record_pages(bookmark_datetime, config=config, params=resume and resume["params"]))
+        if config.get("pipeline"):
+            pages = self.get_pipeline(config, stream_schema, stream_metadata).run(pages)
+        else:
+            pages = ((next_params, [transformer.transform(record, stream_schema, stream_metadata) for record in page])
+                     for next_params, page in pages)
+
+        next_params = None
         with metrics.record_counter(self.tap_stream_id) as counter:
-            for record in self.get_records(bookmark_datetime, config=config):
-                transformed_record = transformer.transform(record, stream_schema, stream_metadata)
-                record_datetime = singer.utils.strptime_to_utc(transformed_record[self.replication_key])
-                if record_datetime >= bookmark_datetime:
-                    singer.write_record(self.tap_stream_id, transformed_record)
-                    counter.increment()
-                    max_datetime = max(record_datetime, max_datetime)
+            for next_params, page in pages:
+                unchanged_records = ()
+                if self.fingerprint_bookmark is not None:
+                    unchanged_records = self.get_unchanged_records(
+                        [(datetime_to_unix_ms(singer.utils.strptime_to_utc(record[self.replication_key])), record)
+                         for record in page], datetime_to_unix_ms(bookmark_datetime))
+
+                for position, transformed_record in enumerate(page):
+                    record_datetime = singer.utils.strptime_to_utc(transformed_record[self.replication_key])
+                    if position in unchanged_records:
+                        continue
+                    if record_datetime >= bookmark_datetime:
+                        self.writer.write_record(self.tap_stream_id, transformed_record)
+                        counter.increment()
+                        max_datetime = max(record_datetime, max_datetime)
+
+                if next_params.get("pageKey"):
+                    state = singer.write_bookmark(state, self.tap_stream_id, "resume", {
+                        "params": next_params, "max_datetime": singer.utils.strftime(max_datetime)})
+                    self.writer.write_state(state)
 
             bookmark_date = singer.utils.strftime(max_datetime)
 
-        state = singer.write_bookmark(
-            state, self.tap_stream_id, self.replication_key, bookmark_date)
-        singer.write_state(state)
+        next_params = self.params if next_params is None else next_params
+        if next_params.get("pageKey"):
+            state = singer.write_bookmark(state, self.tap_stream_id, "resume",
+                                          {"params": dict(next_params), "max_datetime": bookmark_date})
+        else:
+            state = singer.write_bookmark(
+                state, self.tap_stream_id, self.replication_key, bookmark_date)
+            state["bookmarks"][self.tap_stream_id].pop("resume", None)
+        if self.page_size_tuner is not None:
+            state = singer.write_bookmark(state, self.tap_stream_id, "page_size", self.page_size_tuner.size)
+        self.writer.write_state(state)
         return state
 
-    # pylint: disable=signature-differs
-    def get_records(self, start_date, config: dict = {}):
-        max_limit = config.get("page_size", 10_000)
-        loop = True
-        page_key = None
-        from_datetime = date_to_rfc3339(start_date.isoformat())
-        to_datetime = date_to_rfc3339(datetime.datetime.utcnow().isoformat())
+    # pylint: disable=arguments-differ
+    def get_pipeline(self, config: dict, stream_schema: dict, stream_metadata: dict):
+        """
+        Builds a pipeline transforming pages with `pipeline_transform_workers`
+        threads. Pages are chained by the key of the next page, so they are
+        requested one at a time by the thread feeding the pipeline, and go
+        through it along with the query of the next page.
 
-        params = {
-            "fromDatetime": from_datetime,
-            "toDatetime": to_datetime,
-            "pageKey": page_key,
-            "pageLimit": max_limit,
-        }
+        :param config: A dictionary containing tap config data
+        :param stream_schema: A dictionary containing the stream schema
+        :param stream_metadata: A dictionnary containing stream metadata
+        :return: A Pipeline
+        """
+        queue_size = int(config.get("pipeline_queue_size") or 4)
 
-        while loop:
+        def make_transform():
+            # The singer Transformer keeps track of what it removed, one per thread
+            transformer = Transformer()
+            return lambda item: (item[0], [transformer.transform(record, stream_schema, stream_metadata)
+                                           for record in item[1]])
 
-            response = self.client.get(self.base_url, self.endpoint, params=params)
+        stage = Stage("transform", make_transform, int(config.get("pipeline_transform_workers") or 1), queue_size)
+        LOGGER.info("Syncing %s through a pipeline of %s transform", self.tap_stream_id, stage.workers)
+        return Pipeline([stage], queue_size=queue_size, tags={"endpoint": self.tap_stream_id})
+
+    def get_pages(self, params: dict):
+        """
+        Requests pages until the last one. `params` is updated with the key of
+        the next page before a page is returned, and has no key once the last
+        page is reached. Pages are requested without validators, the key of
+        the next page is only known from the body.
+
+        When the page size is tuned, a page which times out is requested again
+        right away with a smaller size, until the smallest size is reached.
+
+        :param params: The querystring params passed to the API
+        :return: Generator of the records of every page
+        """
+        tuner = self.page_size_tuner
+        while True:
+            started = time.monotonic()
+            try:
+                response = self.client.get(self.base_url, self.endpoint, params=params, raw=tuner is not None,
+                                           retry_timeouts=tuner is None or not tuner.can_shrink,
+                                           conditional=False)
+            except DixaClient408Error:
+                if tuner is None or not tuner.can_shrink:
+                    raise
+                params["pageLimit"] = tuner.record_timeout()
+                LOGGER.warning("Page of %s timed out, requesting %s records per page", self.tap_stream_id,
+                               params["pageLimit"])
+                continue
+
+            if tuner is not None:
+                payload_bytes, response = len(response), self.client.decode(response)
 
             # Extract data and pageKey
             data = response.get("data", [])
             meta = response.get("meta") or {}
-            next_page = meta.get("next")
-            page_key = get_next_page_key(next_page)
+            page_key = get_next_page_key(meta.get("next"))
 
             # Update params with pageKey
             params.update({"pageKey": page_key.get("pageKey")})
+            if tuner is not None:
+                params["pageLimit"] = tuner.record_page(len(data), time.monotonic() - started, payload_bytes)
+
+            yield data
 
-            # Change switch to exit while loop if pageKey returns None
-            loop = True if page_key.get("pageKey") else False
+            # Exit the loop if pageKey returns None
+            if not params["pageKey"]:
+                return
 
+    def get_remaining_windows(self, state: dict, config: dict) -> list:
+        start_date = singer.get_bookmark(state, self.tap_stream_id, self.replication_key, config["start_date"])
+        if config.get("interval"):
+            self.set_interval(config.get("interval"))
+        return list(self.get_windows(datetime_to_unix_ms(singer.utils.strptime_to_utc(start_date))))
+
+    def request_sample(self, window_start: datetime.datetime, window_end: datetime.datetime, config: dict):
+        """
+        Requests the first page of a window to estimate the volume of a sync.
+        A sync pages through the whole time range rather than requesting
+        windows, so the number of requests follows from the number of records.
+        """
+        page_size = int(config.get("page_size", 10_000))
+        params = {"fromDatetime": date_to_rfc3339(window_start.isoformat()),
+                  "toDatetime": date_to_rfc3339(window_end.isoformat()), "pageKey": None, "pageLimit": page_size}
+        content = self.client.get(self.base_url, self.endpoint, params=params, raw=True, conditional=False)
+        return len(self.client.decode(content).get("data", [])), len(content), None
+
+    # pylint: disable=signature-differs
+    def get_records(self, start_date, config: dict = {}, params: dict = None):
+        """
+        Returns the records from the start date to now, or from the query of a
+        page to resume from.
+
+        :param start_date: The start date datetime object
+        :param config: A dictionary containing tap config data
+        :param params: The querystring params of the page to resume from
+        :return: Generator of records
+        """
+        for data in self.get_record_pages(start_date, config=config, params=params):
             yield from data
+
+    def get_record_pages(self, start_date, config: dict = {}, params: dict = None):
+        """
+        Returns the records from the start date to now, or from the query of a
+        page to resume from, one page at a time.
+
+        :param start_date: The start date datetime object
+        :param config: A dictionary containing tap config data
+        :param params: The querystring params of the page to resume from
+        :return: Generator of the records of every page
+        """
+        max_limit = self.page_size_tuner.size if self.page_size_tuner else config.get("page_size", 10_000)
+        from_datetime = date_to_rfc3339(start_date.isoformat())
+        to_datetime = date_to_rfc3339(datetime.datetime.utcnow().isoformat())
+
+        params = {**params, "pageLimit": max_limit} if params and self.page_size_tuner else params
+        self.set_parameters(dict(params) if params else {
+            "fromDatetime": from_datetime,
+            "toDatetime": to_datetime,
+            "pageKey": None,
+            "pageLimit": max_limit,
+        })
+
+        yield from self.within_deadline(self.get_pages(self.params))
@@ -0,0 +1,12 @@
+from .abstracts import FullTableStream
+
+
+class Agents(FullTableStream):
+    """
+    Get agents from the Dixa platform.
+    """
+
+    tap_stream_id = "agents"
+    key_properties = ["id"]
+    endpoint = "/v1/agents"
+    paginated = True
@@ -0,0 +1,11 @@
+from .abstracts import FullTableStream
+
+
+class Queues(FullTableStream):
+    """
+    Get queues from the Dixa platform.
+    """
+
+    tap_stream_id = "queues"
+    key_properties = ["id"]
+    endpoint = "/v1/queues"
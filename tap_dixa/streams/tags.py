@@ -0,0 +1,11 @@
+from .abstracts import FullTableStream
+
+
+class Tags(FullTableStream):
+    """
+    Get tags from the Dixa platform.
+    """
+
+    tap_stream_id = "tags"
+    key_properties = ["id"]
+    endpoint = "/v1/tags"
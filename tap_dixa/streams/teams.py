@@ -0,0 +1,11 @@
+from .abstracts import FullTableStream
+
+
+class Teams(FullTableStream):
+    """
+    Get teams from the Dixa platform.
+    """
+
+    tap_stream_id = "teams"
+    key_properties = ["id"]
+    endpoint = "/v1/teams"
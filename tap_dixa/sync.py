@@ -1,32 +1,208 @@
+import copy
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+
+import requests
 import singer
 from singer import Transformer, metadata
-from tap_dixa.client import Client
+from tap_dixa.client import Client, ValidatorStore
+from tap_dixa.decoders import get_decoder
+from tap_dixa.exceptions import DixaCircuitOpenError, InvalidConfig
+from tap_dixa.fingerprints import get_fingerprint_index
+from tap_dixa.hedging import Hedger
+from tap_dixa.helpers import Deadline
+from tap_dixa.limits import AdaptiveLimiter, FairSemaphore
+from tap_dixa.output import AccountWriter, SharedOutput, get_writer
 from tap_dixa.streams import STREAMS
 
 LOGGER = singer.get_logger()
 
 
-def sync(config, state, catalog):
-    """Sync data from tap source"""
+def get_client_options(config):
+    """
+    Returns the circuit breaker, hedging and JSON decoder arguments of the Client from the config.
+    """
+    hedger = Hedger(float(config["hedge_percentile"]), float(config.get("hedge_max_ratio", 0.05))) \
+        if config.get("hedge_percentile") else None
+    return {"failure_threshold": int(config.get("circuit_failure_threshold", 5)),
+            "cooldown": float(config.get("circuit_cooldown", 300)), "hedger": hedger,
+            "decoder": get_decoder(config.get("json_decoder", "auto"))}
+
+
+def get_limiter(config, account=None):
+    """
+    Returns the limiter of the concurrent requests of a client from the
+    config: an AdaptiveLimiter with `adaptive_concurrency`, adapting to the
+    rate limit of a single account, otherwise None.
+    """
+    if config.get("adaptive_concurrency"):
+        return AdaptiveLimiter(int(config.get("max_concurrent_requests", 8)), account=account)
+    return None
+
+
+def get_shared_limiter(config):
+    """
+    Returns the FairSemaphore capping the concurrent requests of every account together.
+    """
+    return FairSemaphore(int(config.get("max_concurrent_requests", 8)))
+
+
+def sync_stream(client, writer, config, state, stream, transformer, deadline, fingerprint_index=None):
+    """
+    Syncs a single stream and checkpoints its state.
+
+    :return: The state once the stream is synced
+    """
+    tap_stream_id = stream.tap_stream_id
+    stream_obj = STREAMS[tap_stream_id](client, writer, deadline, fingerprint_index)
+    # The singer Transformer reorders the types of the schema in place, which would
+    # change the SCHEMA message of the next sync of a catalog kept in memory
+    stream_schema = copy.deepcopy(stream.schema.to_dict())
+    stream_metadata = metadata.to_map(stream.metadata)
+
+    LOGGER.info("Starting sync for stream: %s", tap_stream_id)
+
+    state = singer.set_currently_syncing(state, tap_stream_id)
+    writer.write_state(state)
+
+    writer.write_schema(tap_stream_id, stream_schema, stream_obj.key_properties, stream.replication_key)
+
+    try:
+        state = stream_obj.sync(state, stream_schema, stream_metadata, config, transformer)
+    finally:
+        # Bookmarks are written to the state in place, so a failed stream keeps its last window
+        writer.flush()
+        writer.write_state(state)
+    return state
+
+
+def sync_streams(client, writer, config, state, catalog, deadline=None, fingerprint_index=None, transformer=None):
+    """
+    Syncs the selected streams with a client and writer.
+
+    Once the deadline is reached, the stream being synced stops after its
+    current window or page and is left as `currently_syncing`, so the next
+    run resumes from it.
 
-    client = Client(config.get("api_token"))
+    A stream whose API host is failing fast (see CircuitBreaker) is deferred
+    after checkpointing, so that the streams of healthy hosts go on. Deferred
+    streams are retried once the circuit lets a probe through, at the end of
+    the run, and fail the run if their host is still failing.
 
-    with Transformer() as transformer:
+    A transformer can be passed in to be kept from one sync to the next.
+
+    :return: The state once every stream is synced or the deadline is reached
+    """
+    deadline = deadline or Deadline()
+    deferred = []
+    with nullcontext(transformer) if transformer is not None else Transformer() as transformer:
         for stream in catalog.get_selected_streams(state):
             tap_stream_id = stream.tap_stream_id
-            stream_obj = STREAMS[tap_stream_id](client)
-            stream_schema = stream.schema.to_dict()
-            stream_metadata = metadata.to_map(stream.metadata)
+            if not deadline.allows():
+                LOGGER.info("max_runtime reached, leaving %s and the following streams for the next run",
+                            tap_stream_id)
+                state = singer.set_currently_syncing(state, tap_stream_id)
+                writer.write_state(state)
+                return state
 
-            LOGGER.info("Starting sync for stream: %s", tap_stream_id)
+            try:
+                state = sync_stream(client, writer, config, state, stream, transformer, deadline,
+                                    fingerprint_index)
+            except DixaCircuitOpenError as err:
+                LOGGER.warning("%s, deferring %s to the end of the run", err.message, tap_stream_id)
+                deferred.append(stream)
+                continue
 
-            state = singer.set_currently_syncing(state, tap_stream_id)
-            singer.write_state(state)
+            if deadline.reached:
+                LOGGER.info("max_runtime reached, %s is resumed by the next run", tap_stream_id)
+                return state
 
-            singer.write_schema(tap_stream_id, stream_schema, stream_obj.key_properties, stream.replication_key)
+        for stream in deferred:
+            retry_in = client.get_retry_in(STREAMS[stream.tap_stream_id].base_url)
+            if not deadline.allows(retry_in):
+                LOGGER.info("max_runtime reached, %s is resumed by the next run", stream.tap_stream_id)
+                state = singer.set_currently_syncing(state, stream.tap_stream_id)
+                writer.write_state(state)
+                return state
 
-            state = stream_obj.sync(state, stream_schema, stream_metadata, config, transformer)
-            singer.write_state(state)
+            LOGGER.info("Retrying deferred stream %s in %.0f seconds", stream.tap_stream_id, retry_in)
+            time.sleep(retry_in)
+            state = sync_stream(client, writer, config, state, stream, transformer, deadline, fingerprint_index)
+            if deadline.reached:
+                return state
 
     state = singer.set_currently_syncing(state, None)
-    singer.write_state(state)
+    writer.write_state(state)
+    return state
+
+
+def sync_accounts(config, state, catalog):
+    """
+    Syncs every account listed in the `accounts` config, each on its own
+    thread with its own client and state, sharing the connection pool and a
+    cap on concurrent requests. With `adaptive_concurrency`, every account
+    adapts its own limit to its own rate limit, under that cap.
+    """
+    accounts = config["accounts"]
+    names = [account.get("name") for account in accounts]
+    if not all(names) or len(set(names)) != len(names) or not all(account.get("api_token") for account in accounts):
+        raise InvalidConfig("every account needs a unique name and an api_token")
+
+    max_concurrent_requests = int(config.get("max_concurrent_requests", 8))
+    adapter = requests.adapters.HTTPAdapter(pool_connections=2, pool_maxsize=max_concurrent_requests)
+    shared_limiter = get_shared_limiter(config)
+    deadline = Deadline(config.get("max_runtime"))
+    shared = SharedOutput(get_writer(config), state)
+
+    def sync_account(account):
+        name = account["name"]
+        validator_store = ValidatorStore(f"{config['http_cache_path']}.{name}") \
+            if config.get("http_cache_path") else None
+        client = Client(account["api_token"], validator_store=validator_store, adapter=adapter,
+                        limiter=get_limiter(config, name), shared_limiter=shared_limiter,
+                        **get_client_options(config))
+        fingerprint_index = get_fingerprint_index(config, name)
+
+        LOGGER.info("Starting sync for account: %s", name)
+        try:
+            sync_streams(client, AccountWriter(shared, name), {**config, **account},
+                         shared.get_account_state(name), catalog, deadline, fingerprint_index)
+        finally:
+            client.close()
+            if fingerprint_index is not None:
+                fingerprint_index.close()
+
+        if validator_store is not None:
+            validator_store.save()
+
+    with ThreadPoolExecutor(max_workers=len(accounts)) as executor:
+        for future in [executor.submit(sync_account, account) for account in accounts]:
+            future.result()
+
+    shared.writer.close()
+
+
+def sync(config, state, catalog):
+    """Sync data from tap source"""
+
+    if config.get("accounts"):
+        sync_accounts(config, state, catalog)
+        return
+
+    validator_store = ValidatorStore(config["http_cache_path"]) if config.get("http_cache_path") else None
+    client = Client(config.get("api_token"), validator_store=validator_store, limiter=get_limiter(config),
+                    **get_client_options(config))
+    writer = get_writer(config)
+    fingerprint_index = get_fingerprint_index(config)
+
+    try:
+        sync_streams(client, writer, config, state, catalog, Deadline(config.get("max_runtime")), fingerprint_index)
+    finally:
+        client.close()
+        if fingerprint_index is not None:
+            fingerprint_index.close()
+    writer.close()
+
+    if validator_store is not None:
+        validator_store.save()
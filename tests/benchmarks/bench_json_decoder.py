@@ -0,0 +1,88 @@
+"""
+Decode throughput benchmark of the JSON decoders on `conversation_export` bodies.
+
+Builds a synthetic response body of conversations and decodes it with every
+installed decoder, checking each returns the same objects as the json module.
+
+    python tests/benchmarks/bench_json_decoder.py [record_count] [repeat]
+"""
+import json
+import random
+import sys
+import time
+
+from tap_dixa.decoders import DECODER_NAMES, _get_decoders
+
+CHANNELS = ["email", "widgetchat", "pstn_phone", "messenger", "whatsapp"]
+QUEUES = [f"Queue {i}" for i in range(10)]
+AGENTS = [f"Agent {i}" for i in range(50)]
+
+
+def synthetic_conversations(count: int, seed: int = 7) -> bytes:
+    """
+    Returns a response body shaped like the `conversation_export` response.
+    """
+    rng = random.Random(seed)
+    records = []
+    for i in range(count):
+        created_at = 1629181750735 + i * 1000
+        agent = rng.choice(AGENTS)
+        records.append({
+            "id": 100000 + i,
+            "created_at": created_at,
+            "initial_channel": rng.choice(CHANNELS),
+            "requester_id": f"{rng.getrandbits(128):032x}",
+            "requester_name": f"Customer {rng.randrange(10_000)}",
+            "requester_email": f"customer{rng.randrange(10_000)}@example.com",
+            "requester_phone_number": None,
+            "queued_at": created_at + 500,
+            "queue_id": f"{rng.getrandbits(128):032x}",
+            "queue_name": rng.choice(QUEUES),
+            "closed_at": created_at + rng.randrange(60_000, 6_000_000),
+            "rating_score": rng.choice([None, 1, 2, 3, 4, 5]),
+            "rating_message": rng.choice([None, "Great help, thanks! 👍", "Très bien"]),
+            "direction": rng.choice(["inbound", "outbound"]),
+            "assigned_at": created_at + 1500,
+            "assignee_id": f"{rng.getrandbits(128):032x}",
+            "assignee_name": agent,
+            "assignee_email": f"{agent.replace(' ', '.').lower()}@example.com",
+            "total_duration": rng.randrange(100_000),
+            "handling_duration": rng.randrange(100_000),
+            "conversation_wrapup_notes": [],
+            "originating_country": rng.choice(["DK", "SE", "DE", "GB"]),
+            "updated_at": created_at + rng.randrange(6_000_000),
+            "last_message_created_at": created_at + rng.randrange(6_000_000),
+            "status": rng.choice(["closed", "open", "pending"]),
+            "subject": " ".join(rng.choice(["order", "refund", "delivery", "question", "invoice"]) for _ in range(5)),
+            "tags": rng.sample(["vip", "billing", "bug", "feedback", "urgent"], 2),
+            "custom_fields": [{"id": f"{rng.getrandbits(64):016x}", "name": "Order number",
+                               "value": str(rng.randrange(10 ** 8))}],
+            "tags_info": [],
+            "ratings": [],
+        })
+    return json.dumps(records).encode("utf-8")
+
+
+def main(count: int, repeat: int):
+    body = synthetic_conversations(count)
+    expected = json.loads(body)
+    decoders = _get_decoders()
+
+    print(f"records: {count}, body: {len(body) / 1024 / 1024:.2f} MiB")
+    for name in DECODER_NAMES:
+        if name not in decoders:
+            print(f"{name:10} not installed")
+            continue
+        decode = decoders[name]
+        if decode(body) != expected:
+            raise AssertionError(f"{name} does not return the same objects as the json module")
+
+        started = time.perf_counter()
+        for _ in range(repeat):
+            decode(body)
+        seconds = (time.perf_counter() - started) / repeat
+        print(f"{name:10} {seconds * 1000:8.1f} ms {len(body) / seconds / 1024 / 1024:8.1f} MiB/s")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20_000, int(sys.argv[2]) if len(sys.argv) > 2 else 5)
@@ -0,0 +1,85 @@
+"""
+Memory benchmark of RecordBuffer against a list of record dictionaries.
+
+Builds synthetic `message_export` records and measures the memory held by
+each representation with tracemalloc.
+
+    python tests/benchmarks/bench_record_buffer.py [record_count]
+"""
+import json
+import random
+import sys
+import tracemalloc
+
+from tap_dixa.helpers import get_abs_path
+from tap_dixa.records import RecordBuffer
+
+CHANNELS = ["email", "widgetchat", "pstn_phone", "messenger", "whatsapp"]
+AUTHORS = [f"Agent {i}" for i in range(50)]
+
+
+def synthetic_messages(count: int, seed: int = 7):
+    """
+    Yields message records shaped like the `message_export` response. Every
+    record is decoded from JSON so no string is shared between records, as
+    with a real response.
+    """
+    rng = random.Random(seed)
+    for i in range(count):
+        author = rng.choice(AUTHORS)
+        record = {
+            "id": f"{rng.getrandbits(128):032x}",
+            "csid": 100000 + i // 4,
+            "created_at": 1629181750735 + i * 1000,
+            "initial_channel": rng.choice(CHANNELS),
+            "author_name": author,
+            "author_email": f"{author.replace(' ', '.').lower()}@example.com",
+            "direction": rng.choice(["inbound", "outbound"]),
+            "text": " ".join(rng.choice(["hello", "order", "refund", "thanks", "shipping"]) for _ in range(12)),
+            "from_phone_number": None,
+            "to_phone_number": None,
+            "duration": None,
+            "from": f"{author.replace(' ', '.').lower()}@example.com",
+            "is_automated_message": rng.random() < 0.1,
+            "voicemail_url": None,
+            "recording_url": None,
+            "chat_input_question": None,
+            "chat_input_answer": None,
+            "chat_menu_text": None,
+            "attached_files": [],
+            "bcc": [],
+            "cc": [],
+            "to": ["customer@example.com"],
+        }
+        yield json.loads(json.dumps(record))
+
+
+def measure(build):
+    tracemalloc.start()
+    held = build()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return held, size
+
+
+def main(count: int):
+    with open(get_abs_path("schemas/messages.json")) as file:
+        schema = json.load(file)
+
+    _, dict_size = measure(lambda: list(synthetic_messages(count)))
+
+    def build_buffer():
+        buffer = RecordBuffer(schema)
+        buffer.extend(synthetic_messages(count))
+        return buffer
+
+    _, buffer_size = measure(build_buffer)
+
+    print(f"records:      {count}")
+    print(f"list of dict: {dict_size / 1024 / 1024:8.2f} MiB ({dict_size / count:.0f} B/record)")
+    print(f"RecordBuffer: {buffer_size / 1024 / 1024:8.2f} MiB ({buffer_size / count:.0f} B/record)")
+    print(f"ratio:        {dict_size / buffer_size:8.2f}x")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000)
@@ -27,7 +27,9 @@ class DixaBookMarkTest(DixaBaseTest):
         """
         
         
-        expected_streams = self.expected_streams()
+        # Full table streams skip unchanged snapshots, so later syncs may not emit their records
+        expected_streams = {stream for stream, method in self.expected_replication_method().items()
+                            if method == self.INCREMENTAL}
         expected_replication_keys = self.expected_replication_keys()
         expected_replication_methods = self.expected_replication_method()
 
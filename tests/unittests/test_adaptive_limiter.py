@@ -0,0 +1,82 @@
+import unittest
+from unittest import mock
+
+import requests
+
+from tap_dixa.client import Client
+from tap_dixa.limits import AdaptiveLimiter
+
+
+class Mockresponse:
+    def __init__(self, resp, status_code=200):
+        self.json_data = resp
+        self.status_code = status_code
+        self.headers = {}
+
+    def json(self):
+        return self.json_data
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.HTTPError("sample message")
+
+
+class TestAdaptiveLimiter(unittest.TestCase):
+    """
+    Test cases to verify the limit grows additively and is cut multiplicatively on 429 and 503.
+    """
+
+    def test_additive_increase(self):
+        limiter = AdaptiveLimiter(8, initial_limit=2)
+        for i in range(5):
+            limiter.record(i, i + 0.1, 200)
+
+        # One slot per limit requests answered: 2 requests to reach 3, 3 more to reach 4
+        self.assertEqual(limiter.limit, 4)
+
+        for i in range(100):
+            limiter.record(i, i + 0.1, 200)
+        self.assertEqual(limiter.limit, 8)
+
+    def test_no_increase_when_latency_grows(self):
+        limiter = AdaptiveLimiter(8, initial_limit=2)
+        limiter.record(0, 0.1, 200)
+        for i in range(10):
+            limiter.record(i, i + 0.5, 200)
+        self.assertEqual(limiter.limit, 2)
+
+    def test_multiplicative_decrease(self):
+        limiter = AdaptiveLimiter(16, initial_limit=16)
+        limiter.record(0, 1, 429)
+        self.assertEqual(limiter.limit, 8)
+
+        # Requests sent before the cut do not cut the limit again
+        limiter.record(0.5, 1.2, 503)
+        self.assertEqual(limiter.limit, 8)
+
+        limiter.record(1.5, 2, 503)
+        self.assertEqual(limiter.limit, 4)
+
+        for i in range(3, 10):
+            limiter.record(i, i + 1, 429)
+        self.assertEqual(limiter.limit, 1)
+
+    def test_limit_is_logged(self):
+        limiter = AdaptiveLimiter(4, initial_limit=4)
+        with mock.patch("singer.metrics.log") as mocked_log:
+            limiter.record(0, 1, 429)
+            limiter.record(0.5, 1, 429)
+
+        self.assertEqual(mocked_log.call_count, 1)
+        self.assertEqual(mocked_log.call_args[0][1].value, 2)
+
+    @mock.patch("time.sleep")
+    @mock.patch("requests.Session.request")
+    def test_client_reports_outcomes(self, mocked_request, mocked_sleep):
+        mocked_request.side_effect = [Mockresponse({}, 429), Mockresponse({"data": []})]
+        limiter = AdaptiveLimiter(8, initial_limit=8)
+
+        Client("test", limiter=limiter).get("https://dev.dixa.io", "/v1/agents")
+
+        self.assertEqual(limiter.limit, 4)
+        self.assertEqual(limiter._in_use, 0)
@@ -0,0 +1,104 @@
+import gzip
+import io
+import json
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from singer import Transformer
+
+from tap_dixa.exceptions import InvalidConfig
+from tap_dixa.output import BatchWriter, RecordWriter, get_writer
+from tap_dixa.streams import Conversations
+
+
+def read_messages(stdout):
+    return [json.loads(line) for line in stdout.getvalue().splitlines()]
+
+
+class TestBatchWriter(unittest.TestCase):
+    """
+    Test cases to verify records are written to rotating batch files
+    and bookmarks are emitted only after the files are sealed.
+    """
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+
+    @mock.patch("sys.stdout", new_callable=io.StringIO)
+    def test_files_rotate_on_max_records(self, stdout):
+        writer = BatchWriter(self.tmp_dir.name, max_records=2)
+        for i in range(5):
+            writer.write_record("conversations", {"id": i, "updated_at": i})
+        writer.flush()
+
+        batches = [msg for msg in read_messages(stdout) if msg["type"] == "BATCH"]
+        self.assertEqual(len(batches), 3)
+
+        records = []
+        for batch in batches:
+            self.assertEqual(batch["stream"], "conversations")
+            self.assertEqual(batch["encoding"], {"format": "jsonl", "compression": "gzip"})
+            path = batch["manifest"][0][len("file://"):]
+            with gzip.open(path, "rt") as batch_file:
+                records.extend(json.loads(line) for line in batch_file)
+
+        self.assertEqual([record["id"] for record in records], [0, 1, 2, 3, 4])
+        self.assertFalse([name for name in os.listdir(self.tmp_dir.name) if name.endswith(".part")])
+
+    @mock.patch("sys.stdout", new_callable=io.StringIO)
+    def test_state_is_held_until_file_is_sealed(self, stdout):
+        writer = BatchWriter(self.tmp_dir.name, max_records=3)
+        writer.write_record("messages", {"id": "a"})
+        writer.write_record("messages", {"id": "b"})
+        writer.write_state({"bookmarks": {"messages": {"created_at": 2}}})
+        self.assertEqual(read_messages(stdout), [])
+
+        writer.write_record("messages", {"id": "c"})
+        messages = read_messages(stdout)
+        self.assertEqual([msg["type"] for msg in messages], ["BATCH", "STATE"])
+        self.assertEqual(messages[1]["value"], {"bookmarks": {"messages": {"created_at": 2}}})
+
+    @mock.patch("sys.stdout", new_callable=io.StringIO)
+    def test_state_without_open_file_is_written_immediately(self, stdout):
+        writer = BatchWriter(self.tmp_dir.name)
+        writer.write_state({"currently_syncing": "messages"})
+        self.assertEqual(read_messages(stdout)[0]["type"], "STATE")
+
+    def test_invalid_compression(self):
+        with self.assertRaises(InvalidConfig):
+            BatchWriter(self.tmp_dir.name, compression="lz4")
+
+    def test_get_writer(self):
+        self.assertIsInstance(get_writer({}), RecordWriter)
+        self.assertIsInstance(get_writer({"output_mode": "batch", "batch_dir": self.tmp_dir.name}), BatchWriter)
+        with self.assertRaises(InvalidConfig):
+            get_writer({"output_mode": "csv"})
+
+
+class TestIncrementalSyncWithBatches(unittest.TestCase):
+    """
+    Test cases to verify the incremental sync bookmarks every window through the writer.
+    """
+
+    @mock.patch("sys.stdout", new_callable=io.StringIO)
+    def test_bookmark_written_after_batch(self, stdout):
+        client = mock.Mock()
+        client.get.side_effect = lambda *args, **kwargs: [
+            {"id": 1, "updated_at": kwargs["params"]["updated_after"]}]
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            writer = BatchWriter(tmp_dir)
+            stream = Conversations(client, writer)
+            schema = {"type": "object", "properties": {"id": {"type": "integer"}, "updated_at": {"type": "integer"}}}
+            with Transformer() as transformer:
+                state = stream.sync({}, schema, {}, {"start_date": "2021-01-01T00:00:00Z"}, transformer)
+            writer.flush()
+
+        messages = read_messages(stdout)
+        self.assertEqual([msg["type"] for msg in messages], ["BATCH", "STATE"])
+        self.assertEqual(messages[-1]["value"], state)
+        self.assertGreater(client.get.call_count, 1)
+        self.assertGreater(state["bookmarks"]["conversations"]["updated_at"], 1609459200000)
@@ -0,0 +1,175 @@
+import datetime
+import io
+import json
+import unittest
+from unittest import mock
+
+import pytz
+import requests
+from singer import metadata
+
+from tap_dixa.client import Client
+from tap_dixa.discover import discover
+from tap_dixa.exceptions import DixaCircuitOpenError, DixaClient5xxError
+from tap_dixa.helpers import DixaURL
+from tap_dixa.limits import CircuitBreaker
+from tap_dixa.sync import sync
+
+NOW = datetime.datetime(2021, 8, 5, 12, tzinfo=pytz.UTC)
+
+
+class Mockresponse:
+    def __init__(self, resp, status_code=200):
+        self.json_data = resp
+        self.content = json.dumps(resp).encode("utf-8")
+        self.status_code = status_code
+        self.headers = {}
+
+    def json(self):
+        return self.json_data
+
+    def iter_content(self, chunk_size=1):
+        yield json.dumps(self.json_data).encode("utf-8")
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.HTTPError("sample message")
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0
+
+    def __call__(self):
+        return self.now
+
+
+class TestCircuitBreaker(unittest.TestCase):
+    """
+    Test cases to verify the circuit opens after consecutive failures and probes after its cooldown.
+    """
+
+    def setUp(self):
+        self.clock = Clock()
+        patcher = mock.patch("time.monotonic", self.clock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_opens_after_threshold(self):
+        circuit_breaker = CircuitBreaker("host", failure_threshold=3, cooldown=60)
+        for success in (False, False, True, False, False):
+            circuit_breaker.before_request()
+            circuit_breaker.record(success)
+        self.assertEqual(circuit_breaker.state, CircuitBreaker.CLOSED)
+
+        circuit_breaker.before_request()
+        circuit_breaker.record(False)
+        self.clock.now = 20
+        with self.assertRaises(DixaCircuitOpenError) as context:
+            circuit_breaker.before_request()
+        self.assertEqual(context.exception.retry_in, 40)
+
+    def test_half_open_probe(self):
+        circuit_breaker = CircuitBreaker("host", failure_threshold=1, cooldown=60)
+        circuit_breaker.record(False)
+
+        self.clock.now = 60
+        circuit_breaker.before_request()
+        self.assertEqual(circuit_breaker.state, CircuitBreaker.HALF_OPEN)
+        # A single probe is let through at a time
+        with self.assertRaises(DixaCircuitOpenError):
+            circuit_breaker.before_request()
+
+        circuit_breaker.record(False)
+        self.assertEqual(circuit_breaker.retry_in(), 60)
+
+        self.clock.now = 120
+        circuit_breaker.before_request()
+        circuit_breaker.record(True)
+        self.assertEqual(circuit_breaker.state, CircuitBreaker.CLOSED)
+
+    @mock.patch("time.sleep")
+    @mock.patch("requests.Session.request", return_value=Mockresponse({}, 500))
+    def test_client_fails_fast_per_host(self, mocked_request, mocked_sleep):
+        client = Client("test", failure_threshold=2)
+
+        with self.assertRaises(DixaCircuitOpenError):
+            client.get(DixaURL.EXPORTS.value, "/v1/conversation_export")
+        self.assertEqual(mocked_request.call_count, 2)
+
+        with self.assertRaises(DixaCircuitOpenError):
+            client.get(DixaURL.EXPORTS.value, "/v1/message_export")
+        self.assertEqual(mocked_request.call_count, 2)
+
+        # The other host has a circuit of its own
+        with self.assertRaises(DixaCircuitOpenError):
+            client.get(DixaURL.INTEGRATIONS.value, "/v1/conversations/activitylog")
+        self.assertEqual(mocked_request.call_count, 4)
+
+
+@mock.patch("singer.utils.now", return_value=NOW)
+class TestDeferredStreams(unittest.TestCase):
+    """
+    Test cases to verify streams of a failing host step aside for the streams of a healthy host.
+    """
+
+    config = {"start_date": "2021-08-05T00:00:00Z", "api_token": "x", "circuit_failure_threshold": 2,
+              "circuit_cooldown": 300}
+
+    def setUp(self):
+        self.clock, self.sleeps = Clock(), []
+
+        def sleep(seconds):
+            self.sleeps.append(seconds)
+            self.clock.now += seconds
+
+        for patcher in (mock.patch("time.monotonic", self.clock), mock.patch("time.sleep", side_effect=sleep)):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def sync(self, exports_failures):
+        catalog = discover({})
+        for stream in catalog.streams:
+            if stream.tap_stream_id in ("conversations", "activity_logs"):
+                stream.metadata = metadata.to_list(
+                    metadata.write(metadata.to_map(stream.metadata), (), "selected", True))
+
+        requested = []
+
+        def request(method, url, headers=None, params=None, data=None, stream=False):
+            requested.append(url)
+            if url.startswith(DixaURL.EXPORTS.value):
+                if len([url for url in requested if url.startswith(DixaURL.EXPORTS.value)]) <= exports_failures:
+                    return Mockresponse({}, 503)
+                return Mockresponse([{"id": 1, "updated_at": params["updated_after"] + 1}])
+            return Mockresponse({"data": [{"id": "a1", "activityTimestamp": "2021-08-05T01:00:00Z"}],
+                                 "meta": {"next": None}})
+
+        stdout = io.StringIO()
+        with mock.patch("requests.Session.request", side_effect=request), mock.patch("sys.stdout", stdout):
+            try:
+                sync(self.config, {"currently_syncing": "conversations"}, catalog)
+            finally:
+                self.messages = [json.loads(line) for line in stdout.getvalue().splitlines()]
+        return requested
+
+    def get_streams(self):
+        return [message["stream"] for message in self.messages if message["type"] == "RECORD"]
+
+    def test_failing_stream_is_retried_last(self, *args):
+        requested = self.sync(exports_failures=2)
+
+        # The circuit opened before the third try of the window, activity logs went on
+        self.assertEqual([url.startswith(DixaURL.EXPORTS.value) for url in requested], [True, True, False, True])
+        self.assertEqual(self.get_streams(), ["activity_logs", "conversations"])
+        # A backoff sleep, then the wait for the probe
+        self.assertEqual(self.sleeps, [60, 300])
+        self.assertIsNone(self.messages[-1]["value"]["currently_syncing"])
+
+    def test_still_failing_stream_fails_the_run(self, *args):
+        with self.assertRaises((DixaCircuitOpenError, DixaClient5xxError)):
+            self.sync(exports_failures=10)
+
+        self.assertEqual(self.get_streams(), ["activity_logs"])
+        state = [message["value"] for message in self.messages if message["type"] == "STATE"][-1]
+        self.assertEqual(state["currently_syncing"], "conversations")
@@ -0,0 +1,108 @@
+import base64
+import random
+import threading
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+import requests
+
+from tap_dixa.client import Client
+from tap_dixa.helpers import DixaURL
+
+EXPORTS_AUTH = "Basic " + base64.b64encode(b"bearer:token").decode("utf-8")
+
+
+class Mockresponse:
+    def __init__(self, resp, status_code=200):
+        self.json_data = resp
+        self.status_code = status_code
+        self.headers = {}
+
+    def json(self):
+        return self.json_data
+
+
+class TestClientThreads(unittest.TestCase):
+    """
+    Test cases to verify a single client can be called from many threads at once.
+    """
+
+    def setUp(self):
+        self.sent = []
+        self.lock = threading.Lock()
+
+        def request(session, method, url, headers=None, params=None, data=None, stream=False):
+            # Widens the window for requests to interleave
+            time.sleep(random.random() / 1000)
+            with self.lock:
+                self.sent.append((url, dict(headers or {}), params, id(session), threading.get_ident()))
+            return Mockresponse({"url": url, "params": params})
+
+        patcher = mock.patch("requests.Session.request", autospec=True, side_effect=request)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_no_cross_host_header_mixups(self):
+        client = Client("token")
+        hosts = [DixaURL.EXPORTS.value, DixaURL.INTEGRATIONS.value, "https://test.com"]
+
+        def call(i):
+            base_url = hosts[i % len(hosts)]
+            return base_url, i, client.get(base_url, "/endpoint", params={"i": i})
+
+        with ThreadPoolExecutor(max_workers=16) as executor:
+            results = list(executor.map(call, range(600)))
+
+        for base_url, i, response in results:
+            self.assertEqual(response, {"url": f"{base_url}/endpoint", "params": {"i": i}})
+
+        self.assertEqual(len(self.sent), 600)
+        expected = {DixaURL.EXPORTS.value: {"Authorization": EXPORTS_AUTH},
+                    DixaURL.INTEGRATIONS.value: {"Authorization": "token"},
+                    "https://test.com": {}}
+        for url, headers, _, _, _ in self.sent:
+            self.assertEqual(headers, expected[url[:-len("/endpoint")]])
+
+    def test_sessions_are_per_thread(self):
+        client = Client("token")
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            list(executor.map(lambda i: client.get(DixaURL.INTEGRATIONS.value, "/endpoint"), range(200)))
+
+        sessions_per_thread = {}
+        for _, _, _, session, thread in self.sent:
+            sessions_per_thread.setdefault(thread, set()).add(session)
+        self.assertTrue(all(len(sessions) == 1 for sessions in sessions_per_thread.values()))
+        self.assertEqual(len({session for _, _, _, session, _ in self.sent}), len(sessions_per_thread))
+
+    def test_auth_is_encoded_once(self):
+        with mock.patch.object(Client, "_to_base64", wraps=Client._to_base64) as mocked_to_base64:
+            client = Client("token")
+            for _ in range(10):
+                client.get(DixaURL.EXPORTS.value, "/endpoint")
+        self.assertEqual(mocked_to_base64.call_count, 1)
+
+    def test_headers_are_immutable(self):
+        client = Client("token")
+        client._get_headers(DixaURL.EXPORTS.value)["Authorization"] = "changed"
+
+        client.get(DixaURL.EXPORTS.value, "/endpoint")
+
+        self.assertEqual(self.sent[-1][1], {"Authorization": EXPORTS_AUTH})
+        with self.assertRaises(TypeError):
+            client._host_headers[DixaURL.EXPORTS.value]["Authorization"] = "changed"
+
+    def test_adapter_is_shared_between_sessions(self):
+        adapter = requests.adapters.HTTPAdapter()
+        client = Client("token", adapter=adapter)
+
+        sessions = []
+        thread = threading.Thread(target=lambda: sessions.append(client._get_session()))
+        thread.start()
+        thread.join()
+        sessions.append(client._get_session())
+
+        self.assertIsNot(sessions[0], sessions[1])
+        self.assertTrue(all(session.get_adapter("https://dev.dixa.io") is adapter for session in sessions))
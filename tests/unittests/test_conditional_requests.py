@@ -0,0 +1,133 @@
+import copy
+import datetime
+import json
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import pytz
+
+from singer import Transformer
+
+from tap_dixa.client import Client, ValidatorStore
+from tap_dixa.helpers import datetime_to_unix_ms
+from tap_dixa.streams import ActivityLogs, Messages
+
+
+class Mockresponse:
+    def __init__(self, resp, status_code, headers=None):
+        self.json_data = resp
+        self.content = json.dumps(resp).encode("utf-8")
+        self.status_code = status_code
+        self.headers = headers or {}
+
+    def json(self):
+        return self.json_data
+
+
+class TestConditionalRequests(unittest.TestCase):
+    """
+    Test cases to verify validators are stored and 304 responses are answered from the stored body.
+    """
+
+    @mock.patch("requests.Session.request")
+    def test_validators_sent_on_repeat_request(self, mocked_request):
+        mocked_request.side_effect = [
+            Mockresponse([{"id": "a"}], 200, {"ETag": '"v1"', "Last-Modified": "Tue, 17 Aug 2021 06:29:10 GMT"}),
+            Mockresponse(None, 304),
+        ]
+        client = Client("test", validator_store=ValidatorStore())
+
+        self.assertEqual(client.get("https://test.com", "/test", params={"a": 1, "b": 2}), [{"id": "a"}])
+        self.assertEqual(client.get("https://test.com", "/test", params={"b": 2, "a": 1}), [{"id": "a"}])
+
+        headers = mocked_request.call_args_list[1][1]["headers"]
+        self.assertEqual(headers["If-None-Match"], '"v1"')
+        self.assertEqual(headers["If-Modified-Since"], "Tue, 17 Aug 2021 06:29:10 GMT")
+
+    @mock.patch("requests.Session.request", return_value=Mockresponse([], 200, {"ETag": '"v1"'}))
+    def test_no_validators_without_store(self, mocked_request):
+        client = Client("test")
+        client.get("https://test.com", "/test")
+        client.get("https://test.com", "/test")
+        self.assertNotIn("If-None-Match", mocked_request.call_args_list[1][1]["headers"])
+
+    def test_store_persists_and_is_bounded(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "validators.json")
+            store = ValidatorStore(path, max_entries=2)
+            for i in range(3):
+                store.update("https://test.com/x", {"page": i}, {"ETag": f'"{i}"'}, f"[{i}]".encode("utf-8"))
+            store.update("https://test.com/x", {"page": 3}, {}, b"[3]")
+            store.save()
+
+            loaded = ValidatorStore(path)
+            self.assertEqual(loaded.get("https://test.com/x", {"page": 0}), ({}, None))
+            self.assertEqual(loaded.get("https://test.com/x", {"page": 2}), ({"If-None-Match": '"2"'}, b"[2]"))
+            self.assertEqual(loaded.get("https://test.com/x", {"page": 3}), ({}, None))
+
+class ExportAPI:
+    """
+    A message created at noon every day, whose export windows answer 304 to their own ETag.
+    """
+
+    def __init__(self):
+        self.created_at = [datetime_to_unix_ms(datetime.datetime(2021, 8, day, 12, tzinfo=pytz.UTC))
+                           for day in range(1, 7)]
+        self.not_modified = 0
+
+    def request(self, method, url, headers=None, params=None, data=None, stream=False):
+        records = [{"id": value, "created_at": value} for value in self.created_at
+                   if params["created_after"] <= value <= params["created_before"]]
+        etag = f'"{len(records)}-{params["created_after"]}"'
+        if (headers or {}).get("If-None-Match") == etag:
+            self.not_modified += 1
+            return Mockresponse(None, 304)
+        response = Mockresponse(None, 200, {"ETag": etag})
+        response.iter_content = lambda chunk_size=1: iter([json.dumps(records).encode("utf-8")])
+        return response
+
+
+@mock.patch("singer.utils.now", return_value=datetime.datetime(2021, 8, 7, tzinfo=pytz.UTC))
+class TestConditionalWindows(unittest.TestCase):
+    """
+    Test cases to verify export windows are requested without validators.
+    """
+
+    def sync(self, api, store, state, config):
+        writer = mock.Mock(serialized_output=False)
+        with mock.patch("requests.Session.request", side_effect=api.request), Transformer() as transformer:
+            state = Messages(Client("test", validator_store=store), writer).sync(
+                copy.deepcopy(state), {"type": "object", "properties": {"id": {"type": "integer"},
+                                                                        "created_at": {"type": "integer"}}},
+                {}, config, transformer)
+        return state, [call[0][1]["id"] for call in writer.write_record.call_args_list]
+
+    def test_windows_requested_again(self, *args):
+        api, store = ExportAPI(), ValidatorStore()
+        # The lookback reaches the start date, so every sync requests the same windows
+        config = {"start_date": "2021-08-01T00:00:00Z", "interval": "DAY", "lookback_days": 30}
+        state = {"bookmarks": {"messages": {"created_at": api.created_at[0]}}}
+        state, emitted = self.sync(api, store, state, config)
+        self.assertEqual(emitted, api.created_at)
+
+        _, emitted = self.sync(api, store, state, config)
+        self.assertEqual(emitted, api.created_at)
+        self.assertEqual(api.not_modified, 0)
+
+    @mock.patch("requests.Session.request")
+    def test_activity_log_pages_requested_again(self, mocked_request, *args):
+        mocked_request.return_value = Mockresponse(
+            {"data": [{"id": "a", "activityTimestamp": "2021-08-02T00:00:00Z"}], "meta": {}}, 200, {"ETag": '"v1"'})
+        store = ValidatorStore()
+        schema = {"type": "object", "properties": {"id": {"type": "string"},
+                                                   "activityTimestamp": {"type": "string", "format": "date-time"}}}
+        for _ in range(2):
+            writer = mock.Mock()
+            with Transformer() as transformer:
+                ActivityLogs(Client("test", validator_store=store), writer).sync(
+                    {}, schema, {}, {"start_date": "2021-08-01T00:00:00Z"}, transformer)
+            self.assertEqual(writer.write_record.call_count, 1)
+
+        self.assertNotIn("If-None-Match", mocked_request.call_args[1]["headers"])
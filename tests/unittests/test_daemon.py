@@ -0,0 +1,166 @@
+import datetime
+import json
+import os
+import sys
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+import pytz
+from singer import metadata
+
+import tap_dixa
+from tap_dixa.client import Client
+from tap_dixa.daemon import Daemon
+from tap_dixa.discover import discover
+from tap_dixa.exceptions import InvalidConfig
+from tap_dixa.helpers import datetime_to_unix_ms
+
+NOW = datetime.datetime(2021, 8, 3, tzinfo=pytz.UTC)
+CONFIG = {"start_date": "2021-08-01T00:00:00Z", "api_token": "x", "interval": "DAY", "daemon_interval": 0}
+
+
+class Mockresponse:
+    def __init__(self, resp, status_code=200):
+        self.content = json.dumps(resp).encode("utf-8")
+        self.status_code = status_code
+        self.headers = {}
+
+    def iter_content(self, chunk_size=1):
+        yield self.content
+
+
+# Conversations updated at noon on the first two days, filtered on updated_at like the export API
+UPDATED_AT = [datetime_to_unix_ms(datetime.datetime(2021, 8, day, 12, tzinfo=pytz.UTC)) for day in (1, 2)]
+
+
+def request(method, url, headers=None, params=None, data=None, stream=False):
+    return Mockresponse([{"id": updated_at, "updated_at": updated_at} for updated_at in UPDATED_AT
+                         if params["updated_after"] <= updated_at <= params["updated_before"]])
+
+
+def get_catalog(stream_id="conversations"):
+    catalog = discover({})
+    for stream in catalog.streams:
+        if stream.tap_stream_id == stream_id:
+            stream.metadata = metadata.to_list(metadata.write(metadata.to_map(stream.metadata), (), "selected", True))
+    return catalog
+
+
+def read_messages(path):
+    with open(path, encoding="utf-8") as file:
+        return [json.loads(line) for line in file]
+
+
+@mock.patch("singer.utils.now", return_value=NOW)
+@mock.patch("requests.Session.request", side_effect=request)
+class TestDaemon(unittest.TestCase):
+    """
+    Test cases to verify the daemon keeps its client and state from one run to the next.
+    """
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+
+    def test_runs_to_rotating_files(self, mocked_request, *args):
+        config = {**CONFIG, "daemon_output_dir": self.directory, "daemon_keep_files": 2}
+        with mock.patch("tap_dixa.daemon.Client", wraps=Client) as mocked_client:
+            daemon = Daemon(config, {}, get_catalog())
+            daemon.run(max_runs=3)
+
+        self.assertEqual(mocked_client.call_count, 1)
+        self.assertEqual(daemon.runs, 3)
+        files = sorted(os.listdir(self.directory))
+        self.assertEqual(len(files), 2)
+        self.assertTrue(all(name.startswith("tap-dixa-") and name.endswith(".jsonl") for name in files))
+
+        # The first run synced both days, the following ones resume from the bookmark in memory
+        # and emit again the conversation at the bookmark
+        self.assertEqual(mocked_request.call_count, 2 + 1 + 1)
+        messages = read_messages(os.path.join(self.directory, files[-1]))
+        self.assertEqual(len([message for message in messages if message["type"] == "RECORD"]), 1)
+        self.assertEqual(messages[-1]["value"], daemon.state)
+        self.assertIsNone(daemon.state["currently_syncing"])
+
+        # The catalog kept in memory is not changed by the syncs
+        schemas = [[message for message in read_messages(os.path.join(self.directory, name))
+                    if message["type"] == "SCHEMA"] for name in files]
+        self.assertEqual(schemas[0], schemas[1])
+        self.assertEqual(schemas[0][0]["schema"]["properties"]["id"]["type"], ["null", "integer"])
+
+    def test_failed_run(self, mocked_request, *args):
+        calls = []
+
+        def fail_once(*args, **kwargs):
+            calls.append(kwargs)
+            if len(calls) == 2:
+                raise ValueError("connection lost")
+            return request(*args, **kwargs)
+
+        mocked_request.side_effect = fail_once
+        daemon = Daemon({**CONFIG, "daemon_output_dir": self.directory}, {}, get_catalog())
+        daemon.run(max_runs=2)
+
+        # The failed run is written out, and the next one starts over from its state
+        files = sorted(os.listdir(self.directory))
+        self.assertEqual(len(files), 2)
+        self.assertEqual([message["record"]["id"] for message in read_messages(os.path.join(self.directory, files[0]))
+                          if message["type"] == "RECORD"], [UPDATED_AT[0]])
+        self.assertEqual(calls[2]["params"], calls[0]["params"])
+        self.assertIsNone(daemon.state["currently_syncing"])
+
+    def test_nothing_skipped_on_state_kept_in_memory(self, mocked_request, *args):
+        mocked_request.side_effect = lambda *args, **kwargs: Mockresponse({"data": [{"id": "t1", "name": "vip"}]})
+        fingerprint_index = os.path.join(self.directory, "fingerprints.db")
+        config = {**CONFIG, "daemon_output_dir": self.directory, "fingerprint_index": fingerprint_index}
+        state = {"bookmarks": {"tags": {"snapshot_hash": "abc"}}}
+        daemon = Daemon(config, state, get_catalog("tags"))
+        daemon.run(max_runs=2)
+
+        # The unchanged snapshot is emitted again, as the target never confirmed the first run
+        for name in sorted(os.listdir(self.directory)):
+            self.assertEqual([message["record"]["id"] for message in read_messages(os.path.join(self.directory, name))
+                              if message["type"] == "RECORD"], ["t1"])
+        self.assertNotIn("snapshot_hash", daemon.state["bookmarks"]["tags"])
+        self.assertFalse(os.path.exists(fingerprint_index))
+
+    def test_named_pipe(self, *args):
+        pipe = os.path.join(self.directory, "output")
+        outputs = []
+
+        def read():
+            while not os.path.exists(pipe):
+                pass
+            # The pipe is kept open from one run to the next
+            with open(pipe, encoding="utf-8") as file:
+                outputs.append(file.read())
+
+        reader = threading.Thread(target=read, daemon=True)
+        reader.start()
+        Daemon({**CONFIG, "daemon_pipe": pipe}, {}, get_catalog()).run(max_runs=2)
+        reader.join(10)
+
+        self.assertEqual(len(outputs), 1)
+        messages = [json.loads(line) for line in outputs[0].splitlines()]
+        self.assertEqual(len([message for message in messages if message["type"] == "SCHEMA"]), 2)
+        self.assertEqual(messages[-1]["type"], "STATE")
+
+    def test_not_a_pipe(self, *args):
+        path = os.path.join(self.directory, "file")
+        open(path, "w").close()
+        with self.assertRaises(InvalidConfig):
+            with Daemon({**CONFIG, "daemon_pipe": path}, {}, get_catalog()).get_output(NOW):
+                pass
+
+    def test_accounts(self, *args):
+        with self.assertRaises(InvalidConfig):
+            Daemon({**CONFIG, "accounts": [{"name": "eu", "api_token": "x"}]}, {}, get_catalog())
+
+    def test_daemon_argument(self, *args):
+        with mock.patch.object(sys, "argv", ["tap-dixa", "--config", "config.json", "--daemon"]), \
+                mock.patch("singer.utils.load_json", return_value=dict(CONFIG)):
+            args = tap_dixa.parse_args()
+        self.assertTrue(args.daemon)
@@ -0,0 +1,163 @@
+import copy
+import datetime
+import os
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+import pytz
+from singer import Transformer
+
+import tap_dixa
+from tap_dixa.fingerprints import FingerprintIndex, compact, get_fingerprint_index
+from tap_dixa.helpers import datetime_to_unix_ms
+from tap_dixa.streams import ActivityLogs, Conversations
+
+SCHEMA = {"type": "object", "properties": {"id": {"type": "integer"}, "updated_at": {"type": "integer"},
+                                           "status": {"type": "string"}}}
+ACTIVITY_LOGS_SCHEMA = {"type": "object", "properties": {"id": {"type": "string"},
+                                                         "activityTimestamp": {"type": "string"},
+                                                         "status": {"type": "string"}}}
+CONFIG = {"start_date": "2021-08-01T00:00:00Z", "interval": "DAY"}
+DAY = 24 * 60 * 60 * 1000
+
+
+def ms(value):
+    return datetime_to_unix_ms(value)
+
+
+def at_noon(day):
+    return ms(datetime.datetime(2021, 8, day, 12, tzinfo=pytz.UTC))
+
+
+@mock.patch("singer.utils.now", return_value=datetime.datetime(2021, 8, 10, tzinfo=pytz.UTC))
+class TestFingerprintIndex(unittest.TestCase):
+    """
+    Test cases to verify records are only skipped once emitted before a committed bookmark.
+    """
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, "fingerprints.db")
+
+    def test_unchanged_records(self, *args):
+        index = FingerprintIndex(self.path)
+        records = [([i], at_noon(i), {"id": i, "status": "open"}) for i in range(1, 5)]
+        self.assertEqual(index.get_unchanged("conversations", records, at_noon(1)), set())
+
+        # Emitted at or after the bookmark the sync started from, not yet committed
+        self.assertEqual(index.get_unchanged("conversations", records, at_noon(2)), {0})
+        index.close()
+
+        index = FingerprintIndex(self.path)
+        changed = [([3], at_noon(3), {"status": "closed", "id": 3}), ([4], at_noon(4), {"status": "open", "id": 4})]
+        self.assertEqual(index.get_unchanged("conversations", records[:2] + changed, at_noon(5)), {0, 1, 3})
+        self.assertEqual(index.get_unchanged("messages", records, at_noon(5)), set())
+        self.assertEqual(index.skipped, 3)
+        index.close()
+
+    def test_eviction(self, *args):
+        index = FingerprintIndex(self.path, ttl_days=10)
+        now = at_noon(10)
+        index.get_unchanged("conversations", [([1], now - 11 * DAY, {"id": 1}), ([2], now - 9 * DAY, {"id": 2})], 0)
+
+        self.assertEqual(index.compact(), 1)
+        self.assertEqual(index.get_unchanged("conversations", [([2], now - 9 * DAY, {"id": 2})], now), {0})
+        index.close()
+
+    def test_accounts(self, *args):
+        self.assertIsNone(get_fingerprint_index({}))
+        index = get_fingerprint_index({"fingerprint_index": self.path, "fingerprint_ttl_days": 5}, "eu")
+        self.assertEqual((index.path, index.ttl_days), (f"{self.path}.eu", 5))
+        index.close()
+
+        compact({"fingerprint_index": self.path, "accounts": [{"name": "eu"}, {"name": "us"}]})
+        self.assertTrue(os.path.exists(f"{self.path}.us"))
+
+    def test_compact_argument(self, *args):
+        with mock.patch.object(sys, "argv", ["tap-dixa", "--config", "config.json", "--compact-fingerprints"]), \
+                mock.patch("singer.utils.load_json", return_value={**CONFIG, "api_token": "x"}):
+            args = tap_dixa.parse_args()
+        self.assertTrue(args.compact_fingerprints)
+
+
+class API:
+    """
+    Conversations updated at noon every day, filtered on updated_at like the export API.
+    """
+
+    def __init__(self, days):
+        self.records = {day: {"id": day, "updated_at": at_noon(day), "status": "open"} for day in days}
+
+    def get(self, *args, **kwargs):
+        params = kwargs["params"]
+        return copy.deepcopy([record for record in self.records.values()
+                              if params["updated_after"] <= record["updated_at"] <= params["updated_before"]])
+
+    def get_activity_logs(self, *args, **kwargs):
+        return {"data": [{"id": str(record["id"]), "status": record["status"],
+                          "activityTimestamp": f"2021-08-0{record['id']}T12:00:00.000000Z"}
+                         for record in self.records.values()], "meta": {}}
+
+
+class TestLookbackSync(unittest.TestCase):
+    """
+    Test cases to verify a lookback re-sync only emits new and changed records.
+    """
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.config = {**CONFIG, "lookback_days": 3, "fingerprint_index": os.path.join(directory.name, "index.db")}
+
+    def sync(self, stream_class, api_get, state, now, schema=SCHEMA):
+        client, writer = mock.Mock(), mock.Mock(serialized_output=False)
+        client.get.side_effect = api_get
+        index = get_fingerprint_index(self.config)
+        with mock.patch("singer.utils.now", return_value=now), Transformer() as transformer:
+            state = stream_class(client, writer, fingerprint_index=index).sync(
+                copy.deepcopy(state), schema, {}, self.config, transformer)
+            if index is not None:
+                index.close()
+        return state, [call[0][1]["id"] for call in writer.write_record.call_args_list]
+
+    def test_conversations(self):
+        api = API(range(1, 7))
+        state, emitted = self.sync(Conversations, api.get, {}, datetime.datetime(2021, 8, 7, tzinfo=pytz.UTC))
+        self.assertEqual(emitted, [1, 2, 3, 4, 5, 6])
+        self.assertEqual(state["bookmarks"]["conversations"]["updated_at"], at_noon(6))
+
+        # The state of the first sync never came back, so nothing is skipped
+        _, emitted = self.sync(Conversations, api.get, {}, datetime.datetime(2021, 8, 7, tzinfo=pytz.UTC))
+        self.assertEqual(emitted, [1, 2, 3, 4, 5, 6])
+
+        api.records[5]["status"] = "closed"
+        api.records[7] = {"id": 7, "updated_at": at_noon(7), "status": "open"}
+        state, emitted = self.sync(Conversations, api.get, state, datetime.datetime(2021, 8, 8, tzinfo=pytz.UTC))
+
+        # 3 and 4 are unchanged, 6 was emitted at the bookmark
+        self.assertEqual(emitted, [5, 6, 7])
+        self.assertEqual(state["bookmarks"]["conversations"]["updated_at"], at_noon(7))
+
+    def test_without_index(self):
+        self.config.pop("fingerprint_index")
+        api = API(range(1, 7))
+        state = {"bookmarks": {"conversations": {"updated_at": at_noon(6)}}}
+        state, emitted = self.sync(Conversations, api.get, state, datetime.datetime(2021, 8, 8, tzinfo=pytz.UTC))
+        self.assertEqual(emitted, [3, 4, 5, 6])
+        self.assertEqual(state["bookmarks"]["conversations"]["updated_at"], at_noon(6))
+
+    def test_activity_logs(self):
+        api = API(range(1, 7))
+        now = datetime.datetime(2021, 8, 7, tzinfo=pytz.UTC)
+        state, emitted = self.sync(ActivityLogs, api.get_activity_logs, {}, now, ACTIVITY_LOGS_SCHEMA)
+        self.assertEqual(len(emitted), 6)
+
+        api.records[5]["status"] = "closed"
+        with mock.patch("tap_dixa.streams.activitylogs.date_to_rfc3339", side_effect=lambda value: value):
+            state, emitted = self.sync(ActivityLogs, api.get_activity_logs, state, now, ACTIVITY_LOGS_SCHEMA)
+
+        self.assertEqual(emitted, ["5", "6"])
+        self.assertEqual(state["bookmarks"]["activity_logs"]["activityTimestamp"], "2021-08-06T12:00:00.000000Z")
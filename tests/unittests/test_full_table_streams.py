@@ -0,0 +1,94 @@
+import json
+import unittest
+from unittest import mock
+
+from singer import Transformer
+
+from tap_dixa.client import Client, ValidatorStore
+from tap_dixa.discover import get_schemas
+from tap_dixa.streams import Agents, Tags
+
+SCHEMAS, _ = get_schemas()
+
+
+class Mockresponse:
+    def __init__(self, resp, status_code, headers=None):
+        self.json_data = resp
+        self.content = json.dumps(resp).encode("utf-8")
+        self.status_code = status_code
+        self.headers = headers or {}
+
+    def json(self):
+        return self.json_data
+
+
+def agent_pages(*args, **kwargs):
+    page_key = kwargs["params"].get("pageKey")
+    if page_key is None:
+        return {"data": [{"id": "a1", "displayName": "A"}], "meta": {"next": "/v1/agents?pageKey=p2"}}
+    if page_key == "p2":
+        return {"data": [{"id": "a2", "displayName": "B"}], "meta": {"next": "/v1/agents?pageKey=p3"}}
+    return {"data": [{"id": "a3", "displayName": "C"}], "meta": {}}
+
+
+class TestFullTableStreams(unittest.TestCase):
+    """
+    Test cases to verify reference streams page through the API and skip unchanged snapshots.
+    """
+
+    def sync(self, stream_class, client, state):
+        writer = mock.Mock()
+        with Transformer() as transformer:
+            state = stream_class(client, writer).sync(state, SCHEMAS[stream_class.tap_stream_id], {},
+                                                      {"page_size": 1}, transformer)
+        return state, [call[0][1] for call in writer.write_record.call_args_list]
+
+    def test_pages_are_followed(self):
+        client = mock.Mock()
+        client.get.side_effect = agent_pages
+
+        _, records = self.sync(Agents, client, {})
+
+        self.assertEqual([record["id"] for record in records], ["a1", "a2", "a3"])
+        self.assertEqual([call[1]["params"] for call in client.get.call_args_list],
+                         [{"pageLimit": 1}, {"pageLimit": 1, "pageKey": "p2"}, {"pageLimit": 1, "pageKey": "p3"}])
+
+    def test_unchanged_snapshot_is_skipped(self):
+        client = mock.Mock()
+        client.get.return_value = {"data": [{"id": "t1", "name": "vip"}, {"id": "t2", "name": "spam"}]}
+
+        state, records = self.sync(Tags, client, {})
+        self.assertEqual(len(records), 2)
+        self.assertEqual(client.get.call_args[1]["params"], {})
+
+        # Same records in a different order
+        client.get.return_value = {"data": [{"id": "t2", "name": "spam"}, {"id": "t1", "name": "vip"}]}
+        state, records = self.sync(Tags, client, state)
+        self.assertEqual(records, [])
+
+        client.get.return_value = {"data": [{"id": "t1", "name": "vip"}]}
+        state, records = self.sync(Tags, client, state)
+        self.assertEqual(len(records), 1)
+
+    @mock.patch("requests.Session.request")
+    def test_not_modified_pages_are_read_from_the_store(self, mocked_request):
+        etags = {None: '"v1"', "p2": '"v1"', "p3": '"v1"'}
+
+        def request(method, url, headers=None, params=None, **kwargs):
+            etag = etags[params.get("pageKey")]
+            if headers.get("If-None-Match") == etag:
+                return Mockresponse(None, 304)
+            return Mockresponse(agent_pages(params=params), 200, {"ETag": etag})
+
+        mocked_request.side_effect = request
+        client = Client("test", validator_store=ValidatorStore())
+        self.sync(Agents, client, {})
+
+        # The first page changed since the last sync
+        etags[None] = '"v2"'
+        _, records = self.sync(Agents, client, {})
+
+        self.assertEqual([record["id"] for record in records], ["a1", "a2", "a3"])
+        self.assertEqual([call[1]["headers"].get("If-None-Match") for call in mocked_request.call_args_list[3:]],
+                         ['"v1"', '"v1"', '"v1"'])
+        self.assertEqual(mocked_request.call_count, 6)
@@ -0,0 +1,137 @@
+import threading
+import time
+import unittest
+from unittest import mock
+
+from tap_dixa.client import Client
+from tap_dixa.hedging import Hedger
+
+
+class Mockresponse:
+    def __init__(self, resp, status_code=200):
+        self.json_data = resp
+        self.status_code = status_code
+        self.headers = {}
+        self.closed = False
+
+    def json(self):
+        return self.json_data
+
+    def close(self):
+        self.closed = True
+
+
+class Sender:
+    """
+    Answers requests immediately, except the ones listed as slow, failing or unavailable.
+    """
+
+    def __init__(self, slow=(), failing=(), delay=0.5, unavailable=()):
+        self.slow, self.failing, self.delay, self.unavailable = slow, failing, delay, unavailable
+        self.calls = 0
+        self.responses = []
+        self.lock = threading.Lock()
+
+    def __call__(self, *args, **kwargs):
+        with self.lock:
+            self.calls += 1
+            call = self.calls
+        if call in self.slow:
+            time.sleep(self.delay)
+        if call in self.failing:
+            raise ConnectionError("Connection reset by peer")
+        response = Mockresponse({"call": call}, 503 if call in self.unavailable else 200)
+        self.responses.append(response)
+        return response
+
+
+class TestHedger(unittest.TestCase):
+    """
+    Test cases to verify slow requests are hedged within the extra load allowed.
+    """
+
+    def warm_up(self, hedger, send, count=20):
+        for _ in range(count):
+            hedger.request("url", send)
+
+    def test_slow_request_is_hedged(self):
+        hedger, send = Hedger(percentile=90, max_ratio=0.1), Sender(slow=(21,))
+        self.warm_up(hedger, send)
+
+        started = time.monotonic()
+        response = hedger.request("url", send)
+
+        self.assertLess(time.monotonic() - started, 0.4)
+        self.assertEqual(response.json(), {"call": 22})
+        self.assertEqual((hedger.requests, hedger.fired, hedger.won), (21, 1, 1))
+
+        # The response of the request which lost is closed once it comes in
+        time.sleep(0.6)
+        self.assertTrue(send.responses[-1].closed)
+        hedger.close()
+
+    def test_no_hedge_without_samples(self):
+        hedger, send = Hedger(max_ratio=1), Sender(slow=(1,), delay=0.1)
+        self.assertEqual(hedger.request("url", send).json(), {"call": 1})
+        self.assertEqual((send.calls, hedger.fired), (1, 0))
+
+    def test_extra_load_is_capped(self):
+        hedger, send = Hedger(percentile=90, max_ratio=0.05), Sender(slow=(21, 22, 23), delay=0.1)
+        self.warm_up(hedger, send)
+
+        for _ in range(3):
+            hedger.request("url", send)
+
+        # 5% of 23 requests allows a single hedge
+        self.assertEqual(hedger.fired, 1)
+        self.assertEqual(send.calls, 24)
+
+    def test_failed_request_loses(self):
+        hedger, send = Hedger(percentile=90, max_ratio=0.1), Sender(slow=(21,), failing=(21,), delay=0.2)
+        self.warm_up(hedger, send)
+
+        self.assertEqual(hedger.request("url", send).json(), {"call": 22})
+
+        with self.assertRaises(ConnectionError):
+            Hedger().request("url", Sender(failing=(1,)))
+
+    def test_error_response_loses(self):
+        hedger = Hedger(percentile=90, max_ratio=0.1)
+        send = Sender(slow=(21,), unavailable=(21,), delay=0.2)
+        self.warm_up(hedger, send)
+
+        self.assertEqual(hedger.request("url", send).json(), {"call": 22})
+
+        # Without a winning response the first answer is returned
+        send = Sender(slow=(21,), unavailable=(21, 22), delay=0.2)
+        self.warm_up(hedger, send)
+        self.assertEqual(hedger.request("url", send).status_code, 503)
+        hedger.close()
+
+    def test_primary_request_is_not_queued(self):
+        hedger, send = Hedger(percentile=90, max_ratio=1, max_hedges=1), Sender(delay=0.3)
+        self.warm_up(hedger, send)
+        send.slow = range(21, 31)
+
+        # More slow requests at once than hedges in flight
+        started = time.monotonic()
+        threads = [threading.Thread(target=hedger.request, args=("url", send)) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertLess(time.monotonic() - started, 0.55)
+        hedger.close()
+
+    @mock.patch("requests.Session.request", return_value=Mockresponse({"data": []}))
+    def test_client_hedges_gets(self, mocked_request):
+        hedger = Hedger()
+        client = Client("test", hedger=hedger)
+
+        client.get("https://dev.dixa.io", "/v1/agents")
+        client._post("https://dev.dixa.io/v1/agents")
+
+        self.assertEqual(hedger.requests, 1)
+        self.assertEqual(mocked_request.call_count, 2)
+        client.close()
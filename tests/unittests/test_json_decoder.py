@@ -0,0 +1,77 @@
+import json
+import unittest
+from unittest import mock
+
+from tap_dixa import decoders
+from tap_dixa.client import Client
+from tap_dixa.decoders import DECODER_NAMES, get_decoder
+from tap_dixa.exceptions import InvalidConfig
+from tap_dixa.helpers import DixaURL
+
+DOCUMENTS = [
+    b'[{"id": "a", "created_at": 1628145000000, "text": "line\\nbreak \\u00e9 \\ud83d\\ude00", "to": ["x@test.com"]}]',
+    '[{"text": "café", "rating": 4.5, "score": -0.1, "small": 1e-7, "big": 1.7976931348623157e308}]'.encode(),
+    b'{"data": [], "meta": {"next": null}, "flags": [true, false, null], "nested": {"a": {"b": [[], {}]}}}',
+    # Documents a fast decoder may reject and the json module accepts
+    b'[{"id": 123456789012345678901234567890, "n": -9223372036854775809}]',
+    b'[{"value": NaN, "other": Infinity}]',
+    '[{"text": "café"}]'.encode("utf-16"),
+    b'{"id": 1, "id": 2}',
+    b'  [ ]  ',
+]
+
+
+class Mockresponse:
+    def __init__(self, content, status_code=200):
+        self.content = content
+        self.status_code = status_code
+        self.headers = {}
+
+    def json(self):
+        return json.loads(self.content)
+
+
+class TestJsonDecoder(unittest.TestCase):
+    """
+    Test cases to verify every decoder returns the same objects as the json module.
+    """
+
+    def get_decoders(self):
+        return [name for name in DECODER_NAMES if name in decoders._get_decoders()]
+
+    def test_same_objects(self):
+        for name in self.get_decoders():
+            decode = get_decoder(name)
+            for document in DOCUMENTS:
+                with self.subTest(decoder=name, document=document):
+                    expected = json.loads(document)
+                    decoded = decode(document)
+                    # NaN is not equal to itself, so the documents are compared as text
+                    self.assertEqual(json.dumps(decoded), json.dumps(expected))
+                    self.assertEqual(type(decoded), type(expected))
+
+    def test_invalid_documents(self):
+        for name in self.get_decoders():
+            decode = get_decoder(name)
+            for document in (b'[{"id": 1}', b'', b'[1, 2] x', b'{"a": \xff}'):
+                with self.subTest(decoder=name, document=document), self.assertRaises(ValueError):
+                    decode(document)
+
+    def test_auto(self):
+        with mock.patch.object(decoders, "orjson", None), mock.patch.object(decoders, "msgspec", None), \
+                mock.patch.object(decoders, "simdjson", None):
+            self.assertIsNone(get_decoder("auto"))
+            with self.assertRaises(InvalidConfig):
+                get_decoder("orjson")
+        with self.assertRaises(InvalidConfig):
+            get_decoder("ujson")
+
+    @mock.patch("requests.Session.request")
+    def test_client_decoder(self, mocked_request):
+        mocked_request.return_value = Mockresponse(b'{"data": [{"id": 1}]}')
+        decode = mock.Mock(side_effect=json.loads)
+
+        self.assertEqual(Client("token", decoder=decode).get(DixaURL.INTEGRATIONS.value, "/v1/agents"),
+                         {"data": [{"id": 1}]})
+        decode.assert_called_once_with(b'{"data": [{"id": 1}]}')
+        self.assertEqual(Client("token").get(DixaURL.INTEGRATIONS.value, "/v1/agents"), {"data": [{"id": 1}]})
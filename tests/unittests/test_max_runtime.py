@@ -0,0 +1,178 @@
+import datetime
+import io
+import json
+import unittest
+from unittest import mock
+
+import pytz
+from singer import Transformer, metadata
+
+from tap_dixa.discover import discover
+from tap_dixa.helpers import Deadline
+from tap_dixa.streams import ActivityLogs, Conversations
+from tap_dixa.sync import sync
+
+NOW = datetime.datetime(2021, 8, 10, tzinfo=pytz.UTC)
+SCHEMA = {"type": "object", "properties": {"id": {"type": "integer"}, "updated_at": {"type": "integer"}}}
+
+
+class Clock:
+    """
+    A monotonic clock advanced by the mocked requests.
+    """
+
+    def __init__(self):
+        self.now = 0
+
+    def __call__(self):
+        return self.now
+
+
+class Mockresponse:
+    def __init__(self, resp, status_code=200):
+        self.json_data = resp
+        self.status_code = status_code
+        self.headers = {}
+
+    def json(self):
+        return self.json_data
+
+    def iter_content(self, chunk_size=1):
+        yield json.dumps(self.json_data).encode("utf-8")
+
+
+@mock.patch("singer.utils.now", return_value=NOW)
+class TestMaxRuntime(unittest.TestCase):
+    """
+    Test cases to verify syncs stop after the current window or page once the deadline nears.
+    """
+
+    def setUp(self):
+        self.clock = Clock()
+        patcher = mock.patch("time.monotonic", self.clock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def get_records(self, *args, **kwargs):
+        self.clock.now += 10
+        return [{"id": 1, "updated_at": kwargs["params"]["updated_after"] + 1}]
+
+    def test_deadline(self, *args):
+        deadline = Deadline(30)
+        self.assertTrue(deadline.allows(10))
+        self.clock.now = 25
+        self.assertFalse(deadline.allows(10))
+        self.clock.now = 0
+        self.assertFalse(deadline.allows())
+        self.assertTrue(Deadline().allows(10 ** 9))
+
+    def test_incremental_stream_stops_after_window(self, *args):
+        client, writer = mock.Mock(), mock.Mock(serialized_output=False)
+        client.get.side_effect = self.get_records
+        config = {"start_date": "2021-08-01T00:00:00Z", "interval": "DAY"}
+
+        with Transformer() as transformer:
+            state = Conversations(client, writer, Deadline(35)).sync({}, SCHEMA, {}, config, transformer)
+
+        # Windows take 10 seconds, a fourth one would end past the deadline
+        self.assertEqual(client.get.call_count, 3)
+        self.assertEqual(writer.write_state.call_count, 3)
+        last_window_start = client.get.call_args[1]["params"]["updated_after"]
+        self.assertEqual(state["bookmarks"]["conversations"]["updated_at"], last_window_start + 1)
+
+    def test_pipeline_stops_fetching_at_deadline(self, *args):
+        client, writer = mock.Mock(), mock.Mock(serialized_output=False)
+        client.get.side_effect = lambda *args, **kwargs: json.dumps(self.get_records(**kwargs)).encode("utf-8")
+        client.decode.side_effect = json.loads
+        config = {"start_date": "2021-08-01T00:00:00Z", "interval": "DAY", "pipeline": True}
+
+        with Transformer() as transformer:
+            state = Conversations(client, writer, Deadline(35)).sync({}, SCHEMA, {}, config, transformer)
+
+        # Fetches take 10 seconds, a fourth one would end past the deadline, the windows fetched are written
+        self.assertEqual(client.get.call_count, 3)
+        self.assertEqual(writer.write_record.call_count, 3)
+        self.assertEqual(writer.write_state.call_count, 3)
+        last_window_start = client.get.call_args[1]["params"]["updated_after"]
+        self.assertEqual(state["bookmarks"]["conversations"]["updated_at"], last_window_start + 1)
+
+    def test_activity_logs_resume_from_next_page(self, *args):
+        requested = []
+
+        def get_page(*args, **kwargs):
+            # The params dictionary is updated in place for the next page
+            requested.append(dict(kwargs["params"]))
+            self.clock.now += 10
+            page_key = kwargs["params"]["pageKey"]
+            timestamp = {None: "2021-08-02T00:00:00Z", "p2": "2021-08-05T00:00:00Z"}.get(page_key,
+                                                                                        "2021-08-03T00:00:00Z")
+            next_page = {None: "/v1/conversations/activitylog?pageKey=p2",
+                         "p2": "/v1/conversations/activitylog?pageKey=p3"}
+            return {"data": [{"id": page_key or "p1", "activityTimestamp": timestamp}],
+                    "meta": {"next": next_page.get(page_key)}}
+
+        client = mock.Mock()
+        client.get.side_effect = get_page
+        config = {"start_date": "2021-08-01T00:00:00Z"}
+        schema = {"type": "object", "properties": {"id": {"type": "string"},
+                                                   "activityTimestamp": {"type": "string", "format": "date-time"}}}
+
+        with Transformer() as transformer:
+            state = ActivityLogs(client, mock.Mock(), Deadline(15)).sync({}, schema, {}, config, transformer)
+        first_params = requested[0]
+
+        bookmark = state["bookmarks"]["activity_logs"]
+        self.assertNotIn("activityTimestamp", bookmark)
+        self.assertEqual(bookmark["resume"]["params"], {**first_params, "pageKey": "p2"})
+
+        requested.clear()
+        with Transformer() as transformer:
+            state = ActivityLogs(client, mock.Mock()).sync(state, schema, {}, config, transformer)
+
+        self.assertEqual([params["pageKey"] for params in requested], ["p2", "p3"])
+        self.assertEqual(requested[0]["toDatetime"], first_params["toDatetime"])
+        self.assertEqual(state["bookmarks"]["activity_logs"], {"activityTimestamp": "2021-08-05T00:00:00.000000Z"})
+
+    def test_activity_logs_checkpoint_after_every_page(self, *args):
+        def get_page(*args, **kwargs):
+            page_key = kwargs["params"]["pageKey"]
+            if page_key == "p3":
+                raise ConnectionError("host unreachable")
+            return {"data": [{"id": page_key or "p1", "activityTimestamp": "2021-08-02T00:00:00Z"}],
+                    "meta": {"next": f"/v1/conversations/activitylog?pageKey={'p3' if page_key else 'p2'}"}}
+
+        client, writer = mock.Mock(), mock.Mock()
+        client.get.side_effect = get_page
+        schema = {"type": "object", "properties": {"id": {"type": "string"},
+                                                   "activityTimestamp": {"type": "string", "format": "date-time"}}}
+
+        with Transformer() as transformer, self.assertRaises(ConnectionError):
+            ActivityLogs(client, writer).sync({}, schema, {}, {"start_date": "2021-08-01T00:00:00Z"}, transformer)
+
+        # The state written after the second page resumes from the page which failed
+        resume = writer.write_state.call_args[0][0]["bookmarks"]["activity_logs"]["resume"]
+        self.assertEqual(writer.write_state.call_count, 2)
+        self.assertEqual(resume["params"]["pageKey"], "p3")
+        self.assertEqual(resume["max_datetime"], "2021-08-02T00:00:00.000000Z")
+
+    def test_sync_leaves_stream_as_currently_syncing(self, *args):
+        catalog = discover({})
+        for stream in catalog.streams:
+            if stream.tap_stream_id in ("conversations", "messages"):
+                stream.metadata = metadata.to_list(
+                    metadata.write(metadata.to_map(stream.metadata), (), "selected", True))
+
+        def request(method, url, headers=None, params=None, data=None, stream=False):
+            return Mockresponse(self.get_records(params=params))
+
+        stdout = io.StringIO()
+        with mock.patch("requests.Session.request", side_effect=request) as mocked_request, \
+                mock.patch("sys.stdout", stdout):
+            sync({"start_date": "2021-08-01T00:00:00Z", "api_token": "x", "interval": "DAY", "max_runtime": 25},
+                 {}, catalog)
+
+        messages = [json.loads(line) for line in stdout.getvalue().splitlines()]
+        streams = {message["stream"] for message in messages if message["type"] == "RECORD"}
+        self.assertEqual(len(streams), 1)
+        self.assertEqual(mocked_request.call_count, 2)
+        self.assertEqual(messages[-1]["value"]["currently_syncing"], streams.pop())
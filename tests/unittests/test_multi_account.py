@@ -0,0 +1,178 @@
+import base64
+import datetime
+import io
+import json
+import threading
+import time
+import unittest
+from unittest import mock
+
+import pytz
+import requests
+from singer import metadata
+
+from tap_dixa.discover import discover
+from tap_dixa.exceptions import InvalidConfig
+from tap_dixa.client import Client
+from tap_dixa.limits import AdaptiveLimiter, FairSemaphore
+from tap_dixa.sync import sync
+
+NOW = datetime.datetime(2021, 8, 5, 12, tzinfo=pytz.UTC)
+
+
+class Mockresponse:
+    def __init__(self, resp, status_code=200):
+        self.json_data = resp
+        self.status_code = status_code
+        self.headers = {}
+
+    def json(self):
+        return self.json_data
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.HTTPError("sample message")
+
+    def iter_content(self, chunk_size=1):
+        yield json.dumps(self.json_data).encode("utf-8")
+
+
+def get_catalog(config):
+    catalog = discover({})
+    for stream in catalog.streams:
+        if stream.tap_stream_id == "messages":
+            stream.metadata = metadata.to_list(metadata.write(metadata.to_map(stream.metadata), (), "selected", True))
+    return catalog
+
+
+class TestFairSemaphore(unittest.TestCase):
+    """
+    Test cases to verify the semaphore caps concurrency and serves waiters in order.
+    """
+
+    def test_limit_is_respected(self):
+        semaphore, lock = FairSemaphore(3), threading.Lock()
+        counts = {"active": 0, "max": 0}
+
+        def work():
+            with semaphore:
+                with lock:
+                    counts["active"] += 1
+                    counts["max"] = max(counts["max"], counts["active"])
+                time.sleep(0.01)
+                with lock:
+                    counts["active"] -= 1
+
+        threads = [threading.Thread(target=work) for _ in range(12)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(counts["max"], 3)
+
+    def test_waiters_are_served_in_order(self):
+        semaphore, order = FairSemaphore(1), []
+        semaphore.acquire()
+
+        def work(i):
+            with semaphore:
+                order.append(i)
+
+        threads = []
+        for i in range(5):
+            threads.append(threading.Thread(target=work, args=(i,)))
+            threads[-1].start()
+            # Wait for the thread to queue up before starting the next one
+            while len(semaphore._waiters) <= i:
+                time.sleep(0.001)
+        semaphore.release()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(order, [0, 1, 2, 3, 4])
+
+
+@mock.patch("singer.utils.now", return_value=NOW)
+class TestMultiAccountSync(unittest.TestCase):
+    """
+    Test cases to verify accounts are synced with their own token and state namespace.
+    """
+
+    config = {"start_date": "2021-08-05T00:00:00Z",
+              "accounts": [{"name": "north", "api_token": "token-n"}, {"name": "south", "api_token": "token-s"}]}
+
+    @staticmethod
+    def request(method, url, headers=None, params=None, data=None, stream=False):
+        token = base64.b64decode(headers["Authorization"].split()[1]).decode("utf-8")
+        return Mockresponse([{"id": "same-id", "created_at": params["created_after"] + 1, "text": token}])
+
+    def sync(self, state):
+        stdout = io.StringIO()
+        with mock.patch("requests.Session.request", side_effect=self.request) as mocked_request, \
+                mock.patch("sys.stdout", stdout):
+            sync(self.config, state, get_catalog(self.config))
+        return mocked_request, [json.loads(line) for line in stdout.getvalue().splitlines()]
+
+    def test_accounts_are_namespaced(self, *args):
+        mocked_request, messages = self.sync({})
+
+        schemas = [message for message in messages if message["type"] == "SCHEMA"]
+        self.assertEqual(len(schemas), 1)
+        self.assertEqual(schemas[0]["key_properties"], ["dixa_account", "id"])
+
+        records = [message["record"] for message in messages if message["type"] == "RECORD"]
+        self.assertEqual(sorted((record["dixa_account"], record["id"], record["text"]) for record in records),
+                         [("north", "same-id", "bearer:token-n"), ("south", "same-id", "bearer:token-s")])
+
+        state = messages[-1]["value"]
+        self.assertEqual(set(state["accounts"]), {"north", "south"})
+        for account_state in state["accounts"].values():
+            self.assertIsNone(account_state["currently_syncing"])
+            self.assertIn("created_at", account_state["bookmarks"]["messages"])
+
+    def test_account_state_is_resumed(self, *args):
+        bookmark = int(NOW.timestamp() * 1000) - 1000
+        state = {"accounts": {"north": {"bookmarks": {"messages": {"created_at": bookmark}}}}}
+
+        mocked_request, _ = self.sync(state)
+
+        starts = sorted(call[1]["params"]["created_after"] for call in mocked_request.call_args_list)
+        self.assertEqual(starts[-1], bookmark // 1000 * 1000)
+        self.assertLess(starts[0], bookmark - 1000)
+
+    def test_accounts_need_unique_names(self, *args):
+        config = {**self.config, "accounts": [{"name": "x", "api_token": "a"}, {"name": "x", "api_token": "b"}]}
+        with self.assertRaises(InvalidConfig):
+            sync(config, {}, get_catalog(config))
+
+    @mock.patch("time.sleep")
+    def test_rate_limits_are_kept_per_account(self, *args):
+        throttled = []
+
+        def request(method, url, headers=None, params=None, data=None, stream=False):
+            response = self.request(method, url, headers, params)
+            # The first request of north is throttled
+            if response.json_data[0]["text"] == "bearer:token-n" and not throttled:
+                throttled.append(url)
+                return Mockresponse({}, 429)
+            return response
+
+        config = {**self.config, "adaptive_concurrency": True}
+        with mock.patch("requests.Session.request", side_effect=request), mock.patch("sys.stdout", io.StringIO()), \
+                mock.patch("tap_dixa.sync.Client", wraps=Client) as mocked_client:
+            sync(config, {}, get_catalog(config))
+
+        limiters = {call[1]["limiter"].account: call[1]["limiter"] for call in mocked_client.call_args_list}
+        self.assertTrue(all(isinstance(limiter, AdaptiveLimiter) for limiter in limiters.values()))
+        self.assertEqual((limiters["north"].limit, limiters["south"].limit), (2, 4))
+
+        # Both clients are capped together by the same semaphore
+        shared_limiters = {id(call[1]["shared_limiter"]) for call in mocked_client.call_args_list}
+        self.assertEqual(len(shared_limiters), 1)
+
+    @mock.patch("requests.Session.request", return_value=Mockresponse({"data": []}))
+    def test_discovery_checks_every_token(self, mocked_request, *args):
+        discover(self.config)
+        self.assertEqual([call[1]["headers"]["Authorization"] for call in mocked_request.call_args_list],
+                         ["token-n", "token-s"])
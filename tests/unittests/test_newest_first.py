@@ -0,0 +1,92 @@
+import copy
+import datetime
+import unittest
+from unittest import mock
+
+import pytz
+from singer import Transformer
+
+from tap_dixa.exceptions import InvalidConfig
+from tap_dixa.helpers import datetime_to_unix_ms
+from tap_dixa.streams import Conversations
+
+NOW = datetime.datetime(2021, 8, 4, 12, tzinfo=pytz.UTC)
+START_DATE = datetime.datetime(2021, 8, 1, tzinfo=pytz.UTC)
+SCHEMA = {"type": "object", "properties": {"id": {"type": "integer"}, "updated_at": {"type": "integer"}}}
+CONFIG = {"start_date": "2021-08-01T00:00:00Z", "interval": "DAY", "sync_order": "newest_first"}
+
+
+def get_records(*args, **kwargs):
+    params = kwargs["params"]
+    return [{"id": 1, "updated_at": params["updated_after"]}, {"id": 2, "updated_at": params["updated_before"]}]
+
+
+def ms(value):
+    return datetime_to_unix_ms(value)
+
+
+@mock.patch("singer.utils.now", return_value=NOW)
+class TestNewestFirst(unittest.TestCase):
+    """
+    Test cases to verify the newest window is synced first and history is filled behind it.
+    """
+
+    def sync(self, state, config=None):
+        client, writer = mock.Mock(), mock.Mock(serialized_output=False)
+        client.get.side_effect = get_records
+        with Transformer() as transformer:
+            state = Conversations(client, writer).sync(state, SCHEMA, {}, {**CONFIG, **(config or {})}, transformer)
+        windows = [(call[1]["params"]["updated_after"], call[1]["params"]["updated_before"])
+                   for call in client.get.call_args_list]
+        return state, windows, writer
+
+    def test_first_run_goes_backwards(self, *args):
+        state, windows, writer = self.sync({})
+
+        # The live window from now, then history newest first down to the start date
+        self.assertEqual(windows[0], (ms(NOW), ms(NOW)))
+        backfill = windows[1:]
+        self.assertEqual(backfill[0], (ms(NOW - datetime.timedelta(days=1)), ms(NOW)))
+        self.assertEqual([start for start, _ in backfill], sorted((start for start, _ in backfill), reverse=True))
+        self.assertEqual(backfill[-1][0], ms(START_DATE))
+
+        bookmarks = state["bookmarks"]["conversations"]
+        self.assertEqual(bookmarks["low_watermark"], ms(START_DATE))
+        self.assertEqual(bookmarks["high_watermark"], ms(NOW))
+        self.assertEqual(bookmarks["updated_at"], ms(NOW))
+
+        # Every window writes the watermarks it reached
+        self.assertEqual(writer.write_state.call_count, len(windows))
+
+    def test_interrupted_backfill_resumes(self, *args):
+        low = ms(datetime.datetime(2021, 8, 2, 6, tzinfo=pytz.UTC))
+        high = ms(NOW - datetime.timedelta(hours=5))
+        state = {"bookmarks": {"conversations": {"high_watermark": high, "low_watermark": low}}}
+
+        state, windows, _ = self.sync(state)
+
+        self.assertEqual(windows[0], (high // 1000 * 1000, ms(NOW)))
+        self.assertEqual(windows[1], (low - 24 * 3600 * 1000, low))
+        self.assertEqual(windows[-1][0], ms(START_DATE))
+        self.assertEqual(state["bookmarks"]["conversations"]["low_watermark"], ms(START_DATE))
+
+    def test_roles(self, *args):
+        low = ms(datetime.datetime(2021, 8, 3, tzinfo=pytz.UTC))
+        state = {"bookmarks": {"conversations": {"high_watermark": low, "low_watermark": low}}}
+
+        _, windows, _ = self.sync(copy.deepcopy(state), {"sync_role": "live"})
+        self.assertTrue(all(start >= low for start, _ in windows))
+
+        state, windows, _ = self.sync(state, {"sync_role": "backfill"})
+        self.assertTrue(all(end <= low for _, end in windows))
+        self.assertEqual(state["bookmarks"]["conversations"]["high_watermark"], low)
+
+        with self.assertRaises(InvalidConfig):
+            self.sync(state, {"sync_role": "sideways"})
+
+    def test_oldest_first_bookmark_needs_no_backfill(self, *args):
+        bookmark = ms(NOW - datetime.timedelta(hours=2))
+        state, windows, _ = self.sync({"bookmarks": {"conversations": {"updated_at": bookmark}}})
+
+        self.assertEqual(windows, [(bookmark // 1000 * 1000, ms(NOW))])
+        self.assertEqual(state["bookmarks"]["conversations"]["low_watermark"], ms(START_DATE))
@@ -0,0 +1,132 @@
+import datetime
+import json
+import unittest
+from unittest import mock
+
+import pytz
+import requests
+from singer import Transformer
+
+from tap_dixa.client import Client
+from tap_dixa.exceptions import DixaClient408Error
+from tap_dixa.pagesize import PageSizeTuner
+from tap_dixa.streams import ActivityLogs
+
+NOW = datetime.datetime(2021, 8, 10, tzinfo=pytz.UTC)
+SCHEMA = {"type": "object", "properties": {"id": {"type": "string"},
+                                           "activityTimestamp": {"type": "string", "format": "date-time"}}}
+CONFIG = {"start_date": "2021-08-01T00:00:00Z", "auto_page_size": True, "page_size": 1000,
+          "page_size_min": 100, "page_size_max": 8000, "page_target_seconds": 10}
+
+
+class Mockresponse:
+    def __init__(self, resp, status_code=200):
+        self.json_data = resp
+        self.status_code = status_code
+        self.headers = {}
+
+    def json(self):
+        return self.json_data
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.HTTPError("sample message")
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0
+
+    def __call__(self):
+        return self.now
+
+
+class TestPageSizeTuner(unittest.TestCase):
+    """
+    Test cases to verify the page size follows latency and payload size within its bounds.
+    """
+
+    def test_grows_at_most_twice(self):
+        tuner = PageSizeTuner(1000, max_size=10_000)
+        # 1ms per record allows 10000 records in 10 seconds
+        self.assertEqual(tuner.record_page(1000, 1, 1000), 2000)
+        self.assertEqual(tuner.record_page(2000, 2, 2000), 4000)
+        self.assertEqual(tuner.record_page(4000, 4, 4000), 8000)
+        self.assertEqual(tuner.record_page(8000, 8, 8000), 10_000)
+
+    def test_shrinks_when_slow_or_large(self):
+        tuner = PageSizeTuner(1000, target_seconds=10, max_bytes=1_000_000)
+        self.assertEqual(tuner.record_page(1000, 20, 1000), 500)
+        self.assertEqual(tuner.record_page(500, 1, 2_000_000), 250)
+        # An empty page tells nothing
+        self.assertEqual(tuner.record_page(0, 5, 2), 250)
+
+    def test_timeouts_halve_down_to_minimum(self):
+        tuner = PageSizeTuner(500, min_size=200)
+        self.assertEqual(tuner.record_timeout(), 250)
+        self.assertTrue(tuner.can_shrink)
+        self.assertEqual(tuner.record_timeout(), 200)
+        self.assertFalse(tuner.can_shrink)
+
+    def test_bounds(self):
+        self.assertEqual(PageSizeTuner(50_000, max_size=8000).size, 8000)
+        with self.assertRaises(ValueError):
+            PageSizeTuner(100, min_size=500, max_size=200)
+
+
+@mock.patch("singer.utils.now", return_value=NOW)
+class TestActivityLogsPageSize(unittest.TestCase):
+    """
+    Test cases to verify activity logs tune their page size and keep it in state.
+    """
+
+    def setUp(self):
+        self.clock = Clock()
+        patcher = mock.patch("time.monotonic", self.clock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def sync(self, pages, state):
+        requested = []
+
+        def get_page(*args, **kwargs):
+            params = kwargs["params"]
+            requested.append(params["pageLimit"])
+            page = pages.pop(0)
+            if page == "timeout":
+                self.assertFalse(kwargs["retry_timeouts"])
+                raise DixaClient408Error("Request Timeout")
+            seconds, next_page = page
+            self.clock.now += seconds
+            data = [{"id": str(i), "activityTimestamp": "2021-08-02T00:00:00Z"} for i in range(params["pageLimit"])]
+            return json.dumps({"data": data, "meta": {"next": next_page}}).encode("utf-8")
+
+        client = mock.Mock()
+        client.decode = json.loads
+        client.get.side_effect = get_page
+        with Transformer() as transformer:
+            state = ActivityLogs(client, mock.Mock()).sync(state, SCHEMA, {}, CONFIG, transformer)
+        return requested, state
+
+    def test_page_size_is_tuned_and_kept(self, *args):
+        pages = [(1, "/v1/conversations/activitylog?pageKey=p2"), "timeout",
+                 (10, "/v1/conversations/activitylog?pageKey=p3"), (1, None)]
+        requested, state = self.sync(pages, {})
+
+        self.assertEqual(requested, [1000, 2000, 1000, 1000])
+        self.assertEqual(state["bookmarks"]["activity_logs"]["page_size"], 2000)
+
+        requested, _ = self.sync([(1, None)], state)
+        self.assertEqual(requested, [2000])
+
+    @mock.patch("time.sleep")
+    @mock.patch("requests.Session.request", return_value=Mockresponse({}, 408))
+    def test_timeouts_are_not_retried_on_request(self, mocked_request, mocked_sleep, *args):
+        with self.assertRaises(DixaClient408Error):
+            Client("test").get("https://dev.dixa.io", "/v1/conversations/activitylog", retry_timeouts=False)
+        self.assertEqual(mocked_request.call_count, 1)
+        mocked_sleep.assert_not_called()
+
+        with self.assertRaises(DixaClient408Error):
+            Client("test").get("https://dev.dixa.io", "/v1/conversations/activitylog")
+        self.assertEqual(mocked_request.call_count, 4)
@@ -0,0 +1,70 @@
+import io
+import json
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from tap_dixa.output import parquet
+
+try:
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+SCHEMA = {
+    "type": ["null", "object"],
+    "properties": {
+        "id": {"type": ["null", "integer"]},
+        "created_at": {"type": ["null", "integer"]},
+        "updated_at": {"type": ["null", "integer"]},
+        "direction": {"type": ["null", "string"]},
+        "tags": {"type": ["null", "array"], "items": {"type": ["null", "string"]}},
+    },
+}
+
+
+@unittest.skipUnless(pyarrow, "pyarrow is not installed")
+class TestParquetWriter(unittest.TestCase):
+    """
+    Test cases to verify windows are written as day partitioned parquet files.
+    """
+
+    def test_arrow_schema_from_json_schema(self):
+        arrow_schema, epoch_fields, json_fields = parquet.get_arrow_schema(SCHEMA)
+        self.assertEqual(epoch_fields, {"created_at", "updated_at"})
+        self.assertEqual(json_fields, {"tags"})
+        self.assertEqual(str(arrow_schema.field("updated_at").type), "timestamp[ms, tz=UTC]")
+        self.assertEqual(str(arrow_schema.field("id").type), "int64")
+
+    @mock.patch("sys.stdout", new_callable=io.StringIO)
+    def test_window_written_per_day(self, stdout):
+        records = [
+            {"id": 1, "created_at": 1629158400000, "updated_at": 1629181750735, "direction": "inbound", "tags": ["a"]},
+            {"id": 2, "created_at": None, "updated_at": 1629244800000, "direction": None, "tags": None},
+            {"id": 3, "created_at": 1629158400000, "updated_at": 1629181750000, "direction": "outbound", "tags": []},
+        ]
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            writer = parquet.ParquetWriter(tmp_dir)
+            writer.write_schema("conversations", SCHEMA, ["id"], "updated_at")
+            for record in records:
+                writer.write_record("conversations", record)
+            writer.write_state({"bookmarks": {"conversations": {"updated_at": 1629244800000}}})
+
+            self.assertEqual(sorted(os.listdir(os.path.join(tmp_dir, "conversations"))),
+                             ["date=2021-08-17", "date=2021-08-18"])
+
+            messages = [json.loads(line) for line in stdout.getvalue().splitlines()]
+            self.assertEqual([msg["type"] for msg in messages], ["SCHEMA", "BATCH", "STATE"])
+            self.assertEqual(messages[1]["encoding"]["format"], "parquet")
+
+            rows = []
+            for uri in messages[1]["manifest"]:
+                rows.extend(pyarrow.parquet.read_table(uri[len("file://"):]).to_pylist())
+
+        rows = sorted(rows, key=lambda row: row["id"])
+        self.assertEqual([row["id"] for row in rows], [1, 2, 3])
+        self.assertEqual(rows[0]["updated_at"].isoformat(), "2021-08-17T06:29:10.735000+00:00")
+        self.assertIsNone(rows[1]["created_at"])
+        self.assertEqual(json.loads(rows[0]["tags"]), ["a"])
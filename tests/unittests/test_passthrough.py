@@ -0,0 +1,92 @@
+import copy
+import datetime
+import io
+import json
+import unittest
+from unittest import mock
+
+import pytz
+from singer import Transformer, metadata
+
+from tap_dixa.discover import get_schemas
+from tap_dixa.jsonstream import get_passthrough_checks, iter_raw_records, passes_through
+from tap_dixa.output import RecordWriter
+from tap_dixa.streams import Messages
+
+SCHEMAS, METADATA = get_schemas()
+RECORDS = [
+    {"id": "a", "created_at": 1628145000000, "text": "line\nbreak é", "to": ["x@test.com"], "duration": None},
+    # Empty strings are turned into null by the Transformer
+    {"id": "b", "created_at": 1628145000001, "text": ""},
+    # Integers sent as strings are converted by the Transformer
+    {"id": "c", "created_at": 1628145000002, "duration": "12"},
+    {"id": "d", "created_at": 1628145000003, "unknown": {"nested": [1]}},
+]
+
+
+class TestRawRecords(unittest.TestCase):
+    """
+    Test cases to verify raw records are split and checked against the schema.
+    """
+
+    def test_records_are_split(self):
+        text = '[ {"id": "a\\"b", "n" : 12 , "arr": ["x", null, [2]], "o": {"k": [1, 2]}},\n{"e": ""} ]'
+        records = list(iter_raw_records(text))
+
+        self.assertEqual([record.raw for record in records],
+                         ['{"id": "a\\"b", "n" : 12 , "arr": ["x", null, [2]], "o": {"k": [1, 2]}}', '{"e": ""}'])
+        self.assertEqual([record.record for record in records], json.loads(text))
+        self.assertEqual(list(iter_raw_records(" [ ] ")), [])
+
+    def test_invalid_documents(self):
+        for text in ('{"id": 1}', '[1, 2]', '[{"id": 1}', '[{"id": 1} {"id": 2}]'):
+            with self.subTest(text=text), self.assertRaises(ValueError):
+                list(iter_raw_records(text))
+
+    def test_passthrough_checks(self):
+        checks = get_passthrough_checks(SCHEMAS["messages"])
+        self.assertIsNotNone(checks)
+        self.assertIsNone(get_passthrough_checks({"properties": {"at": {"type": "string", "format": "date-time"}}}))
+        self.assertIsNone(get_passthrough_checks({"properties": {"amount": {"type": ["null", "number"]}}}))
+        self.assertIsNone(get_passthrough_checks({"properties": {"id": {"type": ["integer", "string"]}}}))
+
+        self.assertTrue(passes_through({"id": "a", "duration": 3, "to": ["x"], "cc": None}, checks))
+        for record in ({"id": ""}, {"duration": "3"}, {"duration": True}, {"to": [""]}, {"unknown": 1}):
+            with self.subTest(record=record):
+                self.assertFalse(passes_through(record, checks))
+
+
+@mock.patch("singer.utils.now", return_value=datetime.datetime(2021, 8, 5, 12, tzinfo=pytz.UTC))
+class TestPassthroughSync(unittest.TestCase):
+    """
+    Test cases to verify raw records are passed through with the same output as transformed records.
+    """
+
+    def sync(self, stream_metadata):
+        client = mock.Mock()
+        client.get.side_effect = lambda *args, **kwargs: (
+            json.dumps(RECORDS, indent=2).encode("utf-8") if kwargs.get("raw") else RECORDS)
+        stdout = io.StringIO()
+        with mock.patch("sys.stdout", stdout), Transformer() as transformer:
+            Messages(client, RecordWriter()).sync({}, SCHEMAS["messages"], stream_metadata,
+                                                  {"start_date": "2021-08-05T00:00:00Z"}, transformer)
+        return client, [json.loads(line) for line in stdout.getvalue().splitlines()]
+
+    def test_output_matches_transformed_records(self, *args):
+        client, messages = self.sync(metadata.to_map(METADATA["messages"]))
+
+        self.assertTrue(client.get.call_args[1]["raw"])
+        with Transformer() as transformer:
+            expected = [transformer.transform(record, SCHEMAS["messages"]) for record in RECORDS]
+        self.assertEqual([message for message in messages if message["type"] == "RECORD"],
+                         [{"type": "RECORD", "stream": "messages", "record": record} for record in expected])
+
+    def test_deselected_field_disables_passthrough(self, *args):
+        stream_metadata = metadata.to_map(copy.deepcopy(METADATA["messages"]))
+        stream_metadata = metadata.write(stream_metadata, ("properties", "text"), "selected", False)
+
+        client, messages = self.sync(stream_metadata)
+
+        self.assertNotIn("raw", client.get.call_args[1])
+        records = [message["record"] for message in messages if message["type"] == "RECORD"]
+        self.assertNotIn("text", records[0])
@@ -0,0 +1,146 @@
+import datetime
+import io
+import json
+import random
+import time
+import unittest
+from unittest import mock
+
+import pytz
+from singer import Transformer, metadata
+
+from tap_dixa.discover import get_schemas
+from tap_dixa.output import RecordWriter
+from tap_dixa.pipeline import Pipeline, Stage
+from tap_dixa.streams import ActivityLogs, Conversations
+
+SCHEMAS, METADATA = get_schemas()
+NOW = datetime.datetime(2021, 8, 6, tzinfo=pytz.UTC)
+CONFIG = {"start_date": "2021-08-01T00:00:00Z", "interval": "DAY"}
+PIPELINE_CONFIG = {**CONFIG, "pipeline": True, "pipeline_fetch_workers": 3, "pipeline_decode_workers": 2,
+                   "pipeline_transform_workers": 2, "pipeline_queue_size": 2}
+
+
+def sleep_randomly(value):
+    time.sleep(random.random() / 200)
+    return value
+
+
+class TestPipeline(unittest.TestCase):
+    """
+    Test cases to verify items run through every stage and come out in order.
+    """
+
+    def test_results_are_ordered(self):
+        stages = [Stage("double", lambda: lambda item: sleep_randomly(item * 2), workers=4, queue_size=2),
+                  Stage("add", lambda: lambda item: sleep_randomly(item + 1), workers=3, queue_size=1)]
+        pipeline = Pipeline(stages)
+
+        self.assertEqual(list(pipeline.run(range(100))), [i * 2 + 1 for i in range(100)])
+        self.assertEqual(set(pipeline.stats), {"double", "add", "write"})
+        self.assertEqual(pipeline.stats["double"]["items"], 100)
+        self.assertEqual(pipeline.stats["add"]["workers"], 3)
+        self.assertLessEqual(pipeline.stats["add"]["max_queue_depth"], 1)
+        self.assertGreater(pipeline.stats["double"]["utilization"], 0)
+
+    def test_one_worker_per_thread(self):
+        workers = []
+
+        def make_worker():
+            worker = []
+            workers.append(worker)
+            return lambda item: worker.append(item) or item
+
+        results = list(Pipeline([Stage("collect", make_worker, workers=3)]).run(range(30)))
+
+        self.assertEqual(results, list(range(30)))
+        self.assertEqual(len(workers), 3)
+        self.assertEqual(sorted(item for worker in workers for item in worker), list(range(30)))
+
+    def test_errors_are_raised(self):
+        def fail(item):
+            if item == 5:
+                raise ValueError("bad item")
+            return item
+
+        def items():
+            yield from range(3)
+            raise KeyError("bad feed")
+
+        with self.assertRaises(ValueError):
+            list(Pipeline([Stage("fail", lambda: fail, workers=2)]).run(range(1000)))
+        with self.assertRaises(KeyError):
+            list(Pipeline([Stage("pass", lambda: lambda item: item)]).run(items()))
+
+    def test_consumer_stops_early(self):
+        results = Pipeline([Stage("pass", lambda: lambda item: item, workers=2)]).run(range(1000))
+        self.assertEqual(next(results), 0)
+        results.close()
+
+    def test_metrics_are_logged(self):
+        with mock.patch("singer.metrics.log") as mocked_log:
+            list(Pipeline([Stage("pass", lambda: lambda item: item)], tags={"endpoint": "stream"}).run(range(5)))
+
+        points = [(call[0][1].metric, call[0][1].tags) for call in mocked_log.call_args_list]
+        self.assertIn(("pipeline_utilization", {"endpoint": "stream", "stage": "pass"}), points)
+        self.assertIn(("pipeline_queue_depth", {"endpoint": "stream", "stage": "write"}), points)
+
+
+def get_conversations(*args, **kwargs):
+    params = kwargs["params"]
+    records = [{"id": params["updated_after"] + i, "created_at": params["updated_after"],
+                "updated_at": params["updated_after"] + i} for i in range(3)]
+    content = json.dumps(records).encode("utf-8")
+    return sleep_randomly(content if kwargs.get("raw") else json.loads(content))
+
+
+def get_activity_logs(*args, **kwargs):
+    page = int(kwargs["params"]["pageKey"] or 0)
+    next_page = {"next": f"/v1/conversations/activitylog?pageKey={page + 1}"} if page < 4 else {}
+    return {"data": [{"id": f"{page}-{i}", "activityTimestamp": f"2021-08-0{page + 1}T00:00:00Z"}
+                     for i in range(3)], "meta": next_page}
+
+
+@mock.patch("singer.utils.now", return_value=NOW)
+class TestPipelinedSync(unittest.TestCase):
+    """
+    Test cases to verify a pipelined sync has the same output as a serial one.
+    """
+
+    def sync(self, stream_class, get, config, writer=None):
+        client = mock.Mock()
+        client.get.side_effect = get
+        client.decode = json.loads
+        stdout = io.StringIO()
+        with mock.patch("sys.stdout", stdout), Transformer() as transformer:
+            state = stream_class(client, writer or RecordWriter()).sync(
+                {}, SCHEMAS[stream_class.tap_stream_id], metadata.to_map(METADATA[stream_class.tap_stream_id]),
+                config, transformer)
+        return state, [json.loads(line) for line in stdout.getvalue().splitlines()]
+
+    def test_conversations(self, *args):
+        state, messages = self.sync(Conversations, get_conversations, CONFIG)
+        pipelined_state, pipelined_messages = self.sync(Conversations, get_conversations, PIPELINE_CONFIG)
+
+        self.assertEqual(pipelined_messages, messages)
+        self.assertEqual(pipelined_state, state)
+        # Five windows of three records, each followed by its bookmark
+        self.assertEqual([message["type"] for message in messages[:4]], ["RECORD"] * 3 + ["STATE"])
+        self.assertEqual(len([message for message in messages if message["type"] == "RECORD"]), 15)
+
+    def test_unserialized_writer(self, *args):
+        class DictWriter(RecordWriter):
+            serialized_output = False
+
+        _, messages = self.sync(Conversations, get_conversations, CONFIG)
+        _, pipelined_messages = self.sync(Conversations, get_conversations, PIPELINE_CONFIG, DictWriter())
+        self.assertEqual(pipelined_messages, messages)
+
+    def test_activity_logs(self, *args):
+        state, messages = self.sync(ActivityLogs, get_activity_logs, CONFIG)
+        pipelined_state, pipelined_messages = self.sync(ActivityLogs, get_activity_logs, PIPELINE_CONFIG)
+
+        self.assertEqual(pipelined_messages, messages)
+        self.assertEqual(pipelined_state, state)
+        # 15 records, a checkpoint after each of the 4 pages followed by another one and the final state
+        self.assertEqual(len(messages), 20)
@@ -0,0 +1,90 @@
+import datetime
+import io
+import json
+import sys
+import unittest
+from unittest import mock
+
+import pytz
+from singer import metadata
+
+import tap_dixa
+from tap_dixa.discover import discover
+from tap_dixa.helpers import datetime_to_unix_ms
+from tap_dixa.plan import get_sample_indexes, plan
+
+NOW = datetime.datetime(2021, 8, 11, tzinfo=pytz.UTC)
+CONFIG = {"start_date": "2021-08-01T00:00:00Z", "api_token": "x", "interval": "DAY", "page_size": 100}
+
+
+class Mockresponse:
+    def __init__(self, resp, status_code=200):
+        self.content = json.dumps(resp).encode("utf-8")
+        self.status_code = status_code
+        self.headers = {}
+
+    def iter_content(self, chunk_size=1):
+        yield self.content
+
+
+def get_catalog(*stream_ids):
+    catalog = discover({})
+    for stream in catalog.streams:
+        if stream.tap_stream_id in stream_ids:
+            stream.metadata = metadata.to_list(metadata.write(metadata.to_map(stream.metadata), (), "selected", True))
+    return catalog
+
+
+def request(method, url, headers=None, params=None, data=None, stream=False):
+    if "activitylog" in url:
+        return Mockresponse({"data": [{"id": str(i)} for i in range(params["pageLimit"])], "meta": {}})
+    # Ten records per window of conversations
+    return Mockresponse([{"id": i, "updated_at": params["updated_after"]} for i in range(10)])
+
+
+@mock.patch("singer.utils.now", return_value=NOW)
+@mock.patch("requests.Session.request", side_effect=request)
+class TestPlan(unittest.TestCase):
+    """
+    Test cases to verify the plan extrapolates sampled windows without syncing records.
+    """
+
+    def test_sample_indexes(self, *args):
+        self.assertEqual(get_sample_indexes(10, 3), [0, 4, 9])
+        self.assertEqual(get_sample_indexes(2, 3), [0, 1])
+        self.assertEqual(get_sample_indexes(5, 1), [0])
+
+    def test_windows_are_extrapolated(self, mocked_request, *args):
+        output = io.StringIO()
+        result = plan(CONFIG, {}, get_catalog("conversations", "agents"), output)
+
+        self.assertEqual(json.loads(output.getvalue()), result)
+        conversations = result["streams"]["conversations"]
+        self.assertEqual(conversations["window_count"], 10)
+        self.assertEqual(len(conversations["sampled_windows"]), 3)
+        self.assertEqual(conversations["estimated_records"], 100)
+        self.assertEqual(conversations["estimated_api_calls"], 10)
+        self.assertEqual(conversations["first_window"][0], "2021-08-01T00:00:00.000000Z")
+        self.assertEqual(result["streams"]["agents"], {"replication_method": "FULL_TABLE"})
+        self.assertEqual(mocked_request.call_count, 3)
+
+    def test_bookmark_and_pages(self, mocked_request, *args):
+        bookmark = datetime_to_unix_ms(NOW - datetime.timedelta(days=2))
+        state = {"bookmarks": {"conversations": {"updated_at": bookmark},
+                               "activity_logs": {"activityTimestamp": "2021-08-09T00:00:00.000000Z"}}}
+
+        result = plan(CONFIG, state, get_catalog("conversations", "activity_logs"), io.StringIO())
+
+        self.assertEqual(result["streams"]["conversations"]["window_count"], 2)
+        activity_logs = result["streams"]["activity_logs"]
+        # Full first pages: at least 100 records per window, paged 100 at a time
+        self.assertEqual(activity_logs["estimated_records"], 200)
+        self.assertEqual(activity_logs["estimated_api_calls"], 2)
+        self.assertTrue(activity_logs["lower_bound"])
+        self.assertEqual(result["totals"]["estimated_records"], 220)
+
+    def test_plan_argument(self, *args):
+        with mock.patch.object(sys, "argv", ["tap-dixa", "--config", "config.json", "--plan"]), \
+                mock.patch("singer.utils.load_json", return_value=dict(CONFIG)):
+            args = tap_dixa.parse_args()
+        self.assertTrue(args.plan)
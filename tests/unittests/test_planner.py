@@ -0,0 +1,118 @@
+import datetime
+import json
+import unittest
+from unittest import mock
+
+import pytz
+from singer import Transformer
+
+from tap_dixa.helpers import datetime_to_unix_ms
+from tap_dixa.planner import DAY_MS, VolumeHistogram, plan_windows
+from tap_dixa.streams import Messages
+
+HOUR_MS = 60 * 60 * 1000
+
+
+def window_lengths(windows):
+    return [datetime_to_unix_ms(end) - datetime_to_unix_ms(start) for start, end in windows]
+
+
+class TestVolumeHistogram(unittest.TestCase):
+    """
+    Test cases to verify per-day counts are built up from completed windows.
+    """
+
+    def test_state_round_trip(self):
+        histogram = VolumeHistogram()
+        histogram.record_window(DAY_MS, 3 * DAY_MS - 1, [DAY_MS + 1, DAY_MS + 2, 2 * DAY_MS + 5])
+
+        state = histogram.to_state()
+        self.assertEqual(state, {"origin": "1970-01-02", "counts": [2, 1]})
+        self.assertEqual(VolumeHistogram.from_state(state).to_state(), state)
+
+    def test_covered_days_are_replaced_and_partial_days_added(self):
+        histogram = VolumeHistogram()
+        histogram.record_window(0, DAY_MS // 2 - 1, [1, 2, 3])
+        # Half a day observed is extrapolated to the whole day
+        self.assertEqual(histogram.get(0), 6)
+        histogram.record_window(DAY_MS // 2, DAY_MS - 1, [DAY_MS // 2 + 5])
+        self.assertEqual(histogram.get(0), 4)
+
+        histogram.record_window(0, DAY_MS - 1, [1, 2])
+        self.assertEqual(histogram.get(0), 2)
+
+    def test_partial_days_are_replaced_on_resync(self):
+        state = {}
+        for _ in range(3):
+            # Every sync looks back at the same half day
+            histogram = VolumeHistogram.from_state(state)
+            histogram.record_window(DAY_MS // 2, DAY_MS - 1, [DAY_MS // 2 + 5, DAY_MS // 2 + 6])
+            state = histogram.to_state()
+        self.assertEqual(state["counts"], [4])
+
+    def test_days_before_origin(self):
+        histogram = VolumeHistogram.from_state({"origin": "1970-01-03", "counts": [5]})
+        histogram.record_window(0, DAY_MS - 1, [])
+        self.assertEqual(histogram.to_state(), {"origin": "1970-01-01", "counts": [0, None, 5]})
+
+
+class TestPlanWindows(unittest.TestCase):
+    """
+    Test cases to verify windows are cut to similar expected volume.
+    """
+
+    def test_busy_day_is_split(self):
+        histogram = VolumeHistogram(0, [1000, 1000])
+        windows = list(plan_windows(0, 2 * DAY_MS - 1, histogram, 250, 24, 24 * 31))
+
+        self.assertEqual(len(windows), 8)
+        for length in window_lengths(windows):
+            self.assertAlmostEqual(length, 6 * HOUR_MS, delta=10)
+
+    def test_quiet_days_are_merged_up_to_max(self):
+        histogram = VolumeHistogram(0, [10] * 60)
+        windows = list(plan_windows(0, 60 * DAY_MS, histogram, 1000, 24, 24 * 31))
+
+        self.assertEqual(window_lengths(windows)[0], 31 * DAY_MS)
+        self.assertEqual(datetime_to_unix_ms(windows[-1][1]), 60 * DAY_MS)
+
+    def test_unknown_days_use_default_interval(self):
+        windows = list(plan_windows(0, 3 * DAY_MS, VolumeHistogram(0, [None]), 100, 24, 24 * 31))
+        self.assertEqual(len(windows), 3)
+
+    def test_windows_are_contiguous(self):
+        histogram = VolumeHistogram(0, [0, 500, 3, None, 40])
+        windows = list(plan_windows(0, 5 * DAY_MS, histogram, 100, 24, 24 * 7))
+
+        self.assertEqual(datetime_to_unix_ms(windows[0][0]), 0)
+        self.assertEqual(datetime_to_unix_ms(windows[-1][1]), 5 * DAY_MS)
+        for (_, previous_end), (next_start, _) in zip(windows, windows[1:]):
+            self.assertEqual(datetime_to_unix_ms(next_start) - datetime_to_unix_ms(previous_end), 1)
+
+
+class TestPlannedSync(unittest.TestCase):
+    """
+    Test cases to verify the incremental sync keeps the histogram in state.
+    """
+
+    @mock.patch("singer.utils.now", return_value=datetime.datetime(2021, 1, 3, tzinfo=pytz.UTC))
+    def test_histogram_written_to_state(self, *args):
+        client = mock.Mock()
+        client.get.side_effect = lambda *args, **kwargs: json.dumps([
+            {"id": "a", "created_at": kwargs["params"]["created_after"]}]).encode("utf-8")
+
+        stream = Messages(client, mock.Mock())
+        schema = {"type": "object", "properties": {"id": {"type": "string"}, "created_at": {"type": "integer"}}}
+        config = {"start_date": "2021-01-01T00:00:00Z", "interval": "DAY", "target_window_records": 10}
+        with Transformer() as transformer:
+            state = stream.sync({}, schema, {}, config, transformer)
+
+        self.assertEqual(state["bookmarks"]["messages"]["volume"], {"origin": "2021-01-01", "counts": [1, 1, 0]})
+
+        # A second run plans its windows from the histogram
+        client.get.reset_mock()
+        with Transformer() as transformer:
+            stream.sync({"bookmarks": {"messages": {"volume": {"origin": "2021-01-01", "counts": [40, 0, 0]}}}},
+                        schema, {}, config, transformer)
+        # 40 records on the first day in windows of 10, then the empty days in one window
+        self.assertEqual(client.get.call_count, 4)
@@ -0,0 +1,120 @@
+import datetime
+import json
+import unittest
+from unittest import mock
+
+import pytz
+from singer import Transformer
+
+from tap_dixa.client import Client
+from tap_dixa.helpers import datetime_to_unix_ms
+from tap_dixa.streams import Conversations
+from tap_dixa.streams.abstracts import PROBE_MAX_DAYS
+
+NOW = datetime.datetime(2021, 7, 1, tzinfo=pytz.UTC)
+FIRST_RECORD = datetime_to_unix_ms(datetime.datetime(2021, 6, 10, 12, tzinfo=pytz.UTC))
+SCHEMA = {"type": "object", "properties": {"id": {"type": "integer"}, "updated_at": {"type": "integer"}}}
+
+
+def get_records(*args, **kwargs):
+    params = kwargs["params"]
+    records = []
+    if params["updated_after"] <= FIRST_RECORD <= params["updated_before"]:
+        records = [{"id": 1, "updated_at": FIRST_RECORD}, {"id": 2, "updated_at": FIRST_RECORD + 5}]
+    # The sync requests raw bytes as the schema needs no transformation
+    return json.dumps(records).encode("utf-8") if kwargs.get("raw") else records
+
+
+def has_records(*args, **kwargs):
+    return bool(get_records(**kwargs))
+
+
+def get_client():
+    client = mock.Mock()
+    client.get.side_effect = get_records
+    client.has_records.side_effect = has_records
+    return client
+
+
+class Mockresponse:
+    def __init__(self, chunks):
+        self.chunks = chunks
+        self.status_code = 200
+        self.headers = {}
+        self.read = 0
+        self.close = mock.Mock()
+
+    def iter_content(self, chunk_size=1):
+        for chunk in self.chunks:
+            self.read += 1
+            yield chunk
+
+
+@mock.patch("singer.utils.now", return_value=NOW)
+class TestProbeStartDate(unittest.TestCase):
+    """
+    Test cases to verify empty history before the first record is skipped in a few requests.
+    """
+
+    def test_probe_finds_first_record(self, *args):
+        client = get_client()
+        stream = Conversations(client)
+        stream.set_interval("DAY")
+
+        start = stream.probe_start_date(datetime_to_unix_ms(datetime.datetime(2018, 1, 1, tzinfo=pytz.UTC)))
+
+        # The sync starts within a day before the first record, and no record was downloaded
+        self.assertLessEqual(start, FIRST_RECORD)
+        self.assertLessEqual(FIRST_RECORD - start, 24 * 60 * 60 * 1000)
+        self.assertEqual(client.get.call_count, 0)
+        self.assertLessEqual(client.has_records.call_count, 30)
+
+        lengths = [call[1]["params"]["updated_before"] - call[1]["params"]["updated_after"]
+                   for call in client.has_records.call_args_list]
+        self.assertLessEqual(max(lengths), PROBE_MAX_DAYS * 24 * 60 * 60 * 1000)
+
+    def test_probe_without_data_reaches_now(self, *args):
+        client = mock.Mock()
+        client.has_records.return_value = False
+        stream = Conversations(client)
+
+        start = stream.probe_start_date(datetime_to_unix_ms(datetime.datetime(2018, 1, 1, tzinfo=pytz.UTC)))
+
+        self.assertEqual(start, datetime_to_unix_ms(NOW))
+
+    def test_sync_probes_only_without_bookmark(self, *args):
+        client = get_client()
+        config = {"start_date": "2018-01-01T00:00:00Z", "interval": "DAY", "probe_start_date": True}
+
+        with Transformer() as transformer:
+            state = Conversations(client, mock.Mock()).sync({}, SCHEMA, {}, config, transformer)
+
+        self.assertEqual(state["bookmarks"]["conversations"]["updated_at"], FIRST_RECORD + 5)
+        # One request per day from the day before the first record to now
+        self.assertLessEqual(client.get.call_count, 22)
+
+        client.get.reset_mock()
+        with Transformer() as transformer:
+            Conversations(client, mock.Mock()).sync(state, SCHEMA, {}, config, transformer)
+        first_params = client.get.call_args_list[0][1]["params"]
+        self.assertEqual(first_params["updated_after"], (FIRST_RECORD + 5) // 1000 * 1000)
+
+
+class TestHasRecords(unittest.TestCase):
+    """
+    Test cases to verify a window is checked for records from the first bytes of its body.
+    """
+
+    def has_records(self, chunks):
+        response = Mockresponse(chunks)
+        with mock.patch("requests.Session.request", return_value=response):
+            result = Client("test").has_records("https://exports.dixa.io", "/v1/conversation_export")
+        response.close.assert_called_once()
+        return result, response.read
+
+    def test_empty_array(self):
+        self.assertEqual(self.has_records([b" [ ", b"\n", b"] "]), (False, 3))
+        self.assertEqual(self.has_records([b"["]), (False, 1))
+
+    def test_body_is_not_downloaded(self):
+        self.assertEqual(self.has_records([b"[", b" ", b'{"id": 1}', b", " * 1000]), (True, 3))
@@ -0,0 +1,73 @@
+import json
+import tracemalloc
+import unittest
+
+from tap_dixa.helpers import get_abs_path
+from tap_dixa.records import RecordBuffer
+
+SCHEMA = {
+    "type": ["null", "object"],
+    "properties": {
+        "id": {"type": ["null", "string"]},
+        "created_at": {"type": ["null", "integer"]},
+        "direction": {"type": ["null", "string"]},
+        "is_automated_message": {"type": ["null", "boolean"]},
+        "to": {"type": ["null", "array"]},
+    },
+}
+
+
+class TestRecordBuffer(unittest.TestCase):
+    """
+    Test cases to verify records are held compactly and rebuilt unchanged.
+    """
+
+    records = [
+        {"id": "b", "created_at": 3, "direction": "inbound", "is_automated_message": False, "to": ["x"]},
+        {"id": "a", "created_at": None, "direction": "outbound"},
+        {"id": "c", "created_at": 1, "direction": "inbound", "to": [], "unknown": {"k": 1}},
+    ]
+
+    def test_records_round_trip(self):
+        buffer = RecordBuffer(SCHEMA)
+        buffer.extend(self.records)
+
+        self.assertEqual(len(buffer), 3)
+        self.assertEqual(list(buffer), self.records)
+        self.assertEqual(buffer[-1], self.records[-1])
+        self.assertNotIn("is_automated_message", buffer[1])
+
+    def test_strings_are_interned(self):
+        buffer = RecordBuffer(SCHEMA)
+        buffer.extend(json.loads(json.dumps(self.records)))
+
+        directions = buffer.column("direction")
+        self.assertIs(directions[0], directions[2])
+
+    def test_integer_column_falls_back_to_list(self):
+        buffer = RecordBuffer(SCHEMA)
+        buffer.append({"created_at": 2 ** 70})
+        buffer.append({"created_at": 1.5})
+        self.assertEqual(buffer.column("created_at"), [2 ** 70, 1.5])
+
+    def test_uses_less_memory_than_dicts(self):
+        with open(get_abs_path("schemas/messages.json")) as file:
+            schema = json.load(file)
+
+        line = json.dumps({"id": "7f3c", "csid": 1, "created_at": 1629181750735, "initial_channel": "email",
+                           "author_name": "Agent 1", "direction": "inbound", "from": "agent@example.com",
+                           "text": None, "is_automated_message": False, "to": []})
+
+        tracemalloc.start()
+        records = [json.loads(line) for _ in range(2000)]
+        dict_size, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        tracemalloc.start()
+        buffer = RecordBuffer(schema)
+        buffer.extend(json.loads(line) for _ in range(2000))
+        buffer_size, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        self.assertEqual(buffer[0], records[0])
+        self.assertLess(buffer_size, dict_size / 2)
@@ -0,0 +1,79 @@
+import json
+import unittest
+from unittest import mock
+
+from requests.exceptions import ChunkedEncodingError
+
+from tap_dixa.client import Client, ResumableWindow
+
+RECORDS = [{"id": i, "updated_at": 1000 + i // 2} for i in range(10)]
+
+
+class Mockresponse:
+    """
+    A streamed response whose connection breaks after `break_after` bytes.
+    """
+
+    def __init__(self, records, break_after=None, status_code=200):
+        self.body = json.dumps(records).encode("utf-8")
+        self.break_after = break_after
+        self.status_code = status_code
+        self.headers = {}
+
+    def iter_content(self, chunk_size=1):
+        if self.break_after is None:
+            yield self.body
+            return
+        yield self.body[:self.break_after]
+        raise ChunkedEncodingError("Connection broken: IncompleteRead")
+
+
+def after(value):
+    return [record for record in RECORDS if record["updated_at"] >= value]
+
+
+class TestResumableDownload(unittest.TestCase):
+    """
+    Test cases to verify a broken off window download resumes from the last record received.
+    """
+
+    def get(self, mocked_request, raw=False):
+        return Client("test").get("https://exports.dixa.io", "/v1/conversation_export",
+                                  params={"updated_after": 1000, "updated_before": 2000}, raw=raw,
+                                  resume=ResumableWindow("updated_after", "updated_at", ["id"]))
+
+    @mock.patch("requests.Session.request")
+    def test_download_resumes_from_last_record(self, mocked_request):
+        body = json.dumps(RECORDS).encode("utf-8")
+        # Breaks off in the middle of the record with id 5
+        break_after = body.index(b'{"id": 5') + 5
+        mocked_request.side_effect = [Mockresponse(RECORDS, break_after), Mockresponse(after(1002))]
+
+        records = self.get(mocked_request)
+
+        self.assertEqual(records, RECORDS)
+        resumed_params = mocked_request.call_args_list[1][1]["params"]
+        self.assertEqual(resumed_params, {"updated_after": 1002, "updated_before": 2000})
+        self.assertTrue(mocked_request.call_args_list[1][1]["stream"])
+
+    @mock.patch("requests.Session.request")
+    def test_raw_download_is_rebuilt(self, mocked_request):
+        mocked_request.side_effect = [Mockresponse(RECORDS, 40), Mockresponse(after(1000))]
+
+        self.assertEqual(json.loads(self.get(mocked_request, raw=True)), RECORDS)
+
+    @mock.patch("requests.Session.request")
+    def test_unordered_records_restart_the_window(self, mocked_request):
+        unordered = list(reversed(RECORDS))
+        mocked_request.side_effect = [Mockresponse(unordered, 120), Mockresponse(unordered)]
+
+        self.assertEqual(self.get(mocked_request), unordered)
+        self.assertEqual(mocked_request.call_args_list[1][1]["params"], {"updated_after": 1000, "updated_before": 2000})
+
+    @mock.patch("requests.Session.request")
+    def test_resumes_are_bounded(self, mocked_request):
+        mocked_request.side_effect = [Mockresponse(RECORDS, 40) for _ in range(4)]
+
+        with self.assertRaises(ChunkedEncodingError):
+            self.get(mocked_request)
+        self.assertEqual(mocked_request.call_count, 4)
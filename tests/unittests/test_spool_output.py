@@ -0,0 +1,92 @@
+import io
+import json
+import threading
+import unittest
+
+from tap_dixa.output import RecordWriter, SpoolWriter, get_writer
+
+
+class BlockedOutput(io.StringIO):
+    """
+    An output which blocks writes until released, like a stalled target.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.released = threading.Event()
+
+    def write(self, text):
+        self.released.wait()
+        return super().write(text)
+
+
+class BrokenOutput(io.StringIO):
+    def write(self, text):
+        raise BrokenPipeError("target went away")
+
+
+class TestSpoolWriter(unittest.TestCase):
+    """
+    Test cases to verify the spool queues messages without blocking and delivers them in order.
+    """
+
+    def write_messages(self, writer):
+        writer.write_schema("stream", {"type": "object"}, ["id"])
+        for i in range(500):
+            writer.write_record("stream", {"id": i})
+            if i % 100 == 99:
+                writer.write_state({"bookmarks": {"stream": {"id": i}}})
+
+    def test_stalled_output_spools_to_disk(self):
+        output = BlockedOutput()
+        writer = SpoolWriter(max_memory_bytes=1024, output=output)
+
+        # Nothing is delivered yet, yet writing does not block
+        self.write_messages(writer)
+        self.assertGreater(writer.spooled_bytes, 0)
+        self.assertEqual(output.getvalue(), "")
+
+        output.released.set()
+        writer.close()
+
+        messages = [json.loads(line) for line in output.getvalue().splitlines()]
+        self.assertEqual(len(messages), 506)
+        self.assertEqual(messages[0]["type"], "SCHEMA")
+        ids = [message["record"]["id"] for message in messages if message["type"] == "RECORD"]
+        self.assertEqual(ids, list(range(500)))
+
+        # Every bookmark comes after the records it covers and before the following ones
+        for index, message in enumerate(messages):
+            if message["type"] == "STATE":
+                self.assertEqual(messages[index - 1]["record"]["id"], message["value"]["bookmarks"]["stream"]["id"])
+
+    def test_spool_is_reused_once_drained(self):
+        output = io.StringIO()
+        writer = SpoolWriter(max_memory_bytes=64, output=output)
+        for i in range(3):
+            self.write_messages(writer)
+            writer.flush()
+            self.assertEqual(writer._write_position, 0)
+        writer.write_serialized("stream", '{"type": "RECORD", "stream": "stream", "record": {"id": -1}}')
+        writer.close()
+
+        lines = output.getvalue().splitlines()
+        self.assertEqual(len(lines), 3 * 506 + 1)
+        self.assertEqual(json.loads(lines[-1])["record"], {"id": -1})
+
+    def test_output_errors_are_raised(self):
+        writer = SpoolWriter(output=BrokenOutput())
+        writer.write_record("stream", {"id": 1})
+        with self.assertRaises(BrokenPipeError):
+            writer.flush()
+        with self.assertRaises(BrokenPipeError):
+            writer.write_record("stream", {"id": 2})
+        with self.assertRaises(BrokenPipeError):
+            writer.close()
+
+    def test_get_writer(self):
+        writer = get_writer({"spool": True})
+        self.assertIsInstance(writer, SpoolWriter)
+        self.assertTrue(writer.serialized_output)
+        writer.close()
+        self.assertIs(type(get_writer({})), RecordWriter)
@@ -0,0 +1,126 @@
+import datetime
+import os
+import time
+import unittest
+from unittest import mock
+
+import pytz
+
+from tap_dixa import helpers
+from tap_dixa.discover import get_schemas
+from tap_dixa.streams.abstracts import IncrementalStream
+
+TIMEZONES = ["UTC", "America/New_York", "Asia/Kolkata", "Pacific/Chatham"]
+
+CASES = [
+    (1629181750735, "2021-08-17T06:29:10.735Z"),
+    (-145222249876, "1965-05-26T04:29:10.124Z"),
+    (0, "1970-01-01T00:00:00.000Z"),
+    (None, None),
+]
+
+
+class TimezoneTestCase(unittest.TestCase):
+    """
+    Runs every test once per host timezone.
+    """
+
+    def run_in_timezones(self, test):
+        original = os.environ.get("TZ")
+        try:
+            for timezone in TIMEZONES:
+                os.environ["TZ"] = timezone
+                time.tzset()
+                with self.subTest(timezone=timezone):
+                    test()
+        finally:
+            if original is None:
+                os.environ.pop("TZ", None)
+            else:
+                os.environ["TZ"] = original
+            time.tzset()
+
+
+class TestSingleValueConversion(TimezoneTestCase):
+    """
+    Test cases to verify the single value helpers do not depend on the host timezone.
+    """
+
+    def test_unix_ms_to_date_utc(self):
+        def test():
+            self.assertEqual(helpers.unix_ms_to_date_utc(1629181750735),
+                             datetime.datetime(2021, 8, 17, 6, 29, 10, tzinfo=pytz.UTC))
+            self.assertEqual(helpers.unix_ms_to_date(1629181750735), "2021-08-17T06:29:10")
+        self.run_in_timezones(test)
+
+    def test_datetime_to_unix_ms(self):
+        def test():
+            aware = datetime.datetime(2021, 8, 17, 12, 29, 10, 735000, tzinfo=pytz.timezone("Asia/Kolkata"))
+            self.assertEqual(helpers.datetime_to_unix_ms(datetime.datetime(2021, 8, 17, 6, 29, 10, 735000)),
+                             1629181750735)
+            self.assertEqual(helpers.datetime_to_unix_ms(aware), aware.timestamp() * 1000)
+        self.run_in_timezones(test)
+
+    def test_round_trip(self):
+        def test():
+            self.assertEqual(helpers.datetime_to_unix_ms(helpers.unix_ms_to_date_utc(1629181750000)),
+                             1629181750000)
+        self.run_in_timezones(test)
+
+
+class TestBatchConversion(TimezoneTestCase):
+    """
+    Test cases to verify the batch helpers with and without numpy.
+    """
+
+    def check_isoformat(self):
+        values = [case for case, _ in CASES]
+        self.assertEqual(helpers.unix_ms_to_isoformat(values), [expected for _, expected in CASES])
+
+    def check_datetimes(self):
+        values = [case for case, _ in CASES]
+        expected = [None if value is None else
+                    datetime.datetime(1970, 1, 1, tzinfo=pytz.UTC) + datetime.timedelta(milliseconds=value)
+                    for value in values]
+        self.assertEqual(helpers.unix_ms_to_datetimes(values), expected)
+        self.assertEqual(helpers.unix_ms_to_datetimes(values)[0].tzinfo, pytz.UTC)
+
+    def test_pure_python(self):
+        with mock.patch.object(helpers, "numpy", None):
+            self.run_in_timezones(self.check_isoformat)
+            self.run_in_timezones(self.check_datetimes)
+
+    @unittest.skipUnless(helpers.numpy, "numpy is not installed")
+    def test_numpy(self):
+        self.run_in_timezones(self.check_isoformat)
+        self.run_in_timezones(self.check_datetimes)
+
+    def test_accepts_generators(self):
+        self.assertEqual(helpers.unix_ms_to_isoformat(value for value in [0]), ["1970-01-01T00:00:00.000Z"])
+
+
+class TestIsoTimestampCopies(unittest.TestCase):
+    """
+    Test cases to verify ISO copies of epoch fields are discovered and added per window.
+    """
+
+    def test_discovered_only_when_enabled(self):
+        schemas, _ = get_schemas()
+        self.assertNotIn("updated_at_iso", schemas["conversations"]["properties"])
+
+        schemas, schemas_metadata = get_schemas(iso_timestamps=True)
+        properties = schemas["conversations"]["properties"]
+        self.assertEqual(properties["updated_at_iso"], {"type": ["null", "string"], "format": "date-time"})
+        self.assertIn("closed_at_iso", properties)
+        self.assertNotIn("total_duration_iso", properties)
+        self.assertNotIn("activityTimestamp_iso", schemas["activity_logs"]["properties"])
+
+    def test_window_records_get_iso_copies(self):
+        schemas, _ = get_schemas(iso_timestamps=True)
+        fields = IncrementalStream.get_iso_timestamp_fields(schemas["conversations"], {})
+        records = [{"updated_at": 1629181750735, "closed_at": None}]
+
+        helpers.add_iso_timestamps(records, fields)
+
+        self.assertEqual(records[0]["updated_at_iso"], "2021-08-17T06:29:10.735Z")
+        self.assertIsNone(records[0]["closed_at_iso"])
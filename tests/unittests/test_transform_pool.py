@@ -0,0 +1,73 @@
+import datetime
+import io
+import json
+import unittest
+from unittest import mock
+
+import pytz
+from singer import Transformer
+
+from tap_dixa import parse_args
+from tap_dixa.discover import get_schemas
+from tap_dixa.helpers import datetime_to_unix_ms
+from tap_dixa.output import BatchWriter, RecordWriter
+from tap_dixa.parallel import TransformPool
+from tap_dixa.streams import Conversations
+
+NOW = datetime.datetime(2021, 8, 3, tzinfo=pytz.UTC)
+START = datetime_to_unix_ms(datetime.datetime(2021, 8, 1, tzinfo=pytz.UTC))
+SCHEMAS, _ = get_schemas(iso_timestamps=True)
+
+
+def get_records(*args, **kwargs):
+    params = kwargs["params"]
+    return [{"id": i, "updated_at": params["updated_after"] + i * 1000, "status": "open", "unknown": i}
+            for i in range(1200)]
+
+
+@mock.patch("singer.utils.now", return_value=NOW)
+class TestTransformPool(unittest.TestCase):
+    """
+    Test cases to verify records transformed by worker processes match the ones transformed in process.
+    """
+
+    def sync(self, config):
+        client = mock.Mock()
+        client.get.side_effect = get_records
+        stdout = io.StringIO()
+        with mock.patch("sys.stdout", stdout), Transformer() as transformer:
+            state = Conversations(client, RecordWriter()).sync(
+                {}, SCHEMAS["conversations"], {}, {"start_date": "2021-08-01T00:00:00Z", "interval": "DAY", **config},
+                transformer)
+        return state, [json.loads(line) for line in stdout.getvalue().splitlines()]
+
+    def test_pool_preserves_order(self, *args):
+        records = get_records(params={"updated_after": START})
+        with TransformPool(2, "conversations", SCHEMAS["conversations"], {}, "updated_at", ["updated_at"],
+                           chunk_size=100) as pool:
+            results = list(pool.map(records))
+
+        self.assertEqual([value for value, _ in results], [record["updated_at"] for record in records])
+        first = json.loads(results[0][1])
+        self.assertEqual(first["type"], "RECORD")
+        self.assertEqual(first["record"]["updated_at_iso"], "2021-08-01T00:00:00.000Z")
+        self.assertNotIn("unknown", first["record"])
+
+    def test_workers_output_matches_single_process(self, *args):
+        state, messages = self.sync({})
+        pool_state, pool_messages = self.sync({"workers": 2})
+
+        self.assertEqual(pool_messages, messages)
+        self.assertEqual(pool_state, state)
+        self.assertEqual(len([message for message in messages if message["type"] == "RECORD"]), 2400)
+
+    def test_workers_ignored_by_batch_writer(self, *args):
+        stream = Conversations(mock.Mock(), BatchWriter.__new__(BatchWriter))
+        self.assertIsNone(stream.get_transform_pool({"workers": 4}, SCHEMAS["conversations"], {}, []))
+
+    def test_workers_argument_is_merged_into_config(self, *args):
+        config = {"start_date": "2021-08-01T00:00:00Z", "api_token": "x"}
+        with mock.patch("sys.argv", ["tap-dixa", "--workers", "3", "--config", "config.json"]), \
+                mock.patch("singer.utils.load_json", return_value=config):
+            args = parse_args()
+        self.assertEqual(args.config["workers"], 3)